@@ -0,0 +1,16 @@
+"""
+AQI category tables, shared by the prediction service and the backtest without importing either
+"""
+
+import numpy as np
+
+# Upper AQI bound of each category; anything above the last one is Hazardous
+AQI_BREAKPOINTS = np.array([50, 100, 150, 200, 300])
+AQI_CATEGORIES = [
+    {'category': 'Good', 'color': '#00e400', 'description': 'Air quality is satisfactory'},
+    {'category': 'Moderate', 'color': '#ffff00', 'description': 'Air quality is acceptable'},
+    {'category': 'Unhealthy for Sensitive Groups', 'color': '#ff7e00', 'description': 'Sensitive groups may experience health effects'},
+    {'category': 'Unhealthy', 'color': '#ff0000', 'description': 'Everyone may begin to experience health effects'},
+    {'category': 'Very Unhealthy', 'color': '#8f3f97', 'description': 'Health alert: everyone may experience serious effects'},
+    {'category': 'Hazardous', 'color': '#7e0023', 'description': 'Health warnings of emergency conditions'}
+]
@@ -1,15 +1,127 @@
 import torch
 import torch.nn as nn
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from torch.utils.data import BatchSampler, DataLoader, Dataset, RandomSampler, SequentialSampler
+import copy
 import pickle
+import hashlib
+import time
+from observability import STAGE_SECONDS
+
+def file_version(*paths):
+    """Short content hash identifying a set of model files"""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+def series_parts(data):
+    """A series, or a list of them (e.g. one per sensor), as a list of arrays; memory-mapped data is not copied"""
+    return [np.asarray(part) for part in data] if isinstance(data, (list, tuple)) else [np.asarray(data)]
+
+class ArrayScaler:
+    """Min-max scaler over plain arrays; drop-in for sklearn's MinMaxScaler without the dependency"""
+    
+    def __init__(self, data_min=None, data_max=None, feature_range=(0, 1)):
+        self.feature_range = tuple(feature_range)
+        self.data_min_ = None
+        self.data_max_ = None
+        if data_min is not None and data_max is not None:
+            self._set_range(data_min, data_max)
+    
+    def _set_range(self, data_min, data_max):
+        self.data_min_ = np.asarray(data_min, dtype=np.float64)
+        self.data_max_ = np.asarray(data_max, dtype=np.float64)
+        low, high = self.feature_range
+        data_range = self.data_max_ - self.data_min_
+        # Constant columns scale by 1, as sklearn does
+        data_range = np.where(data_range == 0, 1.0, data_range)
+        self.scale_ = (high - low) / data_range
+        self.min_ = low - self.data_min_ * self.scale_
+    
+    def fit(self, X):
+        # No float64 copy: min/max stream through memory-mapped float32 data, one series at a time for a list of them
+        parts = series_parts(X)
+        self._set_range(np.min([part.min(axis=0) for part in parts], axis=0),
+                        np.max([part.max(axis=0) for part in parts], axis=0))
+        return self
+    
+    def transform(self, X):
+        return np.asarray(X) * self.scale_ + self.min_
+    
+    def inverse_transform(self, X):
+        return (np.asarray(X) - self.min_) / self.scale_
+    
+    def fit_transform(self, X):
+        return self.fit(X).transform(X)
+    
+    def to_dict(self):
+        return {
+            'data_min': self.data_min_.tolist(),
+            'data_max': self.data_max_.tolist(),
+            'feature_range': list(self.feature_range)
+        }
+    
+    @classmethod
+    def from_dict(cls, state):
+        return cls(state['data_min'], state['data_max'], state['feature_range'])
+    
+    @classmethod
+    def from_sklearn(cls, scaler):
+        return cls(scaler.data_min_, scaler.data_max_, scaler.feature_range)
+
+def data_fingerprint(columns, chunk_rows=1 << 20):
+    """Length and content hash of a (N, C) series or a list of them, hashed a chunk at a time so memory-mapped data isn't loaded whole"""
+    parts = series_parts(columns)
+    digest = hashlib.sha256()
+    for part in parts:
+        for start in range(0, len(part), chunk_rows):
+            digest.update(np.ascontiguousarray(part[start:start + chunk_rows], dtype=np.float64).tobytes())
+    if len(parts) > 1:
+        # Where one series ends and the next starts is part of the data too
+        digest.update(np.array([len(part) for part in parts], dtype=np.int64).tobytes())
+    return {'points': int(sum(len(part) for part in parts)), 'sha256': digest.hexdigest()}
+
+def series_windows(series, length):
+    """Sliding windows over the time axis of a (N,) or (N, C) series, as (n, length) or (n, length, C) views"""
+    windows = sliding_window_view(series, length, axis=0)
+    return windows if windows.ndim == 2 else np.swapaxes(windows, 1, 2)
+
+def forecast_windows(data, lookback, steps, stride=1, max_cutoffs=None):
+    """Windows to forecast from and the `steps` AQI values that followed each, at cutoffs thinned evenly to `max_cutoffs`
+
+    `data` is a (N,) or (N, C) series, or a list of them (one per sensor) whose windows never run
+    from one series into the next. Returns (windows, observed, cutoffs), each cutoff being a
+    position in its own series; windows and observed are None when there are no cutoffs.
+    """
+    parts = series_parts(data)
+    cutoffs = [np.arange(lookback, len(part) - steps + 1, stride) for part in parts]
+    owners = np.concatenate([np.full(len(positions), index) for index, positions in enumerate(cutoffs)])
+    cutoffs = np.concatenate(cutoffs)
+    if max_cutoffs and len(cutoffs) > max_cutoffs:
+        keep = np.linspace(0, len(cutoffs) - 1, max_cutoffs).astype(int)
+        owners, cutoffs = owners[keep], cutoffs[keep]
+    if len(cutoffs) == 0:
+        return None, None, cutoffs
+    windows, observed = [], []
+    for index in np.unique(owners):
+        part, positions = parts[index], cutoffs[owners == index]
+        aqi = part if part.ndim == 1 else part[:, 0]
+        windows.append(series_windows(part, lookback)[positions - lookback])
+        observed.append(sliding_window_view(aqi, steps)[positions])
+    return np.concatenate(windows), np.concatenate(observed), cutoffs
 
 class LSTMModel(nn.Module):
     def __init__(self, input_size=1, hidden_size=64, num_layers=2, dropout=0.2):
         super(LSTMModel, self).__init__()
+        self.input_size = input_size
         self.hidden_size = hidden_size
         self.num_layers = num_layers
         self.lstm = nn.LSTM(input_size, hidden_size, num_layers, batch_first=True, dropout=dropout if num_layers > 1 else 0)
-        self.fc = nn.Linear(hidden_size, 1)
+        # One output per input channel, so the prediction can be fed straight back in
+        self.fc = nn.Linear(hidden_size, input_size)
     
     def forward(self, x):
         h0 = torch.zeros(self.num_layers, x.size(0), self.hidden_size).to(x.device)
@@ -17,66 +129,382 @@ class LSTMModel(nn.Module):
         out, _ = self.lstm(x, (h0, c0))
         out = self.fc(out[:, -1, :])
         return out
+    
+    def step(self, x, state=None):
+        """Advance the LSTM over x from state (zeros when None), returning the prediction and new state"""
+        out, state = self.lstm(x, state)
+        return self.fc(out[:, -1, :]), state
+
+class WindowDataset(Dataset):
+    """(window, next value) pairs served from zero-copy sliding views over one (N,) or (N, C) series
+
+    A list of series (e.g. one per sensor) is served as the union of each one's windows, so no
+    window runs from one series into the next. With `transform` (e.g. a scaler's), the series
+    stay raw, possibly memory-mapped, and only the sampled batch is scaled.
+    """
+    
+    def __init__(self, series, lookback=30, transform=None):
+        parts = [part if transform is not None else part.astype(np.float32, copy=False) for part in series_parts(series)]
+        self.width = 1 if parts[0].ndim == 1 else parts[0].shape[1]
+        self.parts = [part for part in parts if len(part) > lookback]
+        self.lookback = lookback
+        self.transform = transform
+        self.windows = [series_windows(part[:-1], lookback) for part in self.parts]
+        # Dataset position where each series' windows start
+        self.offsets = np.cumsum([0] + [len(part) - lookback for part in self.parts])
+    
+    def __len__(self):
+        return int(self.offsets[-1])
+    
+    def __getitem__(self, index):
+        # Indexed with a whole batch of positions at once, so only that batch is materialized.
+        # Rows come back grouped by series, which is harmless: each window stays paired with its target
+        index = np.asarray(index)
+        owners = np.searchsorted(self.offsets, index, side='right') - 1
+        windows, targets = [], []
+        for owner in np.unique(owners):
+            positions = index[owners == owner] - self.offsets[owner]
+            windows.append(self.windows[owner][positions])
+            targets.append(self.parts[owner][positions + self.lookback])
+        x = torch.from_numpy(self._scaled(np.concatenate(windows)))
+        y = torch.from_numpy(self._scaled(np.concatenate(targets)))
+        if y.ndim == 1:
+            x, y = x.unsqueeze(-1), y.unsqueeze(-1)
+        return x, y
+    
+    def _scaled(self, values):
+        if self.transform is not None:
+            values = self.transform(values.reshape(-1, self.width)).reshape(values.shape)
+        return np.ascontiguousarray(values, dtype=np.float32)
 
 class AQILSTMPredictor:
-    def __init__(self, lookback=30):
+    DECODE_MODES = ('window', 'stateful')
+    # The decode the API forecasts with; backtests and confidence calibration must measure the same one
+    SERVING_DECODE = 'stateful'
+    PRECISIONS = ('fp32', 'int8', 'bf16')
+    
+    def __init__(self, lookback=30, decode='window', channels=('aqi',), hidden_size=64, num_layers=2, dropout=0.2):
+        if decode not in self.DECODE_MODES:
+            raise ValueError(f"Unknown decode mode: {decode}")
         self.lookback = lookback
+        self.hidden_size = hidden_size
+        self.num_layers = num_layers
+        self.dropout = dropout
+        self.decode = decode
+        self.channels = self._check_channels(channels)
         self.model = None
         self.scaler = None
+        self.model_version = None
+        self.metadata = {}
+        self.backend = None
+        self.precision = 'fp32'
+        self.residual_quantiles = None
+        self.training_summary = None
+        self._sampler = None
         self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
     
+    @staticmethod
+    def _check_channels(channels):
+        channels = tuple(channels)
+        if not channels or channels[0] != 'aqi':
+            raise ValueError(f"The first input channel must be 'aqi', got {channels}")
+        return channels
+    
+    @property
+    def architecture(self):
+        """The settings that shape the network and its input; stored in the artifact"""
+        return {'lookback': self.lookback, 'hidden_size': self.hidden_size, 'num_layers': self.num_layers, 'dropout': self.dropout}
+    
+    @property
+    def multivariate(self):
+        """Whether the model reads and forecasts pollutant channels alongside AQI"""
+        return len(self.channels) > 1
+    
     def create_model(self):
-        self.model = LSTMModel(input_size=1, hidden_size=64, num_layers=2, dropout=0.2)
+        self.model = LSTMModel(input_size=len(self.channels), hidden_size=self.hidden_size,
+                               num_layers=self.num_layers, dropout=self.dropout)
         self.model = self.model.to(self.device)
         return self.model
     
     def prepare_data(self, data, lookback=30):
-        X, y = [], []
-        for i in range(len(data) - lookback):
-            X.append(data[i:i+lookback])
-            y.append(data[i+lookback])
-        return np.array(X), np.array(y)
-    
-    def train(self, data, epochs=50, batch_size=32, learning_rate=0.001):
-        from sklearn.preprocessing import MinMaxScaler
-        self.scaler = MinMaxScaler(feature_range=(0, 1))
-        data_normalized = self.scaler.fit_transform(data.reshape(-1, 1)).flatten()
-        X, y = self.prepare_data(data_normalized, self.lookback)
-        X = torch.FloatTensor(X).unsqueeze(-1).to(self.device)
-        y = torch.FloatTensor(y).unsqueeze(-1).to(self.device)
+        """Windows and targets as zero-copy views: X[i] = data[i:i+lookback], y[i] = data[i+lookback]"""
+        data = np.asarray(data)
+        return series_windows(data[:-1], lookback), data[lookback:]
+    
+    def make_loader(self, data_normalized, batch_size=32, shuffle=True, num_workers=0, pin_memory=None, transform=None):
+        """Mini-batch loader over lazily sliced windows of a normalized series (or a raw one plus its `transform`)"""
+        dataset = WindowDataset(data_normalized, self.lookback, transform=transform)
+        sampler = RandomSampler(dataset) if shuffle else SequentialSampler(dataset)
+        if pin_memory is None:
+            pin_memory = self.device.type == 'cuda'
+        return DataLoader(
+            dataset,
+            batch_size=None,
+            sampler=BatchSampler(sampler, batch_size=batch_size, drop_last=False),
+            num_workers=num_workers,
+            pin_memory=pin_memory,
+            persistent_workers=num_workers > 0
+        )
+    
+    def train(self, data, epochs=50, batch_size=32, learning_rate=0.001, shuffle=True, num_workers=0, pin_memory=None,
+              callback=None, validation_fraction=0.0, patience=None, checkpoint_path=None, checkpoint_every=1, resume=False):
+        """Fit the scaler and the network on `data`; returns the last epoch's training loss
+
+        `data` is one series or a list of them (e.g. one per sensor), whose windows are pooled but
+        never span two series. With `validation_fraction`, the most recent part of each series is held out: its loss is
+        tracked every epoch, training stops after `patience` epochs without improvement, and the
+        best epoch's weights are kept. With `checkpoint_path`, the model, optimizer, scaler and RNG
+        state are saved every `checkpoint_every` epochs, and `resume=True` continues from that
+        checkpoint instead of starting over. `callback(epoch, loss)` runs after every epoch
+        (1-based) and may evaluate the model; training stops early when it returns False.
+        Details of the run are left in `self.training_summary`.
+        """
+        import os
+        # Views only: a memory-mapped history series is never loaded whole
+        columns = [part.reshape(len(part), -1) for part in series_parts(data)]
+        for part in columns:
+            if part.shape[1] != len(self.channels):
+                raise ValueError(f"Expected {len(self.channels)} channels {self.channels}, got {part.shape[1]}")
+        checkpoint = None
+        fingerprint = data_fingerprint(columns) if checkpoint_path else None
+        if resume and checkpoint_path and os.path.exists(checkpoint_path):
+            checkpoint = self._load_checkpoint(checkpoint_path, fingerprint)
+        # Each channel gets its own min-max range; batches are scaled as they are sampled.
+        # A resumed run keeps the range its weights were trained with
+        self.scaler = ArrayScaler.from_dict(checkpoint['scaler']) if checkpoint else ArrayScaler(feature_range=(0, 1)).fit(columns)
+        series = columns if self.multivariate else [part[:, 0] for part in columns]
+        splits = [(part, len(part) - int(len(part) * validation_fraction)) for part in series]
+        # Series too short to train on once their validation tail is taken out are left out
+        splits = [(part, split) for part, split in splits if split > self.lookback]
+        if not splits:
+            points = sum(len(part) for part in series)
+            raise ValueError(f"Too little data to train on {points} points with validation_fraction={validation_fraction}")
+        loader = self.make_loader([part[:split] for part, split in splits], batch_size, shuffle, num_workers, pin_memory,
+                                  transform=self.scaler.transform)
+        # Validation windows take their lookback context from the end of the training part
+        held_out = [part[split - self.lookback:] for part, split in splits if split < len(part)]
+        validation = self.make_loader(held_out, 1024, False, transform=self.scaler.transform) if held_out else None
         if self.model is None:
             self.create_model()
         criterion = nn.MSELoss()
         optimizer = torch.optim.Adam(self.model.parameters(), lr=learning_rate)
-        self.model.train()
-        for epoch in range(epochs):
-            outputs = self.model(X)
-            loss = criterion(outputs, y)
-            optimizer.zero_grad()
-            loss.backward()
-            optimizer.step()
+
+        summary = {'epochs_run': 0, 'loss': None, 'best_epoch': None, 'best_validation_loss': None, 'validation_loss': None,
+                   'stopped_early': False, 'resumed_from_epoch': None}
+        best_state = None
+        if checkpoint:
+            self.model.load_state_dict(checkpoint['state_dict'])
+            optimizer.load_state_dict(checkpoint['optimizer'])
+            torch.set_rng_state(checkpoint['rng_state'])
+            summary.update(checkpoint['summary'], resumed_from_epoch=checkpoint['summary']['epochs_run'])
+            best_state = checkpoint['best_state_dict']
+            print(f"✅ Resumed from epoch {summary['epochs_run']} ({checkpoint_path})")
+
+        epoch_loss = summary['loss']
+        # A run that already stopped early stays stopped when resumed
+        for epoch in range(summary['epochs_run'], summary['epochs_run'] if summary['stopped_early'] else epochs):
+            # Set every epoch: a callback that forecasts leaves the model in eval mode
+            self.model.train()
+            epoch_loss = torch.zeros((), device=self.device)
+            for X, y in loader:
+                X = X.to(self.device, non_blocking=True)
+                y = y.to(self.device, non_blocking=True)
+                outputs = self.model(X)
+                loss = criterion(outputs, y)
+                optimizer.zero_grad()
+                loss.backward()
+                optimizer.step()
+                epoch_loss += loss.detach() * len(X)
+            epoch_loss = epoch_loss.item() / len(loader.dataset)
+            summary.update(epochs_run=epoch + 1, loss=epoch_loss)
+            if validation is not None:
+                summary['validation_loss'] = self._validation_loss(validation, criterion)
+                if summary['best_validation_loss'] is None or summary['validation_loss'] < summary['best_validation_loss']:
+                    summary.update(best_epoch=epoch + 1, best_validation_loss=summary['validation_loss'])
+                    best_state = copy.deepcopy(self.model.state_dict())
+                elif patience is not None and epoch + 1 - summary['best_epoch'] >= patience:
+                    summary['stopped_early'] = True
             if (epoch + 1) % 10 == 0:
-                print(f'Epoch [{epoch+1}/{epochs}], Loss: {loss.item():.4f}')
+                validation_note = f", Validation: {summary['validation_loss']:.4f}" if validation is not None else ''
+                print(f'Epoch [{epoch+1}/{epochs}], Loss: {epoch_loss:.4f}{validation_note}')
+            if checkpoint_path and ((epoch + 1) % checkpoint_every == 0 or epoch + 1 == epochs or summary['stopped_early']):
+                self._save_checkpoint(checkpoint_path, optimizer, summary, best_state, fingerprint)
+            if summary['stopped_early']:
+                print(f"⏹️ Early stopping at epoch {epoch + 1}: no validation improvement since epoch {summary['best_epoch']}")
+                break
+            if callback is not None and callback(epoch + 1, epoch_loss) is False:
+                break
+        if best_state is not None:
+            self.model.load_state_dict(best_state)
+        self.training_summary = summary
         print("✅ Model training completed!")
-        return loss.item()
+        return epoch_loss
+    
+    def _validation_loss(self, loader, criterion):
+        self.model.eval()
+        total = 0.0
+        with torch.no_grad():
+            for X, y in loader:
+                X = X.to(self.device, non_blocking=True)
+                y = y.to(self.device, non_blocking=True)
+                total += criterion(self.model(X), y).item() * len(X)
+        return total / len(loader.dataset)
+    
+    def _save_checkpoint(self, path, optimizer, summary, best_state, fingerprint):
+        """Everything needed to continue training, written atomically so a preempted save never corrupts the last one"""
+        import os
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        checkpoint = {
+            'format_version': 1,
+            'config': {**self.architecture, 'channels': list(self.channels)},
+            'data': fingerprint,
+            'state_dict': self.model.state_dict(),
+            'optimizer': optimizer.state_dict(),
+            'scaler': self.scaler.to_dict(),
+            'rng_state': torch.get_rng_state(),
+            'best_state_dict': best_state,
+            'summary': summary
+        }
+        torch.save(checkpoint, path + '.tmp')
+        os.replace(path + '.tmp', path)
+    
+    def _load_checkpoint(self, path, fingerprint):
+        checkpoint = torch.load(path, map_location=self.device, weights_only=True)
+        expected = {**self.architecture, 'channels': list(self.channels)}
+        if checkpoint['config'] != expected:
+            raise ValueError(f"Checkpoint {path} is for {checkpoint['config']}, not {expected}")
+        # Continuing on other data would mix two runs under a scaler fit to the first one
+        if checkpoint.get('data') != fingerprint:
+            saved = checkpoint.get('data') or {}
+            raise ValueError(f"Checkpoint {path} was trained on different data "
+                             f"({saved.get('points')} points, not {fingerprint['points']}); train without resume")
+        return checkpoint
+    
+    def predict_sequence(self, recent_data, steps=7, decode=None):
+        return self.predict_batch(np.asarray(recent_data)[None, -self.lookback:], steps=steps, decode=decode)[0]
     
-    def predict_sequence(self, recent_data, steps=7):
+    def predict_batch(self, windows, steps=7, decode=None):
+        """Roll a (B, T) batch of recent windows forward in lockstep, returning (B, steps) predictions;
+        multivariate models take (B, T, C) windows and return (B, steps, C)"""
         if self.model is None or self.scaler is None:
             raise ValueError("Model not trained or loaded!")
+        decode = decode or self.decode
+        if decode not in self.DECODE_MODES:
+            raise ValueError(f"Unknown decode mode: {decode}")
         self.model.eval()
-        predictions = []
-        current_sequence = self.scaler.transform(recent_data.reshape(-1, 1)).flatten()
-        current_sequence = current_sequence[-self.lookback:]
+        started = time.perf_counter()
+        x = self._scaled_input(np.asarray(windows, dtype=np.float64)[:, -self.lookback:])
+        scaled = time.perf_counter()
         with torch.no_grad():
-            for _ in range(steps):
-                x = torch.FloatTensor(current_sequence[-self.lookback:]).unsqueeze(0).unsqueeze(-1).to(self.device)
-                pred = self.model(x)
-                pred_value = pred.cpu().numpy()[0, 0]
-                predictions.append(pred_value)
-                current_sequence = np.append(current_sequence, pred_value)
-        predictions = self.scaler.inverse_transform(np.array(predictions).reshape(-1, 1)).flatten()
+            if decode == 'stateful':
+                predictions = self._decode_stateful(x, steps)
+            else:
+                predictions = self._decode_window(x, steps)
+        decoded = time.perf_counter()
+        predictions = self._unscale(predictions)
+        STAGE_SECONDS.observe(decoded - scaled, stage='rollout')
+        STAGE_SECONDS.observe(scaled - started + time.perf_counter() - decoded, stage='scaling')
         return predictions
     
+    def predict_samples(self, windows, steps=7, samples=32, seed=None, decode=None):
+        """Monte-Carlo dropout: `samples` stochastic trajectories per window, stacked on the batch
+        dimension of a single rollout; returns (B, samples, steps) predictions, or (B, samples, steps, C)"""
+        if self.model is None or self.scaler is None:
+            raise ValueError("Model not trained or loaded!")
+        decode = decode or self.decode
+        if decode not in self.DECODE_MODES:
+            raise ValueError(f"Unknown decode mode: {decode}")
+        windows = np.asarray(windows, dtype=np.float64)[:, -self.lookback:]
+        # Row b * samples + k is sample k of window b
+        started = time.perf_counter()
+        x = self._scaled_input(np.repeat(windows, samples, axis=0))
+        sampler = self._dropout_model()
+        scaled = time.perf_counter()
+        with torch.no_grad(), torch.random.fork_rng(devices=[] if self.device.type == 'cpu' else [self.device]):
+            if seed is not None:
+                torch.manual_seed(seed)
+            if decode == 'stateful':
+                predictions = self._decode_stateful(x, steps, step=sampler.step)
+            else:
+                predictions = self._decode_window(x, steps, step=sampler.step)
+        decoded = time.perf_counter()
+        predictions = self._unscale(predictions)
+        STAGE_SECONDS.observe(decoded - scaled, stage='rollout')
+        STAGE_SECONDS.observe(scaled - started + time.perf_counter() - decoded, stage='scaling')
+        return predictions.reshape((len(windows), samples) + predictions.shape[1:])
+    
+    def _scaled_input(self, windows):
+        """(B, T) or (B, T, C) readings -> scaled (B, T, C) network input"""
+        width = len(self.channels)
+        scaled = self.scaler.transform(windows.reshape(-1, width)).reshape(windows.shape[:2] + (width,))
+        x = torch.FloatTensor(scaled).to(self.device)
+        if self.precision == 'bf16':
+            x = x.to(torch.bfloat16)
+        return x
+    
+    def _unscale(self, predictions):
+        """(B, steps, C) network output back in reading units; univariate models drop the channel axis"""
+        predictions = predictions.float().cpu().numpy()
+        width = predictions.shape[-1]
+        predictions = self.scaler.inverse_transform(predictions.reshape(-1, width)).reshape(predictions.shape)
+        return predictions if self.multivariate else predictions[..., 0]
+    
+    def _dropout_model(self):
+        """A copy of the eager network with dropout left on, so sampling never flips the shared model out of eval mode"""
+        if self._sampler is None or self._sampler[0] is not self.model:
+            sampler = copy.deepcopy(self.model).train()
+            for parameter in sampler.parameters():
+                parameter.requires_grad_(False)
+            self._sampler = (self.model, sampler)
+        return self._sampler[1]
+    
+    def set_precision(self, precision='fp32'):
+        """Switch a loaded fp32 model to dynamic int8 (LSTM + Linear) or bf16 inference"""
+        if precision not in self.PRECISIONS:
+            raise ValueError(f"Unknown precision: {precision}")
+        if self.precision != 'fp32':
+            raise ValueError("Precision can only be changed from a freshly loaded fp32 model")
+        if precision == 'int8':
+            # Dynamic quantization kernels are CPU-only
+            self.device = torch.device('cpu')
+            self.model = torch.ao.quantization.quantize_dynamic(
+                self.model.cpu(), {nn.LSTM, nn.Linear}, dtype=torch.qint8
+            )
+        elif precision == 'bf16':
+            self.model = self.model.to(torch.bfloat16)
+        self.model.eval()
+        self.precision = precision
+    
+    def use_backend(self, kind='eager', path=None):
+        """Run the network through an exported TorchScript or ONNX graph instead of the eager module"""
+        from inference_backends import load_backend
+        self.backend = load_backend(kind, path, self.model, self.device, self.model_version)
+    
+    def _step(self, x, state=None):
+        if self.backend is not None:
+            return self.backend.step(x, state)
+        return self.model.step(x, state)
+    
+    def _decode_window(self, x, steps, step=None):
+        """Re-run the full lookback window from a zero state for every step"""
+        step = step or self._step
+        predictions = []
+        for _ in range(steps):
+            pred, _ = step(x[:, -self.lookback:])
+            predictions.append(pred)
+            x = torch.cat([x, pred.unsqueeze(1)], dim=1)
+        return torch.stack(predictions, dim=1)
+    
+    def _decode_stateful(self, x, steps, step=None):
+        """Warm the hidden state over the lookback window once, then advance one cell step per prediction"""
+        step = step or self._step
+        pred, state = step(x)
+        predictions = [pred]
+        for _ in range(steps - 1):
+            pred, state = step(pred.unsqueeze(1), state)
+            predictions.append(pred)
+        return torch.stack(predictions, dim=1)
+    
     def predict_daily(self, recent_data, days=7):
         return self.predict_sequence(recent_data, steps=days)
     
@@ -96,19 +524,57 @@ class AQILSTMPredictor:
             monthly_predictions.append(month_avg)
         return np.array(monthly_predictions)
     
-    def get_prediction_confidence(self, predictions, confidence_level=0.95):
-        std = np.std(predictions)
-        margin = std * 1.96
-        confidences = []
-        for pred in predictions:
-            confidences.append({
-                'prediction': float(pred),
-                'lower_bound': float(max(0, pred - margin)),
-                'upper_bound': float(pred + margin)
-            })
-        return confidences
-    
-    def save_model(self, model_path='models/aqi_lstm_model.pth', scaler_path='models/aqi_scaler.pkl'):
+    # Residual quantile levels stored per horizon step; bands pick the pair matching a confidence level
+    QUANTILE_LEVELS = (0.025, 0.05, 0.1, 0.25, 0.75, 0.9, 0.95, 0.975)
+    
+    def calibrate_confidence(self, data, horizons=None, max_cutoffs=256):
+        """Backtest rollouts from many cutoffs in `data` (a series or a list of them, one per sensor)
+        and store residual quantiles per view and step
+
+        Rollouts use the serving decode whatever this predictor's default is, so the bands describe
+        the forecasts they are attached to.
+        """
+        from forecast_engine import DEFAULT_HORIZONS, aggregate_views, rollout_steps
+        horizons = horizons or DEFAULT_HORIZONS
+        steps = rollout_steps(horizons)
+        windows, actuals, cutoffs = forecast_windows(data, self.lookback, steps, max_cutoffs=max_cutoffs)
+        if len(cutoffs) == 0:
+            raise ValueError(f"Need at least {self.lookback + steps} points to calibrate confidence bands")
+        # Daily residuals cover every rolled-out step, so longer daily forecasts still get bands
+        views = {**horizons, 'daily': steps}
+        predicted = self.predict_batch(windows, steps=steps, decode=self.SERVING_DECODE)
+        predicted = aggregate_views(predicted[..., 0] if self.multivariate else predicted, views)
+        observed = aggregate_views(actuals, views)
+        self.residual_quantiles = {'levels': list(self.QUANTILE_LEVELS), 'cutoffs': int(len(cutoffs))}
+        for view in horizons:
+            residuals = observed[view] - predicted[view]
+            self.residual_quantiles[view] = np.quantile(residuals, self.QUANTILE_LEVELS, axis=0).tolist()
+        return self.residual_quantiles
+    
+    def confidence_bands(self, predictions, confidence_level=0.95, view='daily'):
+        """Lower and upper bounds for a forecast, as arrays, in one vectorized pass"""
+        predictions = np.asarray(predictions, dtype=np.float64)
+        quantiles = self.residual_quantiles.get(view) if self.residual_quantiles else None
+        if quantiles is None:
+            # Uncalibrated model: fall back to the spread of the forecast itself
+            margin = np.std(predictions) * 1.96
+            return np.maximum(0, predictions - margin), predictions + margin
+        levels = np.asarray(self.residual_quantiles['levels'])
+        low = np.abs(levels - (1 - confidence_level) / 2).argmin()
+        high = np.abs(levels - (1 + confidence_level) / 2).argmin()
+        quantiles = np.asarray(quantiles)
+        # Steps beyond the calibrated horizon reuse the last step's spread
+        steps = np.minimum(np.arange(len(predictions)), quantiles.shape[1] - 1)
+        return np.maximum(0, predictions + quantiles[low, steps]), predictions + quantiles[high, steps]
+    
+    def get_prediction_confidence(self, predictions, confidence_level=0.95, view='daily'):
+        lower, upper = self.confidence_bands(predictions, confidence_level, view)
+        return [
+            {'prediction': pred, 'lower_bound': low, 'upper_bound': high}
+            for pred, low, high in zip(np.asarray(predictions, dtype=np.float64).tolist(), lower.tolist(), upper.tolist())
+        ]
+    
+    def save_model(self, model_path='models/aqi_lstm_model.pth', scaler_path='models/aqi_scaler.pkl', artifact_path='models/aqi_lstm_model.pt'):
         import os
         os.makedirs('models', exist_ok=True)
         torch.save(self.model.state_dict(), model_path)
@@ -116,12 +582,61 @@ class AQILSTMPredictor:
             pickle.dump(self.scaler, f)
         print(f"✅ Model saved to {model_path}")
         print(f"✅ Scaler saved to {scaler_path}")
+        if artifact_path:
+            self.save_artifact(artifact_path)
     
     def load_model(self, model_path='models/aqi_lstm_model.pth', scaler_path='models/aqi_scaler.pkl'):
         with open(scaler_path, 'rb') as f:
-            self.scaler = pickle.load(f)
+            scaler = pickle.load(f)
+        self.scaler = scaler if isinstance(scaler, ArrayScaler) else ArrayScaler.from_sklearn(scaler)
         self.create_model()
         self.model.load_state_dict(torch.load(model_path, map_location=self.device, weights_only=True))
         self.model.eval()
+        self.model_version = file_version(model_path, scaler_path)
         print(f"✅ Model loaded from {model_path}")
         print(f"✅ Scaler loaded from {scaler_path}")
+    
+    def save_artifact(self, artifact_path='models/aqi_lstm_model.pt', metadata=None):
+        """Write weights, scaler arrays and metadata to one file that loads without pickle or sklearn"""
+        import os
+        from datetime import datetime
+        os.makedirs(os.path.dirname(artifact_path) or '.', exist_ok=True)
+        scaler = self.scaler if isinstance(self.scaler, ArrayScaler) else ArrayScaler.from_sklearn(self.scaler)
+        artifact = {
+            'format_version': 1,
+            'state_dict': self.model.state_dict(),
+            'scaler': scaler.to_dict(),
+            'config': {**self.architecture, 'channels': list(self.channels)},
+            'confidence': self.residual_quantiles,
+            'metadata': {**self.metadata, 'saved_at': datetime.now().isoformat(), 'framework': 'PyTorch', **(metadata or {})}
+        }
+        torch.save(artifact, artifact_path)
+        print(f"✅ Inference artifact saved to {artifact_path}")
+    
+    def load_artifact(self, artifact_path='models/aqi_lstm_model.pt', precision='fp32', mmap=False):
+        """Load a self-contained inference artifact written by save_artifact
+
+        With mmap=True the fp32 weights stay backed by the file's pages, so processes loading the
+        same artifact share one physical copy; the file must then never be rewritten in place.
+        """
+        artifact = torch.load(artifact_path, map_location=self.device, weights_only=True, mmap=mmap)
+        config = artifact['config']
+        self.lookback = config['lookback']
+        # Artifacts from before the architecture was configurable all used the defaults
+        self.hidden_size = config.get('hidden_size', 64)
+        self.num_layers = config.get('num_layers', 2)
+        self.dropout = config.get('dropout', 0.2)
+        self.channels = self._check_channels(config.get('channels', ('aqi',)))
+        self.scaler = ArrayScaler.from_dict(artifact['scaler'])
+        self.metadata = artifact.get('metadata', {})
+        self.residual_quantiles = artifact.get('confidence')
+        self.create_model()
+        # assign keeps the loaded (possibly memory-mapped) tensors instead of copying them into fresh ones
+        self.model.load_state_dict(artifact['state_dict'], assign=mmap)
+        self.model.eval()
+        self.precision = 'fp32'
+        self.model_version = file_version(artifact_path)
+        print(f"✅ Inference artifact loaded from {artifact_path}")
+        if precision != 'fp32':
+            self.set_precision(precision)
+            print(f"✅ Using {precision} inference")
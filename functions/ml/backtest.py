@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Walk-forward backtesting: forecast from many historical cutoffs and score the rollouts against what happened
+
+Every cutoff's window is stacked into one batch and rolled forward once to the longest horizon,
+so thousands of cutoffs cost a handful of batched rollouts. Errors are reported per horizon
+(all steps up to it) and per AQI category of the observed value. Large runs can be split
+across a process pool.
+
+Usage:
+    python backtest.py [--artifact models/aqi_lstm_model.pt] [--history data/history | --synthetic 20000]
+                       [--max-cutoffs 5000] [--workers 4] [--output backtest.json]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from aqi_lstm_model import AQILSTMPredictor, forecast_windows
+from aqi_categories import AQI_BREAKPOINTS, AQI_CATEGORIES
+
+HORIZONS = (7, 28, 90)
+
+
+def select_cutoffs(points, lookback, steps, stride=1, max_cutoffs=None):
+    """Indices where a forecast can start: a full window behind and `steps` observed values ahead"""
+    cutoffs = np.arange(lookback, points - steps + 1, stride)
+    if max_cutoffs and len(cutoffs) > max_cutoffs:
+        cutoffs = cutoffs[np.linspace(0, len(cutoffs) - 1, max_cutoffs).astype(int)]
+    return cutoffs
+
+
+def holdout_split(data, lookback, steps=max(HORIZONS), fraction=0.2, min_cutoffs=30):
+    """(training part, evaluation part) with the most recent readings held out for a backtest
+
+    The evaluation part starts `lookback` points early so the first forecast begins right where
+    training data ends; its targets are all unseen. Returns (data, None) when the series is too
+    short to hold out `min_cutoffs` full-horizon forecasts and still train.
+
+    A list of series (one per sensor) is split series by series into two lists. Series too short
+    to split only train; the training parts of the others come first, in the same order as their
+    evaluation parts. The evaluation list is None when no series could be split.
+    """
+    if isinstance(data, (list, tuple)):
+        splits = [holdout_split(part, lookback, steps, fraction, min_cutoffs) for part in data]
+        split = [(train, evaluation) for train, evaluation in splits if evaluation is not None]
+        whole = [train for train, evaluation in splits if evaluation is None]
+        return [train for train, _ in split] + whole, [evaluation for _, evaluation in split] or None
+    holdout = max(int(len(data) * fraction), steps + min_cutoffs - 1)
+    if len(data) - holdout < 2 * lookback + steps:
+        return data, None
+    return data[:-holdout], data[-(holdout + lookback):]
+
+
+def mean_mae(report):
+    """One number to compare models by: MAE averaged over the backtested horizons"""
+    return float(np.mean([entry['mae'] for entry in report['horizons'].values()]))
+
+
+def score(predicted, observed, horizons=HORIZONS):
+    """MAE / RMSE / bias per horizon over steps 1..h, overall and by the observed value's AQI category"""
+    errors = predicted - observed
+    categories = np.searchsorted(AQI_BREAKPOINTS, observed, side='left')
+    report = {}
+    for horizon in horizons:
+        error = errors[:, :horizon]
+        category = categories[:, :horizon]
+        entry = _errors(error)
+        entry['by_category'] = {
+            AQI_CATEGORIES[index]['category']: _errors(error[category == index])
+            for index in np.unique(category)
+        }
+        report[str(horizon)] = entry
+    return report
+
+
+def _errors(error):
+    return {
+        'mae': round(float(np.abs(error).mean()), 4),
+        'rmse': round(float(np.sqrt(np.square(error).mean())), 4),
+        'bias': round(float(error.mean()), 4),
+        'count': int(error.size)
+    }
+
+
+def rollout(predictor, windows, steps, batch_size):
+    """AQI forecasts for every window, `batch_size` windows per batched rollout"""
+    chunks = []
+    for start in range(0, len(windows), batch_size):
+        predictions = predictor.predict_batch(windows[start:start + batch_size], steps=steps, decode=AQILSTMPredictor.SERVING_DECODE)
+        chunks.append(predictions[..., 0] if predictor.multivariate else predictions)
+    return np.concatenate(chunks)
+
+
+_worker_predictor = None
+
+
+def _init_worker(artifact, threads):
+    global _worker_predictor
+    import torch
+    torch.set_num_threads(threads)
+    _worker_predictor = AQILSTMPredictor()
+    _worker_predictor.load_artifact(artifact, mmap=True)
+
+
+def _worker_rollout(windows, steps, batch_size):
+    return rollout(_worker_predictor, windows, steps, batch_size)
+
+
+def walk_forward(predictor, data, horizons=HORIZONS, stride=1, max_cutoffs=None, batch_size=2048, workers=1):
+    """Backtest `predictor` on a series ((N,) AQI, or (N, C) for a multivariate model), or on a list of
+    them (one per sensor) with no window spanning two; returns the report dict"""
+    # No dtype conversion: a memory-mapped history stays on disk, and only the selected windows are copied
+    steps = max(horizons)
+    windows, observed, cutoffs = forecast_windows(data, predictor.lookback, steps, stride, max_cutoffs)
+    if len(cutoffs) == 0:
+        raise ValueError(f"Need at least {predictor.lookback + steps} points to backtest a {steps}-step horizon")
+
+    started = time.perf_counter()
+    if workers > 1:
+        predicted = _parallel_rollout(predictor, windows, steps, batch_size, workers)
+    else:
+        predicted = rollout(predictor, windows, steps, batch_size)
+    elapsed = time.perf_counter() - started
+
+    return {
+        'cutoffs': int(len(cutoffs)),
+        'first_cutoff': int(cutoffs[0]),
+        'last_cutoff': int(cutoffs[-1]),
+        'horizons': score(predicted, observed, horizons),
+        'seconds': round(elapsed, 3),
+        'cutoffs_per_s': round(len(cutoffs) / elapsed, 1),
+        'workers': workers
+    }
+
+
+def _parallel_rollout(predictor, windows, steps, batch_size, workers):
+    # Workers load the weights from an artifact (memory-mapped) rather than receiving a pickled model
+    with tempfile.TemporaryDirectory() as tmp:
+        artifact = os.path.join(tmp, 'backtest_model.pt')
+        predictor.save_artifact(artifact)
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        chunks = np.array_split(windows, workers)
+        # Spawned, not forked: the parent has already used torch's thread pool
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_worker, initargs=(artifact, threads)) as pool:
+            results = pool.map(_worker_rollout, chunks, [steps] * workers, [batch_size] * workers)
+            return np.concatenate(list(results))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--artifact', default='models/aqi_lstm_model.pt')
+    parser.add_argument('--history', help='backtest on the on-disk history store at this root')
+    parser.add_argument('--synthetic', type=int, default=20000, help='points of synthetic AQI when no history is given')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--stride', type=int, default=1)
+    parser.add_argument('--max-cutoffs', type=int, default=5000)
+    parser.add_argument('--batch-size', type=int, default=2048)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--output', default='backtest.json')
+    args = parser.parse_args(argv)
+
+    predictor = AQILSTMPredictor()
+    predictor.load_artifact(args.artifact)
+    if args.history:
+        from history_store import HistoryStore
+        data = HistoryStore(args.history).sensor_series(channels=predictor.channels)
+    else:
+        from synthetic_data import generate_aqi, synthetic_pollutants
+        aqi = generate_aqi(points=args.synthetic, seed=args.seed)[0]
+        data = np.column_stack([aqi, synthetic_pollutants(aqi, predictor.channels[1:], seed=args.seed)]) if predictor.multivariate else aqi
+
+    report = walk_forward(predictor, data, stride=args.stride, max_cutoffs=args.max_cutoffs,
+                          batch_size=args.batch_size, workers=args.workers)
+    report['model_version'] = predictor.model_version
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\n📊 {report['cutoffs']} cutoffs in {report['seconds']:.2f}s ({report['cutoffs_per_s']:.0f}/s)")
+    for horizon, entry in report['horizons'].items():
+        print(f"  {horizon:>3} steps  MAE {entry['mae']:7.2f}  RMSE {entry['rmse']:7.2f}  bias {entry['bias']:+7.2f}")
+    print(f"\n📁 Results saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Reproducible performance benchmarks for the ML service, written as JSON for comparison across commits
+
+Covers predict_sequence latency (7/28/90 steps, both decode modes), predict_all, /predict
+throughput at several concurrency levels against an in-memory Firebase stand-in, training
+throughput, cold load time and peak RSS. The model is a seeded random-weight network unless
+an artifact is given, so numbers depend only on the code and the machine.
+
+Usage:
+    python benchmark.py [--quick] [--artifact models/aqi_lstm_model.pt] [--output benchmark.json]
+    python benchmark.py --compare before.json after.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+import numpy as np
+
+STEPS = (7, 28, 90)
+CONCURRENCY = (1, 4, 16)
+
+
+def peak_rss_mb():
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def summarize(samples):
+    """Latency percentiles in milliseconds from a list of seconds"""
+    ms = np.asarray(samples) * 1000
+    return {
+        'mean_ms': round(float(ms.mean()), 3),
+        'p50_ms': round(float(np.percentile(ms, 50)), 3),
+        'p95_ms': round(float(np.percentile(ms, 95)), 3),
+        'runs': len(ms)
+    }
+
+
+def timed(fn, repeats, warmup=2):
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def build_artifact(path, seed=0):
+    """A seeded random-weight model with a realistic scaler range"""
+    import torch
+    from aqi_lstm_model import AQILSTMPredictor, ArrayScaler
+    torch.manual_seed(seed)
+    predictor = AQILSTMPredictor(lookback=30)
+    predictor.create_model()
+    predictor.scaler = ArrayScaler().fit(np.array([[20.0], [400.0]]))
+    predictor.save_artifact(path, metadata={'benchmark_seed': seed})
+    return path
+
+
+def bench_load(artifact):
+    """Cold start in a fresh interpreter: import torch + the model module, then load the artifact"""
+    script = (
+        "import time; start = time.perf_counter()\n"
+        "from aqi_lstm_model import AQILSTMPredictor\n"
+        "imported = time.perf_counter()\n"
+        "predictor = AQILSTMPredictor(lookback=30, decode='stateful')\n"
+        f"predictor.load_artifact({artifact!r})\n"
+        "print(imported - start, time.perf_counter() - imported)\n"
+    )
+    result = subprocess.run(
+        [sys.executable, '-c', script], capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    import_s, load_s = map(float, result.stdout.strip().splitlines()[-1].split())
+    return {'import_ms': round(import_s * 1000, 1), 'artifact_load_ms': round(load_s * 1000, 1)}
+
+
+def bench_predict_sequence(predictor, window, repeats):
+    results = {}
+    for decode in predictor.DECODE_MODES:
+        results[decode] = {
+            str(steps): timed(lambda: predictor.predict_sequence(window, steps=steps, decode=decode), repeats)
+            for steps in STEPS
+        }
+    return results
+
+
+def make_service(artifact, sensors, seed, root):
+    """A service on synthetic readings whose registry and model directories are under `root`, so no
+    model or registry entry lying around the working directory gets into the results"""
+    from local_firebase import InMemoryDB
+    from predict_service import AQIPredictionService
+    from synthetic_data import generate_readings
+    db = InMemoryDB({'readings': generate_readings(sensors=sensors, points=48, seed=seed)})
+    service = AQIPredictionService(db_module=db, registry_root=os.path.join(root, 'registry'),
+                                   model_dir=os.path.join(root, 'models'))
+    service.predictor.load_artifact(artifact)
+    service.readings.sync()
+    return service
+
+
+def bench_predict_all(service, repeats):
+    return timed(service.predict_all, repeats)
+
+
+async def drive(client, sensors, requests, concurrency):
+    """Issue `requests` GET /predict calls, `concurrency` at a time, cycling through sensors"""
+    gate = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i):
+        async with gate:
+            start = time.perf_counter()
+            response = await client.get('/predict', params={'sensor': sensors[i % len(sensors)]})
+            latencies.append(time.perf_counter() - start)
+            return response.status_code
+
+    start = time.perf_counter()
+    statuses = await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    return {
+        'requests_per_s': round(requests / elapsed, 1),
+        'ok': statuses.count(200),
+        'rejected': statuses.count(503),
+        **summarize(latencies)
+    }
+
+
+def bench_api(service, requests, concurrency_levels=CONCURRENCY):
+    """/predict through the real FastAPI app and inference pool, with the response cache off and on"""
+    import httpx
+    import main
+    from fastapi import HTTPException
+    from inference_pool import PoolSaturated
+    from prediction_cache import PredictionCache
+
+    async def uncached(key, compute):
+        # Bypasses the cache altogether; even a zero-TTL cache would share one computation between
+        # concurrent requests for the same sensor
+        try:
+            return await compute()
+        except PoolSaturated:
+            raise HTTPException(status_code=503, detail="Prediction service busy, retry shortly")
+
+    originals = {name: getattr(main, name)
+                 for name in ('service', 'service_loaded', 'refresher', 'cached', 'prediction_cache')}
+    main.service = service
+    main.service_loaded = threading.Event()
+    main.service_loaded.set()
+    main.refresher = None
+    sensors = list(service.readings.sensors())
+    transport = httpx.ASGITransport(app=main.app)
+
+    async def run():
+        results = {}
+        async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+            for label, cached in (('uncached', uncached), ('cached', originals['cached'])):
+                main.cached = cached
+                main.prediction_cache = PredictionCache(ttl=60)
+                results[label] = {
+                    str(concurrency): await drive(client, sensors, requests, concurrency)
+                    for concurrency in concurrency_levels
+                }
+        return results
+
+    try:
+        return asyncio.run(run())
+    finally:
+        for name, value in originals.items():
+            setattr(main, name, value)
+
+
+def bench_training(points, epochs, batch_size, seed):
+    import torch
+    from aqi_lstm_model import AQILSTMPredictor
+    from synthetic_data import generate_aqi
+    torch.manual_seed(seed)
+    series = generate_aqi(points=points, seed=seed)[0]
+    predictor = AQILSTMPredictor(lookback=30)
+    start = time.perf_counter()
+    predictor.train(series, epochs=epochs, batch_size=batch_size)
+    elapsed = time.perf_counter() - start
+    windows = (points - predictor.lookback) * epochs
+    return {'points': points, 'epochs': epochs, 'batch_size': batch_size,
+            'windows_per_s': round(windows / elapsed, 1), 'seconds': round(elapsed, 2)}
+
+
+def environment():
+    import torch
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ''
+    return {
+        'commit': commit or None,
+        'python': platform.python_version(),
+        'torch': torch.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'torch_threads': torch.get_num_threads()
+    }
+
+
+def run_benchmarks(artifact=None, quick=False, seed=0):
+    """Run every benchmark and return the results dict"""
+    repeats = 5 if quick else 30
+    with tempfile.TemporaryDirectory() as tmp:
+        artifact = artifact or build_artifact(os.path.join(tmp, 'benchmark_model.pt'), seed)
+        results = {
+            'created_at': datetime.now().isoformat(),
+            'quick': quick,
+            'seed': seed,
+            'artifact': artifact if not artifact.startswith(tmp) else 'random-weights',
+            'environment': environment(),
+            'load': bench_load(artifact)
+        }
+
+        from aqi_lstm_model import AQILSTMPredictor
+        from synthetic_data import generate_aqi
+        predictor = AQILSTMPredictor(lookback=30, decode='stateful')
+        predictor.load_artifact(artifact)
+        window = generate_aqi(points=30, seed=seed)[0]
+        results['predict_sequence'] = bench_predict_sequence(predictor, window, repeats)
+
+        service = make_service(artifact, sensors=4 if quick else 16, seed=seed, root=tmp)
+        try:
+            results['predict_all'] = bench_predict_all(service, repeats)
+            results['api_predict'] = bench_api(service, requests=16 if quick else 200)
+        finally:
+            service.batcher.stop()
+
+        results['training'] = bench_training(
+            points=1000 if quick else 20000, epochs=1 if quick else 3, batch_size=32, seed=seed
+        )
+    results['peak_rss_mb'] = peak_rss_mb()
+    return results
+
+
+def flatten(results, prefix=''):
+    """Numeric leaves as {'a.b.c': value}"""
+    flat = {}
+    for key, value in results.items():
+        name = f'{prefix}{key}'
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + '.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(before_path, after_path):
+    """Print every metric present in both result files with its relative change"""
+    with open(before_path) as f:
+        before = flatten(json.load(f))
+    with open(after_path) as f:
+        after = flatten(json.load(f))
+    print(f"{'metric':<55}{'before':>12}{'after':>12}{'change':>9}")
+    for name in sorted(set(before) & set(after)):
+        if name in ('seed',) or name.endswith('.runs') or name.endswith('cpus'):
+            continue
+        old, new = before[name], after[name]
+        change = f"{(new - old) / old * 100:+.1f}%" if old else 'n/a'
+        print(f"{name:<55}{old:>12}{new:>12}{change:>9}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--artifact', help='benchmark a trained artifact instead of a seeded random-weight model')
+    parser.add_argument('--output', default='benchmark.json')
+    parser.add_argument('--quick', action='store_true', help='fewer repeats and smaller workloads')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'))
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    results = run_benchmarks(args.artifact, args.quick, args.seed)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(f"\n{'predict_sequence (stateful)':<32}" + ''.join(f"{steps:>4} steps p50 {results['predict_sequence']['stateful'][str(steps)]['p50_ms']:>7.2f} ms  " for steps in STEPS))
+    print(f"{'predict_all':<32}p50 {results['predict_all']['p50_ms']:.2f} ms")
+    for concurrency, row in results['api_predict']['uncached'].items():
+        print(f"{'/predict uncached c=' + concurrency:<32}{row['requests_per_s']:>8.1f} req/s  p95 {row['p95_ms']:.1f} ms")
+    print(f"{'training':<32}{results['training']['windows_per_s']:>8.1f} windows/s")
+    print(f"{'cold load':<32}import {results['load']['import_ms']:.0f} ms + artifact {results['load']['artifact_load_ms']:.0f} ms")
+    print(f"{'peak RSS':<32}{results['peak_rss_mb']:.1f} MB")
+    print(f"\n📁 Results saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
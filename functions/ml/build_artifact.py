@@ -0,0 +1,16 @@
+#!/usr/bin/env python3
+"""
+Convert the legacy model + pickled scaler pair into a self-contained inference artifact
+"""
+
+import sys
+from aqi_lstm_model import AQILSTMPredictor
+
+def build_artifact(model_path='models/aqi_lstm_model.pth', scaler_path='models/aqi_scaler.pkl',
+                   artifact_path='models/aqi_lstm_model.pt'):
+    predictor = AQILSTMPredictor(lookback=30)
+    predictor.load_model(model_path, scaler_path)
+    predictor.save_artifact(artifact_path, metadata={'source': [model_path, scaler_path]})
+
+if __name__ == '__main__':
+    build_artifact(*sys.argv[1:4])
@@ -0,0 +1,29 @@
+"""
+Shared fixtures for the API tests
+"""
+
+import threading
+import pytest
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """Installs a prediction service as main's loaded service and returns the main module
+
+    main's globals are restored and the installed services' batchers stopped after the test.
+    """
+    import main
+    services = []
+
+    def install(service, refresher=None):
+        loaded = threading.Event()
+        loaded.set()
+        monkeypatch.setattr(main, 'service', service)
+        monkeypatch.setattr(main, 'service_loaded', loaded)
+        monkeypatch.setattr(main, 'refresher', refresher)
+        services.append(service)
+        return main
+
+    yield install
+    for service in services:
+        service.batcher.stop()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Export the trained model to TorchScript and/or ONNX and check the exports against the eager model
+
+Usage: python export_model.py [torchscript|onnx|all] [artifact_path]
+"""
+
+import sys
+import numpy as np
+from aqi_lstm_model import AQILSTMPredictor
+from inference_backends import export_onnx, export_torchscript, exported_path
+
+def check_equivalence(predictor, kind, path, windows, steps=90):
+    """Largest AQI difference between eager and exported rollouts, over both decode modes"""
+    worst = 0.0
+    for decode in AQILSTMPredictor.DECODE_MODES:
+        predictor.use_backend('eager')
+        eager = predictor.predict_batch(windows, steps=steps, decode=decode)
+        predictor.use_backend(kind, path)
+        exported = predictor.predict_batch(windows, steps=steps, decode=decode)
+        worst = max(worst, float(np.abs(eager - exported).max()))
+    predictor.use_backend('eager')
+    return worst
+
+def export_model(formats=('torchscript', 'onnx'), artifact_path='models/aqi_lstm_model.pt', tolerance=0.01, samples=16):
+    """Export every requested format next to the artifact; returns True when all of them match"""
+    predictor = AQILSTMPredictor(lookback=30)
+    predictor.load_artifact(artifact_path)
+    model = predictor.model.cpu()
+
+    # Random windows spanning the range the scaler was fitted on
+    rng = np.random.default_rng(0)
+    low, high = predictor.scaler.data_min_, predictor.scaler.data_max_
+    windows = rng.uniform(low, high, size=(samples, predictor.lookback, len(predictor.channels)))
+    if not predictor.multivariate:
+        windows = windows[..., 0]
+
+    all_match = True
+    for kind in formats:
+        path = exported_path(artifact_path, kind)
+        if kind == 'torchscript':
+            export_torchscript(model, path, model_version=predictor.model_version)
+        else:
+            export_onnx(model, path, lookback=predictor.lookback, model_version=predictor.model_version)
+        diff = check_equivalence(predictor, kind, path, windows)
+        if diff <= tolerance:
+            print(f"✅ {kind} export written to {path} (max |Δ| vs eager: {diff:.2e} AQI)")
+        else:
+            print(f"❌ {kind} export differs from eager by {diff:.4f} AQI (tolerance {tolerance})")
+            all_match = False
+    return all_match
+
+if __name__ == '__main__':
+    choice = sys.argv[1] if len(sys.argv) > 1 else 'all'
+    formats = ('torchscript', 'onnx') if choice == 'all' else (choice,)
+    if any(kind not in ('torchscript', 'onnx') for kind in formats):
+        print(f"❌ Unknown export format: {choice} (expected torchscript, onnx or all)")
+        sys.exit(2)
+    artifact = sys.argv[2] if len(sys.argv) > 2 else 'models/aqi_lstm_model.pt'
+    sys.exit(0 if export_model(formats, artifact) else 1)
@@ -0,0 +1,31 @@
+"""
+Firebase Admin initialization shared by the API and the readings fetcher process
+"""
+
+import logging
+import os
+
+logger = logging.getLogger('aqi_api')
+
+SERVICE_ACCOUNT_KEY = 'serviceAccountKey.json'
+DATABASE_URL = 'https://delhibreathe-default-rtdb.firebaseio.com'
+
+
+def init_firebase():
+    """Initialize Firebase if a service account key is available"""
+    import firebase_admin
+    from firebase_admin import credentials
+
+    if firebase_admin._apps:
+        return True
+    if not os.path.exists(SERVICE_ACCOUNT_KEY):
+        logger.warning("serviceAccountKey.json not found, using simulation mode")
+        return False
+    try:
+        cred = credentials.Certificate(SERVICE_ACCOUNT_KEY)
+        firebase_admin.initialize_app(cred, {'databaseURL': DATABASE_URL})
+        logger.info("Firebase initialized")
+        return True
+    except Exception as e:
+        logger.error("Firebase initialization failed", extra={'error': str(e)})
+        return False
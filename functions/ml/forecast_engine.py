@@ -0,0 +1,100 @@
+"""
+Forecast engine: a single autoregressive rollout shared by every horizon view
+"""
+
+import numpy as np
+
+# Number of periods returned for each view
+DEFAULT_HORIZONS = {'daily': 7, 'weekly': 4, 'monthly': 3}
+
+# Number of daily steps averaged into one period of each view
+DAYS_PER_PERIOD = {'daily': 1, 'weekly': 7, 'monthly': 30}
+
+
+def rollout_steps(horizons):
+    """Daily steps needed to cover every requested view"""
+    return max(count * DAYS_PER_PERIOD[view] for view, count in horizons.items())
+
+
+def aggregate_views(daily, horizons):
+    """Average daily trajectories (shape (steps,) or (B, steps)) into the requested views"""
+    daily = np.asarray(daily)
+    views = {}
+    for view, count in horizons.items():
+        period = DAYS_PER_PERIOD[view]
+        trajectory = daily[..., :count * period]
+        views[view] = trajectory.reshape(trajectory.shape[:-1] + (count, period)).mean(axis=-1)
+    return views
+
+
+def _select(views, i):
+    """Row i of every array in a (possibly nested) views dict"""
+    return {key: _select(value, i) if isinstance(value, dict) else value[i] for key, value in views.items()}
+
+
+class ForecastEngine:
+    def __init__(self, predictor):
+        self.predictor = predictor
+
+    def forecast(self, recent_data, horizons=None):
+        """Roll the model forward once and build daily, weekly and monthly views from it"""
+        horizons = self._check(horizons)
+        daily = self.predictor.predict_sequence(recent_data, steps=rollout_steps(horizons))
+        return self._views(daily, horizons)
+
+    def views(self, daily, horizons=None):
+        """Daily, weekly and monthly views of a rollout that has already run"""
+        return self._views(daily, self._check(horizons))
+
+    def forecast_batch(self, windows, horizons=None):
+        """Forecast many windows (e.g. one per sensor) in one batched rollout; returns one views dict per window"""
+        horizons = self._check(horizons)
+        daily = self.predictor.predict_batch(np.stack(windows), steps=rollout_steps(horizons))
+        views = self._views(daily, horizons)
+        return [_select(views, i) for i in range(len(windows))]
+
+    def forecast_distribution(self, windows, horizons=None, samples=32, interval=0.95, seed=None):
+        """Mean and central `interval` band per view from MC-dropout trajectories, one views dict per window"""
+        horizons = self._check(horizons)
+        trajectories = self.predictor.predict_samples(np.stack(windows), steps=rollout_steps(horizons), samples=samples, seed=seed)
+        pollutants = None
+        if trajectories.ndim == 4:
+            # Bands are for AQI; pollutant channels report the mean of their sampled trajectories
+            pollutants = self._views(trajectories.mean(axis=1), horizons)['pollutants']
+            trajectories = trajectories[..., 0]
+        # Aggregate each sampled trajectory before taking quantiles, so weekly/monthly bands reflect averaged paths
+        views = aggregate_views(trajectories, horizons)
+        tail = (1 - interval) / 2
+        distributions = {
+            view: (values.mean(axis=1), np.quantile(values, [tail, 1 - tail], axis=1))
+            for view, values in views.items()
+        }
+        results = [
+            {view: {'mean': mean[i], 'lower': bounds[0, i], 'upper': bounds[1, i]} for view, (mean, bounds) in distributions.items()}
+            for i in range(len(windows))
+        ]
+        if pollutants is not None:
+            for i, result in enumerate(results):
+                result['pollutants'] = _select(pollutants, i)
+        return results
+
+    def _views(self, daily, horizons):
+        """AQI views of a rollout, plus a 'pollutants' entry per extra channel for multivariate models"""
+        channels = getattr(self.predictor, 'channels', ('aqi',))
+        if len(channels) == 1:
+            return aggregate_views(daily, horizons)
+        # (..., steps, C) -> (..., C, steps) so every channel is averaged in the same pass
+        per_channel = aggregate_views(np.moveaxis(daily, -1, -2), horizons)
+        views = {view: values[..., 0, :] for view, values in per_channel.items()}
+        views['pollutants'] = {
+            channel: {view: values[..., i, :] for view, values in per_channel.items()}
+            for i, channel in enumerate(channels) if i > 0
+        }
+        return views
+
+    def _check(self, horizons):
+        horizons = horizons or DEFAULT_HORIZONS
+        unknown = set(horizons) - set(DAYS_PER_PERIOD)
+        if unknown:
+            raise ValueError(f"Unknown forecast views: {sorted(unknown)}")
+        return horizons
@@ -0,0 +1,180 @@
+"""
+Background forecast refresher: recomputes predictions when new readings arrive, so requests only do a lookup
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class ForecastRefresher:
+    """Debounced, rate-limited recomputation of the overall and per-sensor forecasts
+
+    `notify()` marks the forecasts stale. The refresher waits until no new notification has
+    arrived for `debounce` seconds and never starts two refreshes within `min_interval` seconds,
+    then runs predict_all and predict_batch off the request path. Results are kept in memory
+    and, when `write_path` is set, written to Firebase for the frontend to read directly.
+    """
+
+    def __init__(self, service, debounce=2.0, min_interval=30.0, write_path=None, db_module=None, clock=time.monotonic):
+        self.service = service
+        self.debounce = debounce
+        self.min_interval = min_interval
+        self.write_path = write_path
+        self.latest = None
+        self.refreshes = 0
+        self.failures = 0
+        self.last_refresh = None
+        self.last_duration = None
+        self.last_error = None
+        self._db = db_module
+        self._clock = clock
+        self._last_notify = None
+        self._last_start = None
+        self._pending = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def db(self):
+        if self._db is None:
+            from firebase_admin import db
+            self._db = db
+        return self._db
+
+    def notify(self, *args):
+        """Forecasts are stale; usable directly as a ReadingsStore listener"""
+        self._last_notify = self._clock()
+        self._pending.set()
+
+    def start(self):
+        """Refresh once now, then whenever notified"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self.notify()
+        self._last_notify = None
+        self._thread = threading.Thread(target=self._run, name='forecast-refresher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._pending.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def refresh(self):
+        """Recompute every forecast now; returns True when the results were replaced"""
+        self._last_start = self._clock()
+        started = time.perf_counter()
+        try:
+            data_version = self.service.data_version()
+            overall = self.service.predict_all()
+            batch = self.service.predict_batch()
+            if not overall.get('success') or not batch.get('success'):
+                raise RuntimeError(overall.get('error') or batch.get('error'))
+            self.latest = {
+                'data_version': data_version,
+                'model_version': overall['model_version'],
+                'overall': overall,
+                'batch': batch
+            }
+            if self.write_path:
+                self.db.reference(self.write_path).set(self.payload())
+            self.refreshes += 1
+            self.last_error = None
+            return True
+        except Exception as e:
+            self.failures += 1
+            self.last_error = str(e)
+            logger.warning("Forecast refresh failed", extra={'error': str(e), 'failures': self.failures})
+            return False
+        finally:
+            self.last_duration = time.perf_counter() - started
+            self.last_refresh = datetime.now().isoformat()
+
+    def payload(self):
+        """The latest forecasts in a Firebase-safe shape (sensor ids contain '.', so sensors are a list)"""
+        latest = self.latest
+        return {
+            'updated_at': datetime.now().isoformat(),
+            'data_version': latest['data_version'],
+            'model_version': latest['model_version'],
+            'predictions': latest['overall']['predictions'],
+            'sensors': [
+                {'id': sid, 'location': entry['location'], 'predictions': entry['predictions']}
+                for sid, entry in latest['batch']['sensors'].items()
+            ]
+        }
+
+    def lookup(self, sensor=None):
+        """Precomputed /predict response for the loaded model, or None to fall back to computing it"""
+        latest = self._current()
+        if latest is None:
+            return None
+        if sensor is None:
+            return latest['overall']
+        entry = latest['batch']['sensors'].get(sensor)
+        if entry is None:
+            return None
+        return {
+            'success': True,
+            'predictions': entry['predictions'],
+            'uncertainty': latest['batch']['uncertainty'],
+            'model_version': latest['model_version']
+        }
+
+    def lookup_batch(self, sensors=None):
+        """Precomputed /predict/batch response; None if any requested sensor was not part of the last refresh"""
+        latest = self._current()
+        if latest is None:
+            return None
+        batch = latest['batch']
+        if sensors is None:
+            return batch
+        if any(sid not in batch['sensors'] for sid in sensors):
+            return None
+        return {**batch, 'sensors': {sid: batch['sensors'][sid] for sid in sensors}, 'missing': []}
+
+    def stats(self):
+        latest = self.latest
+        return {
+            'refreshes': self.refreshes,
+            'failures': self.failures,
+            'pending': self._pending.is_set(),
+            'last_refresh': self.last_refresh,
+            'last_duration_ms': round(self.last_duration * 1000, 1) if self.last_duration is not None else None,
+            'data_version': latest['data_version'] if latest else None,
+            'last_error': self.last_error
+        }
+
+    def _current(self):
+        latest = self.latest
+        # A reloaded model invalidates everything computed with the previous one
+        if latest is None or latest['model_version'] != self.service.predictor.model_version:
+            return None
+        return latest
+
+    def _run(self):
+        while True:
+            self._pending.wait()
+            if self._stop.is_set():
+                return
+            # Debounce: wait for a quiet period so a burst of readings causes one refresh
+            while self._last_notify is not None:
+                quiet = self._last_notify + self.debounce - self._clock()
+                if quiet <= 0:
+                    break
+                if self._stop.wait(quiet):
+                    return
+            # Rate limit: at most one refresh per min_interval
+            if self._last_start is not None:
+                wait = self._last_start + self.min_interval - self._clock()
+                if wait > 0 and self._stop.wait(wait):
+                    return
+            self._pending.clear()
+            self.refresh()
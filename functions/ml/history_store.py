@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Append-only, day-partitioned columnar history of readings, stored as memory-mappable .npy segments
+
+Layout under the store root:
+    manifest.json                          channels, last synced key and the segment list
+    2026-10-18/000003.values.npy           (N, C) float32 reading channels
+    2026-10-18/000003.time.npy             (N,) float64 epoch seconds
+    2026-10-18/000003.sensor.npy           (N,) sensor ids
+    cache/<hash>.npy                       contiguous training series built from the segments
+
+Usage: python history_store.py [sync|compact|info] [root]
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+import numpy as np
+from readings_store import READING_CHANNELS, reading_features, sensor_id
+
+SEGMENT_COLUMNS = ('values', 'time', 'sensor')
+
+
+def reading_times(readings, default=None):
+    """Epoch seconds per reading; millisecond timestamps are converted, missing ones use `default`"""
+    default = time.time() if default is None else default
+    times = np.array([reading.get('timestamp', np.nan) for reading in readings], dtype=np.float64)
+    # Anything past the year 5000 in seconds is really milliseconds
+    times = np.where(times > 1e11, times / 1000, times)
+    return np.where(np.isnan(times), default, times)
+
+
+class HistoryStore:
+    """Readings history on local disk: sync appends new segments, reads memory-map them"""
+
+    def __init__(self, root='data/history', path='/readings', db_module=None, page_size=5000):
+        self.root = root
+        self.path = path
+        self.page_size = page_size
+        self._db = db_module
+        self.manifest = self._load_manifest()
+
+    @property
+    def db(self):
+        if self._db is None:
+            from firebase_admin import db
+            self._db = db
+        return self._db
+
+    @property
+    def last_key(self):
+        return self.manifest['last_key']
+
+    def rows(self, start=None, end=None):
+        return sum(entry['rows'] for entry in self.segments(start, end))
+
+    def segments(self, start=None, end=None):
+        """Segment entries in chronological order, optionally limited to days in [start, end] ('YYYY-MM-DD')"""
+        return [
+            entry for entry in self.manifest['segments']
+            if (start is None or entry['day'] >= start) and (end is None or entry['day'] <= end)
+        ]
+
+    def sync(self):
+        """Pull readings newer than the last synced key, one page at a time; returns how many were stored"""
+        added = 0
+        while True:
+            query = self.db.reference(self.path).order_by_key()
+            if self.last_key is not None:
+                # start_at is inclusive, so ask for one extra and drop the key we already have
+                query = query.start_at(self.last_key)
+            data = query.limit_to_first(self.page_size + (self.last_key is not None)).get() or {}
+            keys = [key for key in sorted(data) if key != self.last_key]
+            if not keys:
+                return added
+            readings = [data[key] for key in keys]
+            added += self.append(readings, last_key=keys[-1])
+            if len(keys) < self.page_size:
+                return added
+
+    def append(self, readings, last_key=None):
+        """Write readings (dicts with at least 'aqi') as new segments, one per day they fall on"""
+        readings = [reading for reading in readings if isinstance(reading, dict) and 'aqi' in reading]
+        if readings:
+            values = reading_features(readings, self.manifest['channels']).astype(np.float32)
+            times = reading_times(readings)
+            sensors = np.array([sensor_id(reading) or '' for reading in readings], dtype=str)
+            days = times.astype('datetime64[s]').astype('datetime64[D]').astype(str)
+            for day in np.unique(days):
+                rows = days == day
+                self._write_segment(str(day), values[rows], times[rows], sensors[rows])
+        if last_key is not None:
+            self.manifest['last_key'] = last_key
+        self._save_manifest()
+        return len(readings)
+
+    def load_segment(self, entry):
+        """The segment's columns, memory-mapped read-only"""
+        return {
+            column: np.load(self._segment_path(entry['file'], column), mmap_mode='r')
+            for column in SEGMENT_COLUMNS
+        }
+
+    def sensors(self, start=None, end=None):
+        """Ids of the sensors with readings in the given days, sorted ('' for readings without a location)"""
+        found = set()
+        for entry in self.segments(start, end):
+            found.update(np.unique(self.load_segment(entry)['sensor']).tolist())
+        return sorted(found)
+
+    def sensor_series(self, channels=('aqi',), start=None, end=None):
+        """One series per sensor, for training and backtesting: windows over series() would run across devices"""
+        return [self.series(channels, sensor=sensor, start=start, end=end) for sensor in self.sensors(start, end)]
+
+    def series(self, channels=('aqi',), sensor=None, start=None, end=None):
+        """Readings as one contiguous float32 array, (N,) for one channel or (N, C), memory-mapped from disk
+
+        The series is assembled segment by segment into a cache file the first time it is asked
+        for, so it never has to fit in RAM. Rows missing any requested channel are skipped.
+        """
+        columns = [self.manifest['channels'].index(channel) for channel in channels]
+        entries = self.segments(start, end)
+        key = hashlib.sha256(json.dumps([entries, columns, sensor]).encode()).hexdigest()[:16]
+        path = os.path.join(self.root, 'cache', f'{key}.npy')
+        if not os.path.exists(path):
+            self._build_series(path, entries, columns, sensor)
+        series = np.load(path, mmap_mode='r')
+        return series[:, 0] if len(columns) == 1 else series
+
+    def compact(self):
+        """Merge each day's segments into one, so reads open one file per day"""
+        by_day = {}
+        for entry in self.manifest['segments']:
+            by_day.setdefault(entry['day'], []).append(entry)
+        merged = 0
+        for day, entries in by_day.items():
+            if len(entries) < 2:
+                continue
+            parts = [self.load_segment(entry) for entry in entries]
+            self._write_segment(
+                day, *(np.concatenate([part[column] for part in parts]) for column in SEGMENT_COLUMNS),
+                replaces=entries
+            )
+            merged += len(entries)
+        self._save_manifest()
+        return merged
+
+    def _build_series(self, path, entries, columns, sensor):
+        masks = []
+        for entry in entries:
+            segment = self.load_segment(entry)
+            keep = ~np.isnan(segment['values'][:, columns]).any(axis=1)
+            if sensor is not None:
+                keep &= segment['sensor'] == sensor
+            masks.append(keep)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        partial = path + '.partial.npy'
+        out = np.lib.format.open_memmap(partial, mode='w+', dtype=np.float32, shape=(int(sum(m.sum() for m in masks)), len(columns)))
+        row = 0
+        for entry, keep in zip(entries, masks):
+            chunk = self.load_segment(entry)['values'][keep][:, columns]
+            out[row:row + len(chunk)] = chunk
+            row += len(chunk)
+        out.flush()
+        del out
+        os.replace(partial, path)
+
+    def _write_segment(self, day, values, times, sensors, replaces=()):
+        number = self.manifest['next_segment']
+        self.manifest['next_segment'] += 1
+        name = os.path.join(day, f'{number:06d}')
+        os.makedirs(os.path.join(self.root, day), exist_ok=True)
+        for column, array in zip(SEGMENT_COLUMNS, (values, times, sensors)):
+            np.save(self._segment_path(name, column), array)
+        entry = {'day': day, 'file': name, 'rows': int(len(values))}
+        segments = [existing for existing in self.manifest['segments'] if existing not in replaces]
+        segments.append(entry)
+        self.manifest['segments'] = sorted(segments, key=lambda existing: (existing['day'], existing['file']))
+        for old in replaces:
+            for column in SEGMENT_COLUMNS:
+                os.remove(self._segment_path(old['file'], column))
+
+    def _segment_path(self, name, column):
+        return os.path.join(self.root, f'{name}.{column}.npy')
+
+    def _load_manifest(self):
+        path = os.path.join(self.root, 'manifest.json')
+        if os.path.exists(path):
+            with open(path) as f:
+                return json.load(f)
+        return {'channels': list(READING_CHANNELS), 'last_key': None, 'next_segment': 0, 'segments': []}
+
+    def _save_manifest(self):
+        os.makedirs(self.root, exist_ok=True)
+        # Cached series were built from the old segment list
+        shutil.rmtree(os.path.join(self.root, 'cache'), ignore_errors=True)
+        path = os.path.join(self.root, 'manifest.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(path + '.tmp', path)
+
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else 'sync'
+    store = HistoryStore(sys.argv[2] if len(sys.argv) > 2 else 'data/history')
+    if command == 'sync':
+        from train_model import initialize_firebase
+        if not initialize_firebase():
+            sys.exit(1)
+        added = store.sync()
+        print(f"✅ Synced {added} new readings (last key: {store.last_key})")
+        merged = store.compact()
+        if merged:
+            print(f"🗜️ Compacted {merged} segments")
+    elif command == 'compact':
+        print(f"🗜️ Compacted {store.compact()} segments")
+    elif command == 'info':
+        days = sorted({entry['day'] for entry in store.segments()})
+        print(f"📚 {store.rows()} readings in {len(store.segments())} segments"
+              + (f" from {days[0]} to {days[-1]}" if days else ""))
+        print(f"🔑 Last synced key: {store.last_key}")
+    else:
+        print(f"❌ Unknown command: {command} (expected sync, compact or info)")
+        sys.exit(2)
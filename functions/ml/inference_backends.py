@@ -0,0 +1,125 @@
+"""
+Alternative inference backends for the per-step LSTM network: TorchScript and ONNX Runtime
+"""
+
+import os
+import warnings
+import numpy as np
+import torch
+import torch.nn as nn
+
+BACKENDS = ('eager', 'torchscript', 'onnx')
+EXTENSIONS = {'torchscript': '.ts', 'onnx': '.onnx'}
+
+
+class LSTMStep(nn.Module):
+    """Explicit-state view of LSTMModel, (x, h, c) -> (prediction, h, c); this is the exported graph"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.lstm = model.lstm
+        self.fc = model.fc
+
+    def forward(self, x, h, c):
+        out, (h, c) = self.lstm(x, (h, c))
+        return self.fc(out[:, -1, :]), h, c
+
+
+def exported_path(artifact_path, kind):
+    """Where the exported graph for an artifact lives, e.g. models/aqi_lstm_model.onnx"""
+    return os.path.splitext(artifact_path)[0] + EXTENSIONS[kind]
+
+
+def export_torchscript(model, path, model_version=''):
+    scripted = torch.jit.script(LSTMStep(model).cpu().eval())
+    torch.jit.save(scripted, path, _extra_files={'model_version': model_version or ''})
+    return path
+
+
+def export_onnx(model, path, lookback=30, model_version=''):
+    step = LSTMStep(model).cpu().eval()
+    x = torch.zeros(1, lookback, model.input_size)
+    h = torch.zeros(model.num_layers, 1, model.hidden_size)
+    c = torch.zeros(model.num_layers, 1, model.hidden_size)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        torch.onnx.export(
+            step, (x, h, c), path,
+            input_names=['x', 'h0', 'c0'],
+            output_names=['prediction', 'h', 'c'],
+            dynamic_axes={
+                'x': {0: 'batch', 1: 'steps'},
+                'h0': {1: 'batch'}, 'c0': {1: 'batch'},
+                'prediction': {0: 'batch'},
+                'h': {1: 'batch'}, 'c': {1: 'batch'}
+            },
+            opset_version=17,
+            dynamo=False
+        )
+    import onnx
+    exported = onnx.load(path)
+    onnx.helper.set_model_props(exported, {'model_version': model_version or ''})
+    onnx.save(exported, path)
+    return path
+
+
+class TorchScriptBackend:
+    name = 'torchscript'
+
+    def __init__(self, path, num_layers, hidden_size, device):
+        extra_files = {'model_version': ''}
+        self.module = torch.jit.load(path, map_location=device, _extra_files=extra_files).eval()
+        version = extra_files['model_version']
+        self.model_version = version.decode() if isinstance(version, bytes) else version
+        self.num_layers = num_layers
+        self.hidden_size = hidden_size
+
+    def step(self, x, state=None):
+        if state is None:
+            zeros = torch.zeros(self.num_layers, x.size(0), self.hidden_size, device=x.device)
+            state = (zeros, zeros)
+        pred, h, c = self.module(x, *state)
+        return pred, (h, c)
+
+
+class OnnxBackend:
+    name = 'onnx'
+
+    def __init__(self, path, num_layers, hidden_size):
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise ImportError("The ONNX backend needs onnxruntime: pip install onnxruntime")
+        self.session = ort.InferenceSession(path, providers=['CPUExecutionProvider'])
+        self.model_version = self.session.get_modelmeta().custom_metadata_map.get('model_version', '')
+        self.num_layers = num_layers
+        self.hidden_size = hidden_size
+
+    def step(self, x, state=None):
+        x = x.detach().cpu().numpy()
+        if state is None:
+            zeros = np.zeros((self.num_layers, x.shape[0], self.hidden_size), dtype=np.float32)
+            state = (zeros, zeros)
+        # State stays as NumPy between steps; only the prediction goes back to torch
+        pred, h, c = self.session.run(None, {'x': x, 'h0': state[0], 'c0': state[1]})
+        return torch.from_numpy(pred), (h, c)
+
+
+def load_backend(kind, path, model, device, model_version=None):
+    """Open an exported graph for a loaded LSTMModel; returns None for the eager backend"""
+    if kind not in BACKENDS:
+        raise ValueError(f"Unknown inference backend: {kind}")
+    if kind == 'eager':
+        return None
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No exported {kind} model at {path}; run export_model.py first")
+    if kind == 'torchscript':
+        backend = TorchScriptBackend(path, model.num_layers, model.hidden_size, device)
+    else:
+        backend = OnnxBackend(path, model.num_layers, model.hidden_size)
+    if model_version and backend.model_version != model_version:
+        raise ValueError(
+            f"{path} was exported from model {backend.model_version or 'unknown'}, "
+            f"but {model_version} is loaded; re-run export_model.py"
+        )
+    return backend
@@ -0,0 +1,91 @@
+"""
+Size-bounded executor for CPU-bound model inference
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+
+class PoolSaturated(Exception):
+    """Raised when every worker is busy and the queue is full"""
+
+
+class InferencePool:
+    """Runs inference on a fixed set of worker threads and rejects work beyond its queue capacity"""
+
+    def __init__(self, workers=2, queue_size=8, torch_threads=None):
+        self.workers = workers
+        self.capacity = workers + queue_size
+        # torch's intra-op pool is process-wide; split the cores so workers don't oversubscribe them
+        self.torch_threads = torch_threads or max(1, (os.cpu_count() or 1) // workers)
+        self.rejected = 0
+        self._slots = threading.BoundedSemaphore(self.capacity)
+        self._in_use = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix='inference',
+            initializer=self._init_worker
+        )
+
+    def _init_worker(self):
+        import torch
+        torch.set_num_threads(self.torch_threads)
+
+    def submit(self, fn, *args):
+        """Queue fn(*args) or raise PoolSaturated immediately"""
+        self._acquire()
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+        return future
+
+    @contextmanager
+    def slot(self):
+        """Hold one unit of capacity for work that spends part of its time off the pool (e.g. waiting
+        for a micro-batch), raising PoolSaturated like submit(); run its pool part with execute()"""
+        self._acquire()
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def execute(self, fn, *args):
+        """Await fn(*args) on a worker under a slot already held, without taking a second one"""
+        return await asyncio.wrap_future(self._executor.submit(fn, *args))
+
+    def _acquire(self):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise PoolSaturated(f"Inference queue full ({self.capacity} requests in flight)")
+        with self._lock:
+            self._in_use += 1
+
+    def _release(self):
+        with self._lock:
+            self._in_use -= 1
+        self._slots.release()
+
+    async def run(self, fn, *args):
+        """Await fn(*args) on the pool without blocking the event loop"""
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'capacity': self.capacity,
+                'in_flight': self._in_use,
+                'rejected': self.rejected,
+                'torch_threads': self.torch_threads
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,129 @@
+"""
+In-memory stand-in for firebase_admin.db, for tests, benchmarks and offline runs
+"""
+
+import copy
+import itertools
+import threading
+
+
+class InMemoryDB:
+    """Drop-in replacement for the parts of firebase_admin.db we use, backed by a nested dict"""
+
+    def __init__(self, data=None):
+        self.data = copy.deepcopy(data) if data else {}
+        self.requests = []
+        self._lock = threading.Lock()
+        self._push_ids = itertools.count()
+
+    def reference(self, path='/'):
+        return LocalReference(self, path)
+
+    def _record(self, op, path):
+        self.requests.append((op, path))
+
+    def _next_push_id(self):
+        # Zero-padded so lexicographic key order is insertion order, like Firebase push IDs
+        return f"-L{next(self._push_ids):018d}"
+
+
+class LocalReference:
+    def __init__(self, db, path):
+        self._db = db
+        self.path = '/' + path.strip('/')
+        self._parts = [part for part in path.split('/') if part]
+
+    @property
+    def key(self):
+        return self._parts[-1] if self._parts else None
+
+    def child(self, path):
+        return LocalReference(self._db, f"{self.path}/{path.strip('/')}")
+
+    def _node(self):
+        node = self._db.data
+        for part in self._parts:
+            if not isinstance(node, dict) or part not in node:
+                return None
+            node = node[part]
+        return node
+
+    def get(self):
+        with self._db._lock:
+            self._db._record('get', self.path)
+            return copy.deepcopy(self._node())
+
+    def set(self, value):
+        with self._db._lock:
+            self._db._record('set', self.path)
+            if not self._parts:
+                self._db.data = copy.deepcopy(value)
+                return
+            node = self._db.data
+            for part in self._parts[:-1]:
+                node = node.setdefault(part, {})
+            node[self._parts[-1]] = copy.deepcopy(value)
+
+    def update(self, value):
+        for key, child_value in value.items():
+            self.child(key).set(child_value)
+
+    def push(self, value=''):
+        ref = self.child(self._db._next_push_id())
+        ref.set(value)
+        return ref
+
+    def delete(self):
+        with self._db._lock:
+            self._db._record('delete', self.path)
+            parent = self._db.data
+            for part in self._parts[:-1]:
+                parent = parent.get(part, {})
+            parent.pop(self._parts[-1], None)
+
+    def order_by_key(self):
+        return LocalQuery(self)
+
+
+class LocalQuery:
+    """Key-ordered query supporting the same chaining as firebase_admin.db.Query"""
+
+    def __init__(self, ref):
+        self._ref = ref
+        self._start = None
+        self._end = None
+        self._first = None
+        self._last = None
+
+    def start_at(self, start):
+        self._start = start
+        return self
+
+    def end_at(self, end):
+        self._end = end
+        return self
+
+    def limit_to_first(self, limit):
+        self._first = limit
+        return self
+
+    def limit_to_last(self, limit):
+        self._last = limit
+        return self
+
+    def get(self):
+        with self._ref._db._lock:
+            self._ref._db._record('query', self._ref.path)
+            node = self._ref._node()
+            if not isinstance(node, dict):
+                return {}
+            keys = sorted(node)
+            if self._start is not None:
+                keys = [key for key in keys if key >= self._start]
+            if self._end is not None:
+                keys = [key for key in keys if key <= self._end]
+            if self._first is not None:
+                keys = keys[:self._first]
+            if self._last is not None:
+                keys = keys[-self._last:]
+            return {key: copy.deepcopy(node[key]) for key in keys}
@@ -1,26 +1,168 @@
-from fastapi import FastAPI
+import asyncio
+import hmac
+import logging
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, suppress
+from fastapi import FastAPI, Header, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from predict_service import AQIPredictionService
+from fastapi.responses import FileResponse, PlainTextResponse
+from firebase_client import init_firebase
+from prediction_cache import PredictionCache
+from inference_pool import InferencePool, PoolSaturated
+from observability import HTTP_REQUEST_SECONDS, REGISTRY, configure_logging, record_stats
 import uvicorn
-import firebase_admin
-from firebase_admin import credentials
-import os
 
-# --- Initialize Firebase ---
-if not firebase_admin._apps:
-    if os.path.exists('serviceAccountKey.json'):
-        try:
-            cred = credentials.Certificate('serviceAccountKey.json')
-            firebase_admin.initialize_app(cred, {
-                'databaseURL': 'https://delhibreathe-default-rtdb.firebaseio.com'
-            })
-            print("✅ Firebase initialized successfully")
-        except Exception as e:
-            print(f"❌ Error initializing Firebase: {e}")
-    else:
-        print("⚠️ WARNING: 'serviceAccountKey.json' not found. Using simulation mode.")
-
-app = FastAPI(title="AQI Prediction API", version="2.0.0")
+# torch, firebase_admin and the model are loaded by a background thread after the
+# server starts listening, so /health answers immediately on a cold container.
+
+# Seconds between incremental /readings syncs into the local buffer
+READINGS_POLL_INTERVAL = float(os.environ.get('READINGS_POLL_INTERVAL', '15'))
+
+# Multi-process serving (serve.py) sets this to the shared-memory block its fetcher process publishes
+# readings to; workers then read it every SHARED_READINGS_POLL_INTERVAL seconds instead of polling Firebase
+SHARED_READINGS = os.environ.get('SHARED_READINGS', '')
+SHARED_READINGS_POLL_INTERVAL = float(os.environ.get('SHARED_READINGS_POLL_INTERVAL', '1'))
+
+# Seconds a cached /predict response stays valid for the same readings and model
+PREDICTION_CACHE_TTL = float(os.environ.get('PREDICTION_CACHE_TTL', '60'))
+
+# Inference workers, queued requests allowed beyond them, and torch threads per worker (0 = auto)
+INFERENCE_WORKERS = int(os.environ.get('INFERENCE_WORKERS', '2'))
+INFERENCE_QUEUE_SIZE = int(os.environ.get('INFERENCE_QUEUE_SIZE', '8'))
+TORCH_THREADS_PER_WORKER = int(os.environ.get('TORCH_THREADS_PER_WORKER', '0'))
+
+# Largest micro-batch and how long the batcher waits to fill one
+MICRO_BATCH_SIZE = int(os.environ.get('MICRO_BATCH_SIZE', '32'))
+MICRO_BATCH_WAIT_MS = float(os.environ.get('MICRO_BATCH_WAIT_MS', '5'))
+
+# Network backend: eager, torchscript or onnx (exported with export_model.py)
+INFERENCE_BACKEND = os.environ.get('INFERENCE_BACKEND', 'eager')
+
+# Eager-model precision: fp32, int8 (dynamic quantization) or bf16
+INFERENCE_PRECISION = os.environ.get('INFERENCE_PRECISION', 'fp32')
+
+# MC-dropout trajectories per forecast for sampled confidence bands (0 = calibrated residual bands)
+MC_DROPOUT_SAMPLES = int(os.environ.get('MC_DROPOUT_SAMPLES', '0'))
+
+# Background forecast refresh: quiet period after new readings, minimum seconds between refreshes,
+# and an optional Firebase path (e.g. /predictions/latest) the results are written to
+FORECAST_REFRESH = os.environ.get('FORECAST_REFRESH', '1') == '1'
+FORECAST_REFRESH_DEBOUNCE = float(os.environ.get('FORECAST_REFRESH_DEBOUNCE', '2'))
+FORECAST_REFRESH_MIN_INTERVAL = float(os.environ.get('FORECAST_REFRESH_MIN_INTERVAL', '30'))
+FORECAST_WRITE_PATH = os.environ.get('FORECAST_WRITE_PATH', '')
+
+# Under serve.py only the fetcher process talks to Firebase, so forecasts would never be written back;
+# serve.py sets this in the one worker that connects to Firebase to write them
+FORECAST_WRITER = False
+
+# How long a request arriving during cold start waits for the model before getting a 503
+STARTUP_WAIT_SECONDS = float(os.environ.get('STARTUP_WAIT_SECONDS', '10'))
+
+# Models published to this registry (python model_registry.py publish) are swapped in without a restart,
+# on POST /admin/reload or when the watcher sees the manifest change (every MODEL_WATCH_INTERVAL seconds, 0 = off)
+MODEL_REGISTRY_ROOT = os.environ.get('MODEL_REGISTRY_ROOT', 'models/registry')
+MODEL_WATCH_INTERVAL = float(os.environ.get('MODEL_WATCH_INTERVAL', '10'))
+
+# Key for the admin endpoints (X-Admin-Key); they are disabled when it is empty
+ADMIN_KEY = os.environ.get('ADMIN_KEY', '')
+
+# Per-request profiling: a /predict call with `X-Profile: torch|python` and `X-Admin-Key: <key>` runs
+# under a profiler and writes its trace to PROFILE_DIR. Disabled when no admin key is set.
+PROFILE_ADMIN_KEY = os.environ.get('PROFILE_ADMIN_KEY', ADMIN_KEY)
+PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+PROFILE_MIN_INTERVAL = float(os.environ.get('PROFILE_MIN_INTERVAL', '60'))
+
+# Logs go to stderr as JSON lines at this level
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+
+configure_logging(LOG_LEVEL)
+logger = logging.getLogger('aqi_api')
+
+# The prediction service (and its forecast refresher and model watcher) are set once the background loader finishes
+service = None
+refresher = None
+watcher = None
+service_loaded = threading.Event()
+startup_error = None
+
+def load_service():
+    """Initialize Firebase, import torch and load the model off the request path"""
+    global service, refresher, watcher, startup_error
+    try:
+        readings = None
+        if SHARED_READINGS:
+            from shared_readings import SharedBlock, SharedReadingsStore
+            readings = SharedReadingsStore(SharedBlock.attach(SHARED_READINGS), cold_start_limit=1000)
+        # Workers leave Firebase to the fetcher process, except the one that writes forecasts back
+        firebase_ok = (readings is None or (FORECAST_WRITER and bool(FORECAST_WRITE_PATH))) and init_firebase()
+        if readings is not None and FORECAST_WRITE_PATH and not FORECAST_WRITER:
+            logger.info("Forecast write-back left to the designated worker", extra={'path': FORECAST_WRITE_PATH})
+        from predict_service import AQIPredictionService
+        loaded = AQIPredictionService(
+            max_batch=MICRO_BATCH_SIZE,
+            batch_wait=MICRO_BATCH_WAIT_MS / 1000,
+            backend=INFERENCE_BACKEND,
+            precision=INFERENCE_PRECISION,
+            mc_samples=MC_DROPOUT_SAMPLES,
+            registry_root=MODEL_REGISTRY_ROOT,
+            readings=readings
+        )
+        if FORECAST_REFRESH:
+            from forecast_refresher import ForecastRefresher
+            refresher = ForecastRefresher(
+                loaded,
+                debounce=FORECAST_REFRESH_DEBOUNCE,
+                min_interval=FORECAST_REFRESH_MIN_INTERVAL,
+                write_path=FORECAST_WRITE_PATH if firebase_ok else None
+            )
+            loaded.readings.add_listener(refresher.notify)
+            refresher.start()
+        if readings is not None:
+            loaded.readings.start(interval=SHARED_READINGS_POLL_INTERVAL)
+        elif firebase_ok:
+            loaded.readings.start(interval=READINGS_POLL_INTERVAL)
+        if MODEL_WATCH_INTERVAL > 0:
+            from model_registry import RegistryWatcher
+            watcher = RegistryWatcher(loaded.registry, lambda: reload_model(loaded), interval=MODEL_WATCH_INTERVAL)
+            watcher.start()
+        service = loaded
+    except Exception as e:
+        startup_error = str(e)
+        logger.exception("Prediction service failed to load")
+    finally:
+        service_loaded.set()
+
+def reload_model(service, version=None):
+    """Swap in a registry model and recompute the precomputed forecasts with it"""
+    swapped = service.reload_model(version)
+    if swapped and refresher is not None:
+        refresher.notify()
+    return swapped
+
+async def require_service():
+    """The loaded service, waiting briefly during cold start; 503 if it isn't ready"""
+    if not service_loaded.is_set():
+        await asyncio.to_thread(service_loaded.wait, STARTUP_WAIT_SECONDS)
+    if service is None:
+        raise HTTPException(status_code=503, detail=startup_error or "Model is still loading", headers={"Retry-After": "1"})
+    return service
+
+@asynccontextmanager
+async def lifespan(app):
+    threading.Thread(target=load_service, name='service-loader', daemon=True).start()
+    yield
+    inference_pool.shutdown()
+    if watcher is not None:
+        watcher.stop()
+    if refresher is not None:
+        refresher.stop()
+    if service is not None:
+        service.readings.stop()
+        service.batcher.stop()
+
+app = FastAPI(title="AQI Prediction API", version="2.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -29,8 +171,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize the prediction service
-service = AQIPredictionService()
+@app.middleware("http")
+async def observe_latency(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    # Label by route template, not the raw URL, to keep the series count bounded
+    route = request.scope.get('route')
+    path = route.path if route is not None else 'unmatched'
+    HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, path=path, status=response.status_code)
+    return response
+
+prediction_cache = PredictionCache(ttl=PREDICTION_CACHE_TTL)
+inference_pool = InferencePool(
+    workers=INFERENCE_WORKERS,
+    queue_size=INFERENCE_QUEUE_SIZE,
+    torch_threads=TORCH_THREADS_PER_WORKER or None
+)
+profiler = None
+if PROFILE_ADMIN_KEY:
+    from request_profiler import RequestProfiler
+    profiler = RequestProfiler(PROFILE_ADMIN_KEY, directory=PROFILE_DIR, min_interval=PROFILE_MIN_INTERVAL)
 
 @app.get("/")
 def root():
@@ -39,18 +199,166 @@ def root():
         "version": "2.0.0",
         "framework": "PyTorch",
         "endpoints": {
-            "/predict": "Get AQI predictions (daily, weekly, monthly)",
-            "/health": "Health check"
+            "/predict": "Get AQI predictions (daily, weekly, monthly); ?sensor=<id> for one location; X-Profile: torch|python with X-Admin-Key to profile it",
+            "/predict/batch": "Predictions for every sensor (or ?sensors=id1,id2) in one call",
+            "/sensors": "Sensors with buffered readings",
+            "/health": "Liveness check",
+            "/profiles/{name}": "Download a trace from a profiled /predict request (admin only)",
+            "/admin/reload": "POST: swap in the registry's current model (or ?version=) without a restart (admin only)",
+            "/metrics": "Prometheus metrics: per-stage latency, fallbacks, cache and pool statistics",
+            "/ready": "Readiness check (model loaded)"
         }
     }
 
 @app.get("/health")
 def health():
-    return {"status": "healthy", "model_loaded": service.predictor.model is not None}
+    """Liveness: answers as soon as the server is up, even while the model loads"""
+    status = {
+        "status": "healthy",
+        "ready": service is not None,
+        "model_loaded": service is not None and service.predictor.model is not None,
+        "cache": prediction_cache.stats(),
+        "inference": inference_pool.stats()
+    }
+    if service is not None:
+        status["batching"] = service.batcher.stats()
+    if refresher is not None:
+        status["refresh"] = refresher.stats()
+    return status
+
+@app.get("/ready")
+def ready():
+    """Readiness: the prediction service and model are loaded"""
+    if service is None:
+        raise HTTPException(status_code=503, detail=startup_error or "Model is still loading")
+    return {
+        "ready": True,
+        "model_loaded": service.predictor.model is not None,
+        "model_version": service.predictor.model_version,
+        "backend": service.predictor.backend.name if service.predictor.backend else 'eager',
+        "precision": service.predictor.precision
+    }
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus text exposition of the service's counters, gauges and latency histograms"""
+    record_stats('cache', prediction_cache.stats())
+    record_stats('inference', inference_pool.stats())
+    if service is not None:
+        record_stats('batching', service.batcher.stats())
+    if refresher is not None:
+        record_stats('refresh', refresher.stats())
+    if profiler is not None:
+        record_stats('profiler', profiler.stats())
+    return PlainTextResponse(REGISTRY.render(), media_type='text/plain; version=0.0.4')
+
+async def cached(key, compute):
+    try:
+        return await prediction_cache.get_or_compute_async(
+            key, compute, cacheable=lambda result: result.get('success')
+        )
+    except PoolSaturated:
+        raise HTTPException(status_code=503, detail="Prediction service busy, retry shortly", headers={"Retry-After": "1"})
+
+@app.get("/sensors")
+async def sensors():
+    service = await require_service()
+    await asyncio.to_thread(service.data_version)
+    return {"sensors": service.readings.sensors()}
+
+def require_admin(admin_key):
+    if profiler is None:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    if not profiler.authorized(admin_key):
+        raise HTTPException(status_code=403, detail="Profiling requires a valid X-Admin-Key")
+
+async def profile_prediction(service, sensor, mode, admin_key):
+    """One uncached, unbatched prediction under a profiler, with the trace summary attached"""
+    from request_profiler import PROFILE_MODES, ProfilingRejected, unbatched
+    require_admin(admin_key)
+    if mode not in PROFILE_MODES:
+        raise HTTPException(status_code=400, detail=f"X-Profile must be one of {', '.join(PROFILE_MODES)}")
+    try:
+        profiler.acquire()
+    except ProfilingRejected as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    direct = unbatched(service)
+    try:
+        recent_data = await asyncio.to_thread(direct.fetch_recent_data, 30, sensor)
+        result, summary = await inference_pool.run(profiler.run, mode, direct.predict_all, recent_data)
+    except PoolSaturated:
+        raise HTTPException(status_code=503, detail="Prediction service busy, retry shortly", headers={"Retry-After": "1"})
+    finally:
+        profiler.release()
+    summary['download'] = f"/profiles/{summary['trace']}"
+    return {**result, 'profile': summary}
+
+@app.post("/admin/reload")
+async def admin_reload(version: str = None, x_admin_key: str = Header(None)):
+    """Load, warm and swap in a registry model while the current one keeps serving"""
+    if not ADMIN_KEY:
+        raise HTTPException(status_code=404, detail="Admin endpoints are disabled")
+    if not x_admin_key or not hmac.compare_digest(x_admin_key.encode(), ADMIN_KEY.encode()):
+        raise HTTPException(status_code=403, detail="Reloading requires a valid X-Admin-Key")
+    service = await require_service()
+    previous = service.predictor.model_version
+    try:
+        swapped = await asyncio.to_thread(reload_model, service, version)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    return {"reloaded": swapped, "previous_version": previous, "model_version": service.predictor.model_version}
+
+@app.get("/profiles/{name}")
+def download_profile(name: str, x_admin_key: str = Header(None)):
+    """A trace written by a profiled /predict request"""
+    require_admin(x_admin_key)
+    path = profiler.path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"Unknown profile: {name}")
+    return FileResponse(path, filename=name)
 
 @app.get("/predict")
-def predict():
-    return service.predict_all()
+async def predict(sensor: str = None, x_profile: str = Header(None), x_admin_key: str = Header(None)):
+    service = await require_service()
+    data_version = await asyncio.to_thread(service.data_version)
+    if sensor is not None and not service.has_sensor(sensor):
+        raise HTTPException(status_code=404, detail=f"Unknown sensor: {sensor}")
+    if x_profile:
+        return await profile_prediction(service, sensor, x_profile, x_admin_key)
+    precomputed = refresher.lookup(sensor) if refresher is not None else None
+    if precomputed is not None:
+        return precomputed
+
+    async def compute():
+        recent_data = await asyncio.to_thread(service.fetch_recent_data, 30, sensor)
+        if service.mc_samples:
+            # Sampling fills its own batch dimension and never goes through the micro-batcher
+            return await inference_pool.run(service.predict_all, recent_data)
+        # Wait for the rollout on the event loop rather than on a pool thread, so every concurrent
+        # request can join the same micro-batch. The pool slot is taken before the rollout is queued
+        # and held until formatting finishes, so overload is still turned away up front with a 503.
+        with inference_pool.slot():
+            model_version = service.predictor.model_version
+            rollout = service.submit_forecast(recent_data)
+            with suppress(Exception):
+                await asyncio.wrap_future(rollout)
+            return await inference_pool.execute(service.complete_forecast, rollout, model_version, sensor)
+
+    return await cached(('predict', sensor, data_version, service.predictor.model_version), compute)
+
+@app.get("/predict/batch")
+async def predict_batch(sensors: str = Query(None, description="Comma-separated sensor ids; all sensors when omitted")):
+    service = await require_service()
+    data_version = await asyncio.to_thread(service.data_version)
+    sensor_ids = tuple(sid.strip() for sid in sensors.split(',') if sid.strip()) if sensors else None
+    precomputed = refresher.lookup_batch(sensor_ids) if refresher is not None else None
+    if precomputed is not None:
+        return precomputed
+
+    async def compute():
+        return await inference_pool.run(service.predict_batch, sensor_ids)
+
+    return await cached(('batch', sensor_ids, data_version, service.predictor.model_version), compute)
 
 if __name__ == "__main__":
     print("\n" + "="*60)
@@ -0,0 +1,107 @@
+"""
+Micro-batching scheduler: coalesces concurrent forecast requests into one batched rollout
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+import numpy as np
+from observability import STAGE_SECONDS
+
+_STOP = object()
+
+
+class MicroBatcher:
+    """Collects requests arriving within `max_wait` seconds and rolls them forward as one (B, T, 1) batch"""
+
+    def __init__(self, predictor, max_batch=32, max_wait=0.005):
+        self.predictor = predictor
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batches = 0
+        self.requests = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._thread.start()
+
+    @property
+    def channels(self):
+        return getattr(self.predictor, 'channels', ('aqi',))
+
+    def submit(self, recent_data, steps=7):
+        """Queue one window for forecasting; the Future resolves to its `steps` predictions"""
+        future = Future()
+        # The predictor is pinned at submit time, so a model swapped in meanwhile never sees this window
+        self._queue.put((np.asarray(recent_data, dtype=np.float64), steps, future, time.perf_counter(), self.predictor))
+        return future
+
+    def predict_sequence(self, recent_data, steps=7):
+        """Blocking, predictor-compatible entry point so ForecastEngine can sit on top of the batcher"""
+        return self.submit(recent_data, steps).result()
+
+    def predict_batch(self, windows, steps=7):
+        """Queue several windows at once so they land in the same micro-batch"""
+        futures = [self.submit(window, steps) for window in windows]
+        return np.stack([future.result() for future in futures])
+
+    def predict_samples(self, windows, steps=7, samples=32, seed=None):
+        """MC-dropout sampling already fills the batch dimension with `samples` rows, so it bypasses the queue"""
+        return self.predictor.predict_samples(windows, steps=steps, samples=samples, seed=seed)
+
+    def stop(self):
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def stats(self):
+        return {
+            'batches': self.batches,
+            'requests': self.requests,
+            'mean_batch_size': round(self.requests / self.batches, 2) if self.batches else 0.0
+        }
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait
+            stopping = False
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._process(batch)
+            if stopping:
+                return
+
+    def _process(self, batch):
+        # Windows can only be stacked when they go to the same model with the same length after trimming to the lookback
+        groups = {}
+        started = time.perf_counter()
+        for window, steps, future, submitted, predictor in batch:
+            STAGE_SECONDS.observe(started - submitted, stage='batch_wait')
+            if future.set_running_or_notify_cancel():
+                key = (predictor, min(len(window), predictor.lookback))
+                groups.setdefault(key, []).append((window, steps, future))
+        for (predictor, length), items in groups.items():
+            try:
+                windows = np.stack([window[-length:] for window, _, _ in items])
+                predictions = predictor.predict_batch(windows, steps=max(steps for _, steps, _ in items))
+            except Exception as e:
+                for _, _, future in items:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.requests += len(items)
+            for row, (_, steps, future) in zip(predictions, items):
+                future.set_result(row[:steps])
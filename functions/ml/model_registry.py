@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Versioned registry of inference artifacts, so a retrained model can be swapped into a running API
+
+Layout under the registry root:
+    manifest.json                  current version and the published versions, oldest first
+    <version>/aqi_lstm_model.pt    the artifact; exported .ts / .onnx graphs sit next to it
+
+A version is the artifact's content hash, the same value the predictor reports as model_version.
+
+Usage: python model_registry.py [publish <artifact>|activate <version>|list] [--root models/registry]
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import threading
+from datetime import datetime
+from aqi_lstm_model import file_version
+from inference_backends import EXTENSIONS, exported_path
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_NAME = 'aqi_lstm_model.pt'
+
+
+class ModelRegistry:
+    """Published artifacts and which one is current; the manifest is replaced atomically on every change"""
+
+    def __init__(self, root='models/registry'):
+        self.root = root
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.root, 'manifest.json')
+
+    def manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {'current': None, 'versions': []}
+        with open(self.manifest_path) as f:
+            return json.load(f)
+
+    def versions(self):
+        return self.manifest()['versions']
+
+    def entry(self, version):
+        for entry in self.versions():
+            if entry['version'] == version:
+                return entry
+        raise KeyError(f"Unknown model version: {version}")
+
+    def current(self):
+        """The current version's manifest entry, or None for an empty registry"""
+        manifest = self.manifest()
+        return self.entry(manifest['current']) if manifest['current'] else None
+
+    def path(self, version):
+        return os.path.join(self.root, version, ARTIFACT_NAME)
+
+    def signature(self):
+        """Changes whenever the manifest is rewritten; cheap enough to poll"""
+        try:
+            stat = os.stat(self.manifest_path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def publish(self, artifact_path, metadata=None, activate=True):
+        """Copy an artifact (and any exported graphs beside it) into the registry; returns its entry"""
+        version = file_version(artifact_path)
+        target = self.path(version)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        self._copy(artifact_path, target)
+        for kind in EXTENSIONS:
+            exported = exported_path(artifact_path, kind)
+            if os.path.exists(exported):
+                self._copy(exported, exported_path(target, kind))
+
+        manifest = self.manifest()
+        versions = [entry for entry in manifest['versions'] if entry['version'] != version]
+        entry = {'version': version, 'published_at': datetime.now().isoformat(), 'metadata': metadata or {}}
+        versions.append(entry)
+        manifest['versions'] = versions
+        if activate or manifest['current'] is None:
+            manifest['current'] = version
+        self._save_manifest(manifest)
+        return entry
+
+    def activate(self, version):
+        """Make a published version current, e.g. to roll back"""
+        self.entry(version)
+        manifest = self.manifest()
+        manifest['current'] = version
+        self._save_manifest(manifest)
+
+    @staticmethod
+    def _copy(source, target):
+        # Serving processes memory-map published artifacts, so a file is never rewritten in place:
+        # the same version has the same content, and new files appear with an atomic rename
+        if os.path.exists(target):
+            return
+        shutil.copyfile(source, target + '.tmp')
+        os.replace(target + '.tmp', target)
+
+    def _save_manifest(self, manifest):
+        os.makedirs(self.root, exist_ok=True)
+        with open(self.manifest_path + '.tmp', 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(self.manifest_path + '.tmp', self.manifest_path)
+
+
+class RegistryWatcher:
+    """Polls the registry manifest and calls `on_change()` when it is rewritten"""
+
+    def __init__(self, registry, on_change, interval=10.0):
+        self.registry = registry
+        self.on_change = on_change
+        self.interval = interval
+        self._seen = registry.signature()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def check(self):
+        """Call on_change if the manifest changed since the last check; returns whether it did
+
+        The change only counts as seen once on_change succeeds, so a failed reload is retried
+        on the next check.
+        """
+        signature = self.registry.signature()
+        if signature == self._seen:
+            return False
+        self.on_change()
+        self._seen = signature
+        return True
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='registry-watcher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                logger.warning("Model reload failed", extra={'error': str(e)})
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Publish, activate or list registry models')
+    parser.add_argument('command', choices=('publish', 'activate', 'list'))
+    parser.add_argument('target', nargs='?', help='artifact path for publish, version for activate')
+    parser.add_argument('--root', default='models/registry')
+    args = parser.parse_args()
+    registry = ModelRegistry(args.root)
+    if args.command == 'publish':
+        entry = registry.publish(args.target or 'models/aqi_lstm_model.pt')
+        print(f"✅ Published model {entry['version']} (now current)")
+    elif args.command == 'activate':
+        registry.activate(args.target)
+        print(f"✅ Model {args.target} is now current")
+    else:
+        current = registry.manifest()['current']
+        for entry in registry.versions():
+            marker = '*' if entry['version'] == current else ' '
+            print(f"{marker} {entry['version']}  {entry['published_at']}")
@@ -1,137 +1,344 @@
+import logging
+import threading
+import time
 import numpy as np
-import firebase_admin
-from firebase_admin import db
 from aqi_lstm_model import AQILSTMPredictor
+from aqi_categories import AQI_BREAKPOINTS, AQI_CATEGORIES
+from forecast_engine import DEFAULT_HORIZONS, ForecastEngine, rollout_steps
+from readings_store import ReadingsStore, UnknownSensor, check_servable_lookback
+from micro_batcher import MicroBatcher
+from model_registry import ModelRegistry
+from synthetic_data import generate_aqi, synthetic_pollutants
+from observability import MODEL_INFO, MODEL_LOAD_SECONDS, PREDICTION_ERRORS, SIMULATION_FALLBACKS, STAGE_SECONDS
 import os
 
+logger = logging.getLogger(__name__)
+
 class AQIPredictionService:
-    def __init__(self):
-        self.predictor = AQILSTMPredictor(lookback=30)
+    def __init__(self, db_module=None, max_batch=32, batch_wait=0.005, backend='eager', precision='fp32', mc_samples=0,
+                 registry_root='models/registry', readings=None, model_dir='models'):
+        self.backend = backend
+        # Standalone artifact and legacy .pth + .pkl files, used when the registry is empty
+        self.model_dir = model_dir
+        self.precision = precision
+        # Retrained models are published here and swapped in by reload_model() without a restart
+        self.registry = ModelRegistry(registry_root)
+        self._reload_lock = threading.Lock()
+        # MC-dropout trajectories per forecast; 0 keeps the deterministic forecast with calibrated bands
+        self.mc_samples = mc_samples
+        # Cold start pulls enough history to give each sensor on the map its own window
+        # (multi-process workers pass a store fed from shared memory instead)
+        self.readings = readings or ReadingsStore(path='/readings', db_module=db_module, cold_start_limit=1000)
+        self.predictor = AQILSTMPredictor(lookback=30, decode=AQILSTMPredictor.SERVING_DECODE)
+        # Concurrent forecasts are stacked into one batched rollout
+        self.batcher = MicroBatcher(self.predictor, max_batch=max_batch, max_wait=batch_wait)
+        self.engine = ForecastEngine(self.batcher)
         self.load_model()
     
     def load_model(self):
-        """Load trained model"""
-        model_path = 'models/aqi_lstm_model.pth'
-        scaler_path = 'models/aqi_scaler.pkl'
+        """Load the registry's current model, else the standalone inference artifact, else the legacy .pth + .pkl pair"""
+        current = self.registry.current()
+        artifact_path = self.registry.path(current['version']) if current else os.path.join(self.model_dir, 'aqi_lstm_model.pt')
+        model_path = os.path.join(self.model_dir, 'aqi_lstm_model.pth')
+        scaler_path = os.path.join(self.model_dir, 'aqi_scaler.pkl')
+        started = time.perf_counter()
         
-        if os.path.exists(model_path) and os.path.exists(scaler_path):
+        if os.path.exists(artifact_path):
+            # Registry artifacts are immutable, so they can be memory-mapped and shared between workers
+            self.install(self.load_predictor(artifact_path, mmap=current is not None))
+        elif os.path.exists(model_path) and os.path.exists(scaler_path):
             self.predictor.load_model(model_path, scaler_path)
-            print("✅ Model loaded successfully")
         else:
-            print("⚠️ Warning: Model files not found. Using simulation mode.")
+            logger.warning("Model files not found, using simulation mode")
+            return
+        self._record_load(started)
+
+    def load_predictor(self, artifact_path, mmap=False):
+        """A new predictor for an artifact, on the configured backend and precision"""
+        predictor = AQILSTMPredictor(lookback=30, decode=AQILSTMPredictor.SERVING_DECODE)
+        # Reduced precision applies to the eager model; exported backends run their own fp32 graph
+        precision = self.precision if self.backend == 'eager' else 'fp32'
+        predictor.load_artifact(artifact_path, precision=precision, mmap=mmap)
+        # predict_batch keeps only the last `lookback` readings, so a longer window would be silently cut short
+        check_servable_lookback(predictor.lookback)
+        if self.backend != 'eager':
+            from inference_backends import exported_path
+            try:
+                predictor.use_backend(self.backend, exported_path(artifact_path, self.backend))
+                logger.info("Using exported inference backend", extra={'backend': self.backend})
+            except Exception as e:
+                logger.warning("Inference backend unavailable, using eager PyTorch", extra={'backend': self.backend, 'error': str(e)})
+        return predictor
+
+    def reload_model(self, version=None):
+        """Load a registry version (default: the current one), warm it up and swap it in
+
+        Requests keep using the old model until the swap, which is one reference assignment on the
+        service and the batcher. Returns True when the model changed.
+        """
+        with self._reload_lock:
+            entry = self.registry.current() if version is None else self.registry.entry(version)
+            if entry is None or entry['version'] == self.predictor.model_version:
+                return False
+            started = time.perf_counter()
+            predictor = self.load_predictor(self.registry.path(entry['version']), mmap=True)
+            self.warm(predictor)
+            previous = self.predictor.model_version
+            self.install(predictor)
+            self._record_load(started)
+            logger.info("Model swapped", extra={'previous_version': previous, 'model_version': predictor.model_version})
+            return True
+
+    def warm(self, predictor, steps=90):
+        """One full-length rollout so the first request on a new model doesn't pay for lazy initialization"""
+        scaler = predictor.scaler
+        middle = (np.asarray(scaler.data_min_) + np.asarray(scaler.data_max_)) / 2
+        window = np.broadcast_to(middle, (predictor.lookback, len(predictor.channels)))
+        windows = (window if predictor.multivariate else window[:, 0])[None]
+        predictor.predict_batch(windows, steps=steps)
+        if self.mc_samples:
+            predictor.predict_samples(windows, steps=steps, samples=self.mc_samples)
+
+    def install(self, predictor):
+        # The batcher resolves its predictor once per request, so in-flight rollouts finish on the old model
+        self.batcher.predictor = predictor
+        self.predictor = predictor
+
+    def _record_load(self, started):
+        MODEL_LOAD_SECONDS.set(time.perf_counter() - started)
+        backend = self.predictor.backend.name if self.predictor.backend else 'eager'
+        # Only the model now serving is reported; the swapped-out one's label set goes away
+        MODEL_INFO.clear()
+        MODEL_INFO.set(1, version=self.predictor.model_version, backend=backend, precision=self.predictor.precision)
+        logger.info("Model loaded", extra={
+            'model_version': self.predictor.model_version, 'backend': backend,
+            'precision': self.predictor.precision, 'load_seconds': round(time.perf_counter() - started, 3)
+        })
+
+    def data_version(self):
+        """Identifies the current input window: the newest reading key, or 'simulation'"""
+        if not self.readings.primed:
+            try:
+                self.readings.sync()
+            except Exception:
+                pass
+        return self.readings.last_key or 'simulation'
 
-    def fetch_recent_data(self, hours=30):
+    def has_sensor(self, sensor):
+        return sensor in self.readings.sensors()
+
+    def pad_window(self, aqi_values, hours=30):
+        """Most recent `hours` readings (rows of channels for multivariate models), padded with noise around their average when there are fewer"""
+        # Use the most recent readings (last 30 or all available)
+        recent = self.fill_missing(aqi_values)[-min(hours, len(aqi_values)):]
+        
+        # If we have fewer than 30 readings, pad with the average
+        if len(recent) < hours:
+            padding = recent.mean(axis=0) + np.random.normal(0, 2, size=(hours - len(recent),) + recent.shape[1:])
+            recent = np.concatenate([padding, recent])
+        return recent
+
+    def fill_missing(self, values):
+        """Replace missing pollutant readings with the channel's mean, or the middle of its training range when it has none"""
+        values = np.array(values, dtype=np.float64)
+        missing = np.isnan(values)
+        if values.ndim == 1 or not missing.any():
+            return values
+        counts = (~missing).sum(axis=0)
+        scaler = self.predictor.scaler
+        fallback = (np.asarray(scaler.data_min_) + np.asarray(scaler.data_max_)) / 2
+        means = np.divide(np.nansum(values, axis=0), counts, out=fallback.astype(np.float64), where=counts > 0)
+        return np.where(missing, means, values)
+
+    def fetch_recent_data(self, hours=30, sensor=None):
         """Fetch data safely - works even if Firebase fails!"""
+        with STAGE_SECONDS.time(stage='fetch'):
+            return self._fetch_recent_data(hours, sensor)
+
+    def _fetch_recent_data(self, hours, sensor):
         try:
-            # 1. Try to get Real Data from Firebase
-            ref = db.reference('/readings')
-            data = ref.get()
+            # 1. Real Data from the local readings buffer (one limited query on cold start)
+            if not self.readings.primed:
+                self.readings.sync()
+            # One columnar snapshot of every channel the model reads
+            values = self.readings.snapshot(sensor, channels=self.predictor.channels)
             
-            if data and isinstance(data, dict):
-                # Extract AQI values from all readings
-                aqi_values = []
-                for key, reading in data.items():
-                    if 'aqi' in reading:
-                        aqi_values.append(float(reading['aqi']))
-                
-                if aqi_values:
-                    # Use the most recent readings (last 30 or all available)
-                    recent_aqi = aqi_values[-min(hours, len(aqi_values)):]
-                    
-                    # If we have fewer than 30 readings, pad with the average
-                    if len(recent_aqi) < hours:
-                        avg_aqi = np.mean(recent_aqi)
-                        padding = [avg_aqi + np.random.normal(0, 2) for _ in range(hours - len(recent_aqi))]
-                        recent_aqi = padding + recent_aqi
-                    
-                    print(f"📡 Fetched {len(aqi_values)} real AQI readings from Firebase")
-                    print(f"📊 Current AQI: {aqi_values[-1]}, Average: {np.mean(aqi_values):.1f}")
-                    return np.array(recent_aqi)
-                else:
-                    raise ValueError("No AQI values found in readings")
-            else:
-                raise ValueError("No readings data in Firebase")
+            if len(values) == 0:
+                raise ValueError("No AQI values found in readings")
+            
+            aqi_values = values if values.ndim == 1 else values[:, 0]
+            logger.debug("Readings fetched", extra={
+                'sensor': sensor, 'readings': len(aqi_values),
+                'current_aqi': float(aqi_values[-1]), 'average_aqi': round(float(np.mean(aqi_values)), 1)
+            })
+            return self.pad_window(values, hours)
 
+        except UnknownSensor:
+            raise
         except Exception as e:
             # 2. FALLBACK: If Firebase fails, use Simulation
-            print(f"⚠️ Firebase unavailable ({e}). Using Simulation Mode.")
-            current_aqi = 145.0 + np.random.normal(0, 15)
+            SIMULATION_FALLBACKS.inc()
+            logger.warning("Readings unavailable, using simulation mode", extra={'sensor': sensor, 'error': str(e)})
+            # Generate 30 hours of history around a simulated level
+            recent_data = generate_aqi(sensors=1, points=hours, base_aqi=145.0, low=0)[0]
             
-            # Generate 30 hours of history based on simulated value
-            recent_data = []
-            val = current_aqi
-            for _ in range(hours):
-                val += np.random.normal(0, 2)
-                recent_data.append(max(0, val))
-            
-            return np.array(recent_data)
+            if self.predictor.multivariate:
+                return np.column_stack([recent_data, synthetic_pollutants(recent_data, self.predictor.channels[1:])])
+            return recent_data
     
     def get_aqi_category(self, aqi):
-        if aqi <= 50: return {'category': 'Good', 'color': '#00e400', 'description': 'Air quality is satisfactory'}
-        elif aqi <= 100: return {'category': 'Moderate', 'color': '#ffff00', 'description': 'Air quality is acceptable'}
-        elif aqi <= 150: return {'category': 'Unhealthy for Sensitive Groups', 'color': '#ff7e00', 'description': 'Sensitive groups may experience health effects'}
-        elif aqi <= 200: return {'category': 'Unhealthy', 'color': '#ff0000', 'description': 'Everyone may begin to experience health effects'}
-        elif aqi <= 300: return {'category': 'Very Unhealthy', 'color': '#8f3f97', 'description': 'Health alert: everyone may experience serious effects'}
-        else: return {'category': 'Hazardous', 'color': '#7e0023', 'description': 'Health warnings of emergency conditions'}
-
-    def predict_all(self):
+        return dict(AQI_CATEGORIES[int(np.searchsorted(AQI_BREAKPOINTS, aqi, side='left'))])
+
+    def predict_all(self, recent_data=None, sensor=None, samples=None):
         """Generate all predictions (daily, weekly, monthly)"""
         try:
-            # 1. Get Data (Real or Simulated)
-            recent_data = self.fetch_recent_data(hours=30)
-            
-            # 2. Make Predictions
-            daily_predictions = self.predictor.predict_daily(recent_data, days=7)
-            weekly_predictions = self.predictor.predict_weekly(recent_data, weeks=4)
-            monthly_predictions = self.predictor.predict_monthly(recent_data, months=3)
+            samples = self.mc_samples if samples is None else samples
+            model_version = self.predictor.model_version
+            # 1. Get Data (Real or Simulated) unless the caller already fetched it
+            if recent_data is None:
+                recent_data = self.fetch_recent_data(hours=30, sensor=sensor)
             
-            # 3. Calculate Confidence
-            daily_conf = self.predictor.get_prediction_confidence(daily_predictions)
-            weekly_conf = self.predictor.get_prediction_confidence(weekly_predictions)
-            monthly_conf = self.predictor.get_prediction_confidence(monthly_predictions)
-            
-            # 4. Format Output for Frontend
-            from datetime import datetime, timedelta
-            current_date = datetime.now()
+            # 2. Make Predictions (one 90-day rollout shared by all views)
+            if samples:
+                distribution = self.engine.forecast_distribution([recent_data], horizons={'daily': 7, 'weekly': 4, 'monthly': 3}, samples=samples)[0]
+                predictions = self.format_predictions(*self.split_distribution(distribution))
+            else:
+                forecasts = self.engine.forecast(recent_data, horizons={'daily': 7, 'weekly': 4, 'monthly': 3})
+                predictions = self.format_predictions(forecasts)
             
-            def format_results(preds, confs, type='daily'):
-                results = []
-                for i, (pred, conf) in enumerate(zip(preds, confs)):
-                    date = current_date + timedelta(days=i+1) if type == 'daily' else current_date # Simplified date logic
-                    cat = self.get_aqi_category(pred)
-                    
-                    item = {
-                        'aqi': round(float(pred), 1),
-                        'confidence': conf,
-                        'category': cat['category'],
-                        'color': cat['color'],
-                        'description': cat['description']
-                    }
-                    
-                    if type == 'daily':
-                        item['date'] = (current_date + timedelta(days=i+1)).strftime('%Y-%m-%d')
-                        item['day'] = (current_date + timedelta(days=i+1)).strftime('%A')
-                    elif type == 'weekly':
-                        item['week'] = i + 1
-                        item['start_date'] = (current_date + timedelta(weeks=i)).strftime('%Y-%m-%d')
-                        item['end_date'] = (current_date + timedelta(weeks=i+1)).strftime('%Y-%m-%d')
-                    elif type == 'monthly':
-                        future_date = current_date + timedelta(days=30*(i+1))
-                        item['month'] = future_date.strftime('%B')
-                        item['year'] = future_date.year
-                        
-                    results.append(item)
-                return results
+            return {
+                'success': True,
+                'predictions': predictions,
+                'uncertainty': self.uncertainty(samples),
+                'model_version': model_version
+            }
+        
+        except Exception as e:
+            PREDICTION_ERRORS.inc(kind='single')
+            logger.exception("Prediction failed", extra={'sensor': sensor})
+            return {'success': False, 'error': str(e)}
 
+    def submit_forecast(self, recent_data):
+        """Queue one window on the micro-batcher without waiting; the Future resolves to its daily rollout"""
+        return self.batcher.submit(recent_data, steps=rollout_steps(DEFAULT_HORIZONS))
+
+    def complete_forecast(self, rollout, model_version, sensor=None):
+        """predict_all's response for a submit_forecast() Future that has finished"""
+        try:
+            predictions = self.format_predictions(self.engine.views(rollout.result(), DEFAULT_HORIZONS))
             return {
                 'success': True,
-                'predictions': {
-                    'daily': format_results(daily_predictions, daily_conf, 'daily'),
-                    'weekly': format_results(weekly_predictions, weekly_conf, 'weekly'),
-                    'monthly': format_results(monthly_predictions, monthly_conf, 'monthly')
-                }
+                'predictions': predictions,
+                'uncertainty': self.uncertainty(0),
+                'model_version': model_version
+            }
+        except Exception as e:
+            PREDICTION_ERRORS.inc(kind='single')
+            logger.exception("Prediction failed", extra={'sensor': sensor})
+            return {'success': False, 'error': str(e)}
+
+    def predict_batch(self, sensors=None, samples=None):
+        """Forecast every known sensor (or the requested ones) in one batched model pass"""
+        try:
+            samples = self.mc_samples if samples is None else samples
+            model_version = self.predictor.model_version
+            self.data_version()
+            known = self.readings.sensors()
+            requested = list(known) if sensors is None else list(sensors)
+            found = [sid for sid in requested if sid in known]
+            windows = [self.pad_window(self.readings.snapshot(sid, channels=self.predictor.channels), hours=30) for sid in found]
+            if not windows:
+                predictions = []
+            elif samples:
+                distributions = self.engine.forecast_distribution(windows, horizons={'daily': 7, 'weekly': 4, 'monthly': 3}, samples=samples)
+                predictions = [self.format_predictions(*self.split_distribution(d)) for d in distributions]
+            else:
+                forecasts = self.engine.forecast_batch(windows, horizons={'daily': 7, 'weekly': 4, 'monthly': 3})
+                predictions = [self.format_predictions(f) for f in forecasts]
+            
+            return {
+                'success': True,
+                'sensors': {
+                    sid: {
+                        'location': known[sid]['location'],
+                        'predictions': sensor_predictions
+                    }
+                    for sid, sensor_predictions in zip(found, predictions)
+                },
+                'missing': [sid for sid in requested if sid not in known],
+                'uncertainty': self.uncertainty(samples),
+                'model_version': model_version
             }
         
         except Exception as e:
-            print(f"❌ Prediction Error: {e}")
-            return {'success': False, 'error': str(e)}
\ No newline at end of file
+            PREDICTION_ERRORS.inc(kind='batch')
+            logger.exception("Batch prediction failed", extra={'sensors': sensors})
+            return {'success': False, 'error': str(e)}
+
+    def uncertainty(self, samples):
+        """How the confidence bands in a response were produced"""
+        if samples:
+            return {'method': 'mc_dropout', 'samples': samples}
+        calibrated = bool(self.predictor.residual_quantiles)
+        return {'method': 'residual_quantiles' if calibrated else 'forecast_spread'}
+
+    @staticmethod
+    def split_distribution(distribution):
+        """Sampled views -> (mean forecasts, (lower, upper) bands) for format_predictions"""
+        forecasts = {view: d['mean'] for view, d in distribution.items() if view != 'pollutants'}
+        bands = {view: (d['lower'], d['upper']) for view, d in distribution.items() if view != 'pollutants'}
+        if 'pollutants' in distribution:
+            forecasts['pollutants'] = distribution['pollutants']
+        return forecasts, bands
+
+    def format_predictions(self, forecasts, bands=None):
+        """Attach confidence bands, categories and dates to daily, weekly and monthly forecasts"""
+        from datetime import datetime, timedelta
+        current_date = datetime.now()
+        
+        def format_results(preds, view):
+            preds = np.asarray(preds, dtype=np.float64)
+            
+            # 3. Calculate Confidence (one vectorized pass over the whole view)
+            with STAGE_SECONDS.time(stage='confidence'):
+                if bands:
+                    lower, upper = np.maximum(0, bands[view][0]), np.maximum(0, bands[view][1])
+                else:
+                    lower, upper = self.predictor.confidence_bands(preds, view=view)
+            formatting = time.perf_counter()
+            categories = np.searchsorted(AQI_BREAKPOINTS, preds, side='left')
+            
+            # 4. Format Output for Frontend
+            results = []
+            for i, (pred, low, high, cat) in enumerate(zip(preds.tolist(), lower.tolist(), upper.tolist(), categories.tolist())):
+                item = {
+                    'aqi': round(pred, 1),
+                    'confidence': {'prediction': pred, 'lower_bound': low, 'upper_bound': high},
+                    **AQI_CATEGORIES[cat]
+                }
+                
+                if view == 'daily':
+                    date = current_date + timedelta(days=i+1)
+                    item['date'] = date.strftime('%Y-%m-%d')
+                    item['day'] = date.strftime('%A')
+                elif view == 'weekly':
+                    item['week'] = i + 1
+                    item['start_date'] = (current_date + timedelta(weeks=i)).strftime('%Y-%m-%d')
+                    item['end_date'] = (current_date + timedelta(weeks=i+1)).strftime('%Y-%m-%d')
+                elif view == 'monthly':
+                    future_date = current_date + timedelta(days=30*(i+1))
+                    item['month'] = future_date.strftime('%B')
+                    item['year'] = future_date.year
+                    
+                results.append(item)
+            STAGE_SECONDS.observe(time.perf_counter() - formatting, stage='formatting')
+            return results
+
+        formatted = {view: format_results(forecasts[view], view) for view in ('daily', 'weekly', 'monthly')}
+        if 'pollutants' in forecasts:
+            # Multivariate models forecast each pollutant in the same rollout as AQI
+            formatted['pollutants'] = {
+                channel: {view: np.round(np.maximum(0, values), 2).tolist() for view, values in views.items()}
+                for channel, views in forecasts['pollutants'].items()
+            }
+        return formatted
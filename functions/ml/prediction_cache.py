@@ -0,0 +1,101 @@
+"""
+TTL cache for /predict responses with single-flight computation
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+
+
+class PredictionCache:
+    """Caches responses per (data version, model version) key; concurrent misses share one computation"""
+
+    def __init__(self, ttl=60, max_entries=32, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._clock = clock
+        self._entries = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute, cacheable=lambda value: True):
+        """Return the cached value for key, or run compute() once for all concurrent callers"""
+        state, value = self._begin(key)
+        if state == 'hit':
+            return value
+        if state == 'wait':
+            return value.result()
+        try:
+            result = compute()
+        except BaseException as e:
+            self._fail(key, value, e)
+            raise
+        self._finish(key, value, result, cacheable)
+        return result
+
+    async def get_or_compute_async(self, key, compute, cacheable=lambda value: True):
+        """Async variant of get_or_compute; compute is a coroutine function"""
+        state, value = self._begin(key)
+        if state == 'hit':
+            return value
+        if state == 'wait':
+            return await asyncio.wrap_future(value)
+        try:
+            result = await compute()
+        except BaseException as e:
+            self._fail(key, value, e)
+            raise
+        self._finish(key, value, result, cacheable)
+        return result
+
+    def _begin(self, key):
+        """Classify a lookup as ('hit', value), ('wait', flight) or ('lead', flight)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > self._clock():
+                self.hits += 1
+                return 'hit', entry[1]
+            flight = self._inflight.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                return 'wait', flight
+            flight = self._inflight[key] = Future()
+            self.misses += 1
+            return 'lead', flight
+
+    def _finish(self, key, flight, value, cacheable):
+        with self._lock:
+            del self._inflight[key]
+            if cacheable(value):
+                self._store(key, value)
+        flight.set_result(value)
+
+    def _fail(self, key, flight, error):
+        with self._lock:
+            del self._inflight[key]
+        flight.set_exception(error)
+
+    def _store(self, key, value):
+        now = self._clock()
+        self._entries = {k: e for k, e in self._entries.items() if e[0] > now}
+        while len(self._entries) >= self.max_entries:
+            self._entries.pop(next(iter(self._entries)))
+        self._entries[key] = (now + self.ttl, value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'entries': len(self._entries),
+                'ttl_seconds': self.ttl
+            }
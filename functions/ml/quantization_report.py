@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Compare reduced-precision inference (int8, bf16) against fp32 on held-out windows
+
+The windows come from the held-out tail of the series train_model.py trains on (the local
+history, else its seeded synthetic data), so the model never saw the values it is scored on.
+
+Usage: python quantization_report.py [artifact_path] [output_path]
+"""
+
+import io
+import json
+import sys
+import time
+import numpy as np
+import torch
+from aqi_lstm_model import AQILSTMPredictor, forecast_windows
+from backtest import holdout_split
+from train_model import load_training_data
+
+def held_out_windows(data, lookback=30, horizon=90, count=64):
+    """(window, actual future AQI) pairs at evenly spaced cutoffs in the held-out tail of `data`
+
+    `data` is the training series (or per-sensor list of them); the split matches train_model.py's.
+    """
+    _, evaluation = holdout_split(data, lookback=lookback, steps=horizon)
+    if evaluation is None:
+        raise ValueError("Too little data to hold out a period the model was not trained on")
+    windows, actuals, _ = forecast_windows(evaluation, lookback, horizon, max_cutoffs=count)
+    return windows, actuals
+
+def model_bytes(model):
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return len(buffer.getvalue())
+
+def step_latency_ms(predictor, window, steps=90, repeats=20):
+    predictor.predict_batch(window[None], steps=steps)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        predictor.predict_batch(window[None], steps=steps)
+    return (time.perf_counter() - start) / repeats / steps * 1000
+
+def quantization_report(artifact_path='models/aqi_lstm_model.pt', output_path='models/quantization_report.json',
+                        precisions=('fp32', 'int8', 'bf16'), data=None, count=64):
+    """Forecast error, drift from fp32, per-step latency and weight size for each precision
+
+    `data` defaults to the series train_model.py trains on; only its held-out tail is forecast.
+    """
+    model = AQILSTMPredictor()
+    model.load_artifact(artifact_path)
+    data = load_training_data(model.channels) if data is None else data
+    windows, actuals = held_out_windows(data, lookback=model.lookback, count=count)
+    horizon = actuals.shape[1]
+
+    report = {'artifact': artifact_path, 'windows': len(windows), 'horizon': horizon, 'precisions': {}}
+    reference = None
+    for precision in precisions:
+        predictor = AQILSTMPredictor(decode=AQILSTMPredictor.SERVING_DECODE)
+        predictor.load_artifact(artifact_path, precision=precision)
+        predictions = predictor.predict_batch(windows, steps=horizon)
+        if predictor.multivariate:
+            predictions = predictions[..., 0]
+        if reference is None:
+            reference = predictions
+        errors = predictions - actuals
+        drift = np.abs(predictions - reference)
+        report['precisions'][precision] = {
+            'mae': float(np.abs(errors).mean()),
+            'rmse': float(np.sqrt((errors ** 2).mean())),
+            'mae_by_horizon': {str(h): float(np.abs(errors[:, :h]).mean()) for h in (7, 28, 90) if h <= horizon},
+            'mean_abs_diff_vs_fp32': float(drift.mean()),
+            'max_abs_diff_vs_fp32': float(drift.max()),
+            'step_latency_ms': step_latency_ms(predictor, windows[0]),
+            'model_bytes': model_bytes(predictor.model)
+        }
+
+    with open(output_path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\n{'precision':<10}{'MAE':>8}{'RMSE':>8}{'Δ fp32':>9}{'ms/step':>9}{'KB':>8}")
+    for precision, row in report['precisions'].items():
+        print(f"{precision:<10}{row['mae']:>8.2f}{row['rmse']:>8.2f}{row['mean_abs_diff_vs_fp32']:>9.3f}"
+              f"{row['step_latency_ms']:>9.3f}{row['model_bytes'] / 1024:>8.1f}")
+    print(f"\n📁 Report saved to {output_path}")
+    return report
+
+if __name__ == '__main__':
+    quantization_report(*sys.argv[1:3])
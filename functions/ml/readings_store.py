@@ -0,0 +1,241 @@
+"""
+Local ring buffers of recent sensor readings, synced from Firebase incrementally
+"""
+
+import io
+import json
+import logging
+import threading
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+# Numeric channels buffered for every reading; models pick the subset they were trained on
+READING_CHANNELS = ('aqi', 'pm25', 'pm10', 'gas1_ppm', 'gas2_ppm', 'gas3_ppm')
+
+# Readings kept per sensor, and so the longest lookback a served model can be given without padding
+READINGS_CAPACITY = 30
+
+
+def check_servable_lookback(lookback):
+    """Raise ValueError for a lookback longer than the readings the API keeps per sensor"""
+    if lookback > READINGS_CAPACITY:
+        raise ValueError(f"Lookback {lookback} exceeds the {READINGS_CAPACITY} readings the API keeps per sensor")
+
+
+class UnknownSensor(KeyError):
+    """Raised when asking for a sensor the store has no readings for"""
+
+
+def sensor_id(reading, precision=3):
+    """Device key when the reading carries one, otherwise its coordinates rounded to ~100m"""
+    device = reading.get('deviceId') or reading.get('device')
+    if device:
+        return str(device)
+    lat, lon = reading.get('lat'), reading.get('lon')
+    if not lat or not lon:
+        return None
+    return f"{round(float(lat), precision)},{round(float(lon), precision)}"
+
+
+def reading_features(readings, channels=READING_CHANNELS):
+    """(N, C) float matrix of the given channels, built in one pass; missing values are NaN"""
+    return np.array(
+        [[reading.get(channel, np.nan) for channel in channels] for reading in readings],
+        dtype=np.float64
+    ).reshape(len(readings), len(channels))
+
+
+class RingBuffer:
+    """Fixed-size NumPy ring buffer of floats, or of `width`-wide rows"""
+
+    def __init__(self, capacity, width=None):
+        self.capacity = capacity
+        self.width = width
+        self._values = np.zeros(capacity if width is None else (capacity, width), dtype=np.float64)
+        self._next = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def append(self, values):
+        values = np.asarray(values, dtype=np.float64)[-self.capacity:]
+        n = len(values)
+        if n == 0:
+            return
+        positions = (self._next + np.arange(n)) % self.capacity
+        self._values[positions] = values
+        self._next = (self._next + n) % self.capacity
+        self._size = min(self.capacity, self._size + n)
+
+    def snapshot(self):
+        """Buffered values in chronological order (a copy)"""
+        positions = (self._next - self._size + np.arange(self._size)) % self.capacity
+        return self._values[positions]
+
+
+class ReadingsStore:
+    """Keeps recent AQI readings in memory, overall and per sensor, so requests never hit Firebase"""
+
+    def __init__(self, capacity=READINGS_CAPACITY, path='/readings', db_module=None, cold_start_limit=None, max_sensors=256):
+        self.capacity = capacity
+        self.path = path
+        self.cold_start_limit = cold_start_limit or capacity
+        self.max_sensors = max_sensors
+        self.last_key = None
+        # Readings taken in over the store's lifetime; lets a copy of the state tell how many are new
+        self.received = 0
+        self._db = db_module
+        self._all = RingBuffer(capacity, width=len(READING_CHANNELS))
+        self._sensors = {}
+        self._locations = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._poller = None
+        self._listeners = []
+
+    @property
+    def db(self):
+        if self._db is None:
+            from firebase_admin import db
+            self._db = db
+        return self._db
+
+    def add_listener(self, callback):
+        """Call callback(added) from the syncing thread whenever a sync brings in new readings"""
+        self._listeners.append(callback)
+
+    @property
+    def primed(self):
+        return self.last_key is not None
+
+    def sync(self):
+        """Pull readings newer than the last seen key (the last `cold_start_limit` on cold start)"""
+        query = self.db.reference(self.path).order_by_key()
+        if self.last_key is None:
+            limit = self.cold_start_limit
+        else:
+            # start_at is inclusive, so ask for one extra and drop the key we already have
+            query = query.start_at(self.last_key)
+            limit = self.cold_start_limit + 1
+        data = query.limit_to_last(limit).get()
+        if not data:
+            return 0
+        keys = sorted(data)
+        readings = [
+            data[key] for key in keys
+            if key != self.last_key and isinstance(data[key], dict) and 'aqi' in data[key]
+        ]
+        features = reading_features(readings)
+        by_sensor = {}
+        for row, reading in enumerate(readings):
+            sid = sensor_id(reading)
+            if sid is not None:
+                by_sensor.setdefault(sid, []).append(row)
+        with self._lock:
+            self._all.append(features)
+            for sid, rows in by_sensor.items():
+                self._append_sensor(sid, features[rows], readings[rows[-1]])
+            self.last_key = keys[-1]
+            self.received += len(readings)
+        if readings:
+            for callback in self._listeners:
+                callback(len(readings))
+        return len(readings)
+
+    def export_state(self):
+        """The buffered readings as .npz bytes (arrays and JSON only, no pickle), for load_state in another process"""
+        with self._lock:
+            sensors = list(self._sensors)
+            meta = {
+                'last_key': self.last_key,
+                'received': self.received,
+                'sensors': sensors,
+                'locations': [self._locations[sid] for sid in sensors]
+            }
+            arrays = {'overall': self._all.snapshot()}
+            arrays.update({f'sensor{i}': self._sensors[sid].snapshot() for i, sid in enumerate(sensors)})
+        arrays['meta'] = np.frombuffer(json.dumps(meta).encode(), dtype=np.uint8)
+        buffer = io.BytesIO()
+        np.savez(buffer, **arrays)
+        return buffer.getvalue()
+
+    def load_state(self, data):
+        """Replace the buffers with an export_state() snapshot; returns how many readings it adds"""
+        with np.load(io.BytesIO(data), allow_pickle=False) as arrays:
+            meta = json.loads(arrays['meta'].tobytes())
+            overall = RingBuffer(self.capacity, width=len(READING_CHANNELS))
+            overall.append(arrays['overall'])
+            sensors = {}
+            for i, sid in enumerate(meta['sensors']):
+                sensors[sid] = RingBuffer(self.capacity, width=len(READING_CHANNELS))
+                sensors[sid].append(arrays[f'sensor{i}'])
+        with self._lock:
+            added = max(0, meta['received'] - self.received)
+            self._all = overall
+            self._sensors = sensors
+            self._locations = dict(zip(meta['sensors'], meta['locations']))
+            self.last_key = meta['last_key']
+            self.received = meta['received']
+        return added
+
+    def _append_sensor(self, sid, features, latest):
+        buffer = self._sensors.pop(sid, None)
+        if buffer is None:
+            buffer = RingBuffer(self.capacity, width=len(READING_CHANNELS))
+        buffer.append(features)
+        # Re-inserting keeps the dict ordered by last update, so the stalest sensor is first to go
+        self._sensors[sid] = buffer
+        self._locations[sid] = {'lat': latest.get('lat'), 'lon': latest.get('lon')}
+        while len(self._sensors) > self.max_sensors:
+            stale = next(iter(self._sensors))
+            del self._sensors[stale]
+            del self._locations[stale]
+
+    def snapshot(self, sensor=None, channels=('aqi',)):
+        """Buffered readings in chronological order, for one sensor or across all of them;
+        a 1-D array for a single channel, otherwise (N, len(channels))"""
+        columns = [READING_CHANNELS.index(channel) for channel in channels]
+        with self._lock:
+            if sensor is None:
+                values = self._all.snapshot()
+            elif sensor not in self._sensors:
+                raise UnknownSensor(sensor)
+            else:
+                values = self._sensors[sensor].snapshot()
+        return values[:, columns[0]] if len(columns) == 1 else values[:, columns]
+
+    def sensors(self):
+        """Known sensors with their latest location and buffered reading count"""
+        with self._lock:
+            return {
+                sid: {'location': self._locations[sid], 'readings': len(buffer)}
+                for sid, buffer in self._sensors.items()
+            }
+
+    def start(self, interval=15):
+        """Poll for new readings in a background thread"""
+        if self._poller is not None:
+            return
+        self._stop.clear()
+        self._poller = threading.Thread(target=self._poll, args=(interval,), daemon=True)
+        self._poller.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._poller is not None:
+            self._poller.join()
+            self._poller = None
+
+    def _poll(self, interval):
+        while True:
+            try:
+                added = self.sync()
+                if added:
+                    logger.info("Synced new readings", extra={'added': added, 'last_key': self.last_key})
+            except Exception as e:
+                logger.warning("Readings sync failed", extra={'error': str(e)})
+            if self._stop.wait(interval):
+                return
@@ -0,0 +1,138 @@
+"""
+Opt-in profiling of a single /predict request, for admins, without redeploying
+"""
+
+import copy
+import cProfile
+import hmac
+import io
+import os
+import pstats
+import threading
+import time
+from datetime import datetime
+
+PROFILE_MODES = ('torch', 'python')
+
+
+class ProfilingRejected(Exception):
+    """Raised when a profile is requested too soon after the last one, or while one is running"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def unbatched(service):
+    """A shallow copy of the service whose forecasts run on the calling thread
+
+    The micro-batcher decodes on its own thread, which neither profiler follows, so the
+    profiled request skips it; everything else (readings, model, formatting) is shared.
+    """
+    from forecast_engine import ForecastEngine
+    direct = copy.copy(service)
+    direct.engine = ForecastEngine(service.predictor)
+    return direct
+
+
+class RequestProfiler:
+    """Runs one prediction under the torch profiler or cProfile and writes the trace to `directory`
+
+    Disabled (and never consulted) unless an admin key is configured. At most one profile runs
+    at a time and profiles start at least `min_interval` seconds apart; only the newest
+    `max_files` traces are kept.
+    """
+
+    def __init__(self, admin_key, directory='profiles', min_interval=60.0, max_files=20, clock=time.monotonic):
+        self.admin_key = admin_key
+        self.directory = directory
+        self.min_interval = min_interval
+        self.max_files = max_files
+        self.profiles = 0
+        self.rejected = 0
+        self._clock = clock
+        self._last_start = None
+        self._running = False
+        self._lock = threading.Lock()
+
+    def authorized(self, key):
+        return bool(key) and hmac.compare_digest(key.encode(), self.admin_key.encode())
+
+    def acquire(self):
+        """Claim the profiling slot or raise ProfilingRejected"""
+        with self._lock:
+            now = self._clock()
+            wait = 0.0 if self._last_start is None else self._last_start + self.min_interval - now
+            if self._running or wait > 0:
+                self.rejected += 1
+                raise ProfilingRejected("A profile was taken recently, retry later", retry_after=max(1, int(wait + 0.999)))
+            self._running = True
+            self._last_start = now
+
+    def release(self):
+        with self._lock:
+            self._running = False
+
+    def run(self, mode, fn, *args):
+        """fn(*args) under the chosen profiler; returns (result, summary) and writes the trace file"""
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode: {mode} (expected one of {PROFILE_MODES})")
+        os.makedirs(self.directory, exist_ok=True)
+        name = f"predict-{datetime.now().strftime('%Y%m%dT%H%M%S%f')}"
+        started = time.perf_counter()
+        if mode == 'torch':
+            result, top, name = self._torch(name, fn, args)
+        else:
+            result, top, name = self._python(name, fn, args)
+        summary = {'mode': mode, 'seconds': round(time.perf_counter() - started, 4), 'trace': name, 'top': top}
+        with self._lock:
+            self.profiles += 1
+        self._prune()
+        return result, summary
+
+    def path(self, name):
+        """Location of a trace written by this profiler, or None for anything else"""
+        if os.path.basename(name) != name or not name.startswith('predict-'):
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.isfile(path) else None
+
+    def stats(self):
+        with self._lock:
+            return {'profiles': self.profiles, 'rejected': self.rejected, 'running': self._running}
+
+    def _torch(self, name, fn, args, rows=10):
+        import torch
+        with torch.profiler.profile(activities=[torch.profiler.ProfilerActivity.CPU], record_shapes=True) as prof:
+            result = fn(*args)
+        name += '.trace.json'
+        # Chrome trace format: open in chrome://tracing or ui.perfetto.dev
+        prof.export_chrome_trace(os.path.join(self.directory, name))
+        averages = sorted(prof.key_averages(), key=lambda event: event.self_cpu_time_total, reverse=True)[:rows]
+        top = [
+            {'name': event.key, 'calls': event.count, 'self_ms': round(event.self_cpu_time_total / 1000, 3)}
+            for event in averages
+        ]
+        return result, top, name
+
+    def _python(self, name, fn, args, rows=10):
+        profiler = cProfile.Profile()
+        result = profiler.runcall(fn, *args)
+        name += '.prof'
+        # pstats format: inspect with `python -m pstats` or snakeviz
+        profiler.dump_stats(os.path.join(self.directory, name))
+        stats = pstats.Stats(profiler, stream=io.StringIO())
+        entries = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:rows]
+        top = [
+            {'name': f'{os.path.basename(file)}:{line}({func})', 'calls': calls, 'self_ms': round(self_time * 1000, 3)}
+            for (file, line, func), (_, calls, self_time, _, _) in entries
+        ]
+        return result, top, name
+
+    def _prune(self):
+        traces = sorted(
+            (entry for entry in os.scandir(self.directory) if entry.name.startswith('predict-')),
+            key=lambda entry: entry.stat().st_mtime
+        )
+        for entry in traces[:-self.max_files]:
+            os.remove(entry.path)
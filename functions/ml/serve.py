@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Multi-process serving: forked API workers on one socket, sharing model weights and readings
+
+The parent imports torch and the service modules, publishes the model to the registry and
+reads it into the page cache, then forks the workers, so the imported runtime is shared
+copy-on-write and every worker memory-maps the same artifact pages. A single spawned fetcher
+process is the only Firebase client; it publishes the readings buffer to shared memory, which
+the workers read instead of polling Firebase themselves. One worker also connects to Firebase to
+write refreshed forecasts to FORECAST_WRITE_PATH, when that is set. Dead workers are restarted,
+and a restarted writer stays the writer.
+
+Usage: python serve.py [--workers N] [--host 0.0.0.0] [--port 8000]
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import time
+
+logger = logging.getLogger('aqi_serve')
+
+STANDALONE_ARTIFACT = 'models/aqi_lstm_model.pt'
+
+
+def preload(registry_root):
+    """Everything workers can share, done once before forking"""
+    import predict_service  # noqa: F401 -- imports torch and the model code into the parent
+    from model_registry import ModelRegistry
+    registry = ModelRegistry(registry_root)
+    if registry.current() is None and os.path.exists(STANDALONE_ARTIFACT):
+        # Only registry artifacts are immutable, and so safe for workers to memory-map
+        registry.publish(STANDALONE_ARTIFACT)
+    current = registry.current()
+    if current is not None:
+        with open(registry.path(current['version']), 'rb') as f:
+            while f.read(1 << 20):
+                pass
+        logger.info("Model preloaded", extra={'model_version': current['version']})
+
+
+def run_worker(sock, workers, writes_forecasts=False):
+    """Forked child: serve the app on the inherited socket, then exit without returning to the parent's loop"""
+    import uvicorn
+    import main
+    status = 0
+    try:
+        main.FORECAST_WRITER = writes_forecasts
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        # Split the cores between workers so their torch thread pools don't oversubscribe them
+        main.inference_pool.torch_threads = main.TORCH_THREADS_PER_WORKER or max(
+            1, (os.cpu_count() or 1) // (workers * main.INFERENCE_WORKERS)
+        )
+        uvicorn.Server(uvicorn.Config(main.app, log_config=None)).run(sockets=[sock])
+    except BaseException:
+        logger.exception("Worker failed")
+        status = 1
+    finally:
+        os._exit(status)
+
+
+def start_fetcher(block, interval):
+    from shared_readings import run_fetcher
+    # Spawned rather than forked: it never needs torch, and it owns the only Firebase client
+    fetcher = multiprocessing.get_context('spawn').Process(
+        target=run_fetcher, args=(block.name, interval), name='readings-fetcher', daemon=True
+    )
+    fetcher.start()
+    return fetcher
+
+
+def serve(workers, host='0.0.0.0', port=8000):
+    import main
+    from shared_readings import SharedBlock
+    block = SharedBlock.create()
+    main.SHARED_READINGS = block.name
+    fetcher = start_fetcher(block, main.READINGS_POLL_INTERVAL)
+    preload(main.MODEL_REGISTRY_ROOT)
+
+    sock = socket.create_server((host, port), backlog=2048)
+    sock.set_inheritable(True)
+    children = {}
+    stopping = False
+
+    def fork_worker(writes_forecasts=False):
+        pid = os.fork()
+        if pid == 0:
+            run_worker(sock, workers, writes_forecasts)
+        children[pid] = writes_forecasts
+
+    def shutdown(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            os.kill(pid, signal.SIGTERM)
+
+    for index in range(workers):
+        fork_worker(writes_forecasts=index == 0)
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    logger.info("Serving", extra={'workers': workers, 'host': host, 'port': port, 'pids': list(children)})
+
+    try:
+        while children:
+            for pid in list(children):
+                done, status = os.waitpid(pid, os.WNOHANG)
+                if not done:
+                    continue
+                writes_forecasts = children.pop(pid)
+                if not stopping:
+                    logger.warning("Worker exited, restarting", extra={'pid': pid, 'status': status})
+                    fork_worker(writes_forecasts)
+            if not stopping and not fetcher.is_alive():
+                logger.warning("Readings fetcher exited, restarting", extra={'exitcode': fetcher.exitcode})
+                fetcher = start_fetcher(block, main.READINGS_POLL_INTERVAL)
+            time.sleep(0.5)
+    finally:
+        fetcher.terminate()
+        fetcher.join()
+        sock.close()
+        block.close()
+        block.unlink()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the prediction API in several worker processes')
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('API_WORKERS', os.cpu_count() or 1)))
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8000)
+    args = parser.parse_args()
+    serve(args.workers, args.host, args.port)
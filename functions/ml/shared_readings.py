@@ -0,0 +1,125 @@
+"""
+Readings shared across API worker processes: one fetcher process polls Firebase and publishes its
+buffer to shared memory, and each worker's store reads it from there
+"""
+
+import os
+import signal
+import threading
+import time
+from multiprocessing import shared_memory
+import numpy as np
+from readings_store import READINGS_CAPACITY, ReadingsStore
+
+# Enough for the overall buffer plus 256 sensors of 30 six-channel readings, with room to spare
+DEFAULT_BLOCK_BYTES = 4 * 1024 * 1024
+
+
+class SharedBlock:
+    """A shared-memory buffer with a single writer and any number of readers
+
+    The header holds a generation counter and the payload length. The writer makes the
+    generation odd while it copies a payload in and even again when done (a seqlock), so
+    readers can detect a torn read and retry without any cross-process lock.
+    """
+
+    HEADER_BYTES = 16
+
+    def __init__(self, memory):
+        self.memory = memory
+        self._header = np.ndarray((2,), dtype=np.uint64, buffer=memory.buf)
+
+    @classmethod
+    def create(cls, size=DEFAULT_BLOCK_BYTES):
+        block = cls(shared_memory.SharedMemory(create=True, size=cls.HEADER_BYTES + size))
+        block._header[:] = 0
+        return block
+
+    @classmethod
+    def attach(cls, name):
+        # Workers and the fetcher share serve.py's resource tracker, so attaching doesn't hand
+        # ownership to this process; the creator unlinks the block
+        return cls(shared_memory.SharedMemory(name=name))
+
+    @property
+    def name(self):
+        return self.memory.name
+
+    @property
+    def capacity(self):
+        return self.memory.size - self.HEADER_BYTES
+
+    @property
+    def generation(self):
+        return int(self._header[0])
+
+    def write(self, payload):
+        if len(payload) > self.capacity:
+            raise ValueError(f"Payload of {len(payload)} bytes exceeds the {self.capacity}-byte shared block")
+        generation = int(self._header[0])
+        self._header[0] = generation + 1
+        self._header[1] = len(payload)
+        self.memory.buf[self.HEADER_BYTES:self.HEADER_BYTES + len(payload)] = payload
+        self._header[0] = generation + 2
+
+    def read(self, known=None, attempts=100):
+        """(generation, payload) for the latest write, or (known, None) when nothing newer is available"""
+        for _ in range(attempts):
+            generation = int(self._header[0])
+            if generation == 0 or generation == known:
+                return known, None
+            if generation % 2:
+                time.sleep(0.001)
+                continue
+            length = int(self._header[1])
+            payload = bytes(self.memory.buf[self.HEADER_BYTES:self.HEADER_BYTES + length])
+            if int(self._header[0]) == generation:
+                return generation, payload
+        return known, None
+
+    def close(self):
+        self._header = None
+        self.memory.close()
+
+    def unlink(self):
+        self.memory.unlink()
+
+
+class SharedReadingsStore(ReadingsStore):
+    """A ReadingsStore filled from a SharedBlock instead of Firebase; sync() is a generation check"""
+
+    def __init__(self, block, capacity=READINGS_CAPACITY, **options):
+        super().__init__(capacity, **options)
+        self.block = block
+        self._generation = None
+
+    def sync(self):
+        self._generation, data = self.block.read(self._generation)
+        if data is None:
+            return 0
+        added = self.load_state(data)
+        if added:
+            for callback in self._listeners:
+                callback(added)
+        return added
+
+
+def run_fetcher(name, interval=15.0, capacity=READINGS_CAPACITY, cold_start_limit=1000):
+    """Process entry point: the only Firebase client, republishing its buffer after every sync with new readings"""
+    # Not main's: the fetcher has no use for the app, the inference pool or torch
+    from firebase_client import init_firebase
+    from observability import configure_logging
+    configure_logging(os.environ.get('LOG_LEVEL', 'INFO'))
+    block = SharedBlock.attach(name)
+    store = ReadingsStore(capacity=capacity, path='/readings', cold_start_limit=cold_start_limit)
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    # Without Firebase the block stays empty and workers use simulation mode, as a single process would
+    if init_firebase():
+        store.add_listener(lambda added: block.write(store.export_state()))
+        store.start(interval=interval)
+    while not stop.wait(1):
+        pass
+    store.stop()
+    block.close()
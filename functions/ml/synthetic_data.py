@@ -0,0 +1,95 @@
+"""
+Vectorized, seedable synthetic AQI generator for training bootstrap, benchmarks and load tests
+
+Every term is computed for all sensors and time steps at once: seasonal curves from a time
+grid, persistent drift and pollution episodes as first-order recursions evaluated with
+cumulative sums over precomputed noise.
+"""
+
+import numpy as np
+from readings_store import READING_CHANNELS
+
+# Rough Delhi ratios of each pollutant to AQI (µg/m³ for PM, ppm for the gas sensors)
+POLLUTANT_RATIOS = {'pm25': 0.55, 'pm10': 0.9, 'gas1_ppm': 0.008, 'gas2_ppm': 0.0004, 'gas3_ppm': 0.0003}
+
+# Sensor sites are scattered around central Delhi
+DELHI_CENTER = (28.6139, 77.2090)
+
+
+def decay_filter(impulses, phi, block=None):
+    """y[t] = phi * y[t-1] + impulses[t] along the last axis, using cumulative sums within blocks
+
+    Inside a block the recursion is phi**j times a cumsum of impulses scaled by phi**-k; blocks are
+    short enough for phi**-block to stay well conditioned, and only the carried state is looped.
+    """
+    if block is None:
+        # Keep phi**-block below 1e8
+        block = int(np.clip(8 / -np.log10(phi), 1, 1024))
+    impulses = np.asarray(impulses, dtype=np.float64)
+    *lead, n = impulses.shape
+    blocks = -(-n // block)
+    padded = np.zeros((*lead, blocks * block))
+    padded[..., :n] = impulses
+    padded = padded.reshape(*lead, blocks, block)
+    powers = phi ** np.arange(1, block + 1)
+    local = np.cumsum(padded / powers, axis=-1) * powers
+    state = np.zeros(lead)
+    for b in range(blocks):
+        local[..., b, :] += state[..., None] * powers
+        state = local[..., b, -1]
+    return local.reshape(*lead, blocks * block)[..., :n]
+
+
+def generate_aqi(sensors=1, points=500, base_aqi=150, seed=None, step_hours=1.0,
+                 daily_amplitude=20, weekly_amplitude=15, noise=10, persistence=0.98,
+                 spike_rate=1 / 168, spike_scale=80, spike_decay=0.9, low=20, high=400):
+    """(sensors, points) hourly AQI series: daily and weekly cycles, persistent drift and pollution episodes
+
+    spike_rate is the expected number of episodes per step; each adds an exponentially sized jump
+    that decays by spike_decay per step. Sensors share the seasonal shape with their own phase and
+    baseline.
+    """
+    rng = np.random.default_rng(seed)
+    hours = np.arange(points) * step_hours
+    # Each sensor gets its own baseline and a slightly shifted daily cycle
+    bases = np.full((sensors, 1), float(base_aqi))
+    phases = np.zeros((sensors, 1))
+    if sensors > 1:
+        bases += rng.normal(0, 0.15 * base_aqi, size=(sensors, 1))
+        phases += rng.uniform(-0.5, 0.5, size=(sensors, 1))
+    seasonal = (daily_amplitude * np.sin(2 * np.pi * hours / 24 + phases)
+                + weekly_amplitude * np.sin(2 * np.pi * hours / (24 * 7)))
+    drift = decay_filter(rng.normal(0, noise, size=(sensors, points)), persistence)
+    arrivals = rng.random((sensors, points)) < spike_rate
+    episodes = decay_filter(arrivals * rng.exponential(spike_scale, size=(sensors, points)), spike_decay)
+    return np.clip(bases + seasonal + drift + episodes, low, high)
+
+
+def synthetic_pollutants(aqi, channels=READING_CHANNELS[1:], seed=None):
+    """Pollutant columns that track an AQI series (last axis is time), with independent noise per channel"""
+    rng = np.random.default_rng(seed)
+    aqi = np.asarray(aqi, dtype=np.float64)[..., None]
+    scale = np.array([POLLUTANT_RATIOS[channel] for channel in channels])
+    noise = 1 + rng.normal(0, 0.1, size=aqi.shape[:-1] + (len(channels),))
+    return np.maximum(0, aqi * scale * noise)
+
+
+def generate_readings(sensors=4, points=168, seed=None, start=1_760_000_000, step_hours=1.0, **options):
+    """Firebase-shaped /readings data, {push key: reading}, for InMemoryDB fixtures and load tests"""
+    rng = np.random.default_rng(seed)
+    aqi = generate_aqi(sensors, points, seed=rng, step_hours=step_hours, **options)
+    pollutants = synthetic_pollutants(aqi, seed=rng)
+    locations = np.array(DELHI_CENTER) + rng.uniform(-0.15, 0.15, size=(sensors, 2))
+    timestamps = (start + np.arange(points) * step_hours * 3600).astype(np.int64) * 1000
+    readings = {}
+    # Interleave sensors the way they report: one reading per sensor per step
+    for t in range(points):
+        for s in range(sensors):
+            reading = {'timestamp': int(timestamps[t]), 'aqi': round(float(aqi[s, t]), 1),
+                       'lat': round(float(locations[s, 0]), 4), 'lon': round(float(locations[s, 1]), 4)}
+            reading.update({
+                channel: round(float(value), 4)
+                for channel, value in zip(READING_CHANNELS[1:], pollutants[s, t])
+            })
+            readings[f'-S{t * sensors + s:018d}'] = reading
+    return readings
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Tests for the self-contained inference artifact and the dependency-free scaler
+"""
+
+import os
+import tempfile
+import numpy as np
+import torch
+from sklearn.preprocessing import MinMaxScaler
+from aqi_lstm_model import AQILSTMPredictor, ArrayScaler
+
+
+def test_array_scaler_matches_sklearn():
+    data = np.random.default_rng(0).uniform(20, 400, size=(500, 1))
+    ours = ArrayScaler().fit(data)
+    theirs = MinMaxScaler().fit(data)
+
+    np.testing.assert_allclose(ours.transform(data), theirs.transform(data))
+    np.testing.assert_allclose(ours.inverse_transform(ours.transform(data)), data)
+    np.testing.assert_allclose(ArrayScaler.from_sklearn(theirs).transform(data), theirs.transform(data))
+
+
+def test_constant_series_does_not_divide_by_zero():
+    scaler = ArrayScaler().fit(np.full((10, 1), 150.0))
+    assert np.all(np.isfinite(scaler.transform(np.full((3, 1), 150.0))))
+
+
+def test_artifact_round_trip_reproduces_predictions():
+    torch.manual_seed(0)
+    predictor = AQILSTMPredictor(lookback=30, decode='stateful')
+    predictor.create_model()
+    predictor.scaler = ArrayScaler().fit(np.array([[0.0], [500.0]]))
+    recent_data = np.linspace(120, 180, 30)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'model.pt')
+        predictor.save_artifact(path, metadata={'data_points': 500})
+
+        loaded = AQILSTMPredictor(decode='stateful')
+        loaded.load_artifact(path)
+
+    np.testing.assert_allclose(
+        loaded.predict_sequence(recent_data, steps=90),
+        predictor.predict_sequence(recent_data, steps=90)
+    )
+    assert loaded.metadata['data_points'] == 500
+    assert loaded.model_version is not None
+
+
+def test_artifact_carries_the_architecture():
+    predictor = AQILSTMPredictor(lookback=12, hidden_size=16, num_layers=1, dropout=0.0)
+    predictor.create_model()
+    predictor.scaler = ArrayScaler().fit(np.array([[0.0], [500.0]]))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'model.pt')
+        predictor.save_artifact(path)
+        loaded = AQILSTMPredictor()
+        loaded.load_artifact(path)
+
+        # Artifacts written before the architecture was stored load with the old fixed settings
+        artifact = torch.load(path, weights_only=True)
+        artifact['config'] = {'lookback': 30, 'channels': ['aqi']}
+        artifact['state_dict'] = AQILSTMPredictor().create_model().state_dict()
+        torch.save(artifact, path)
+        legacy = AQILSTMPredictor()
+        legacy.load_artifact(path)
+
+    assert loaded.architecture == {'lookback': 12, 'hidden_size': 16, 'num_layers': 1, 'dropout': 0.0}
+    assert loaded.model.lstm.hidden_size == 16 and loaded.model.num_layers == 1
+    assert legacy.architecture == {'lookback': 30, 'hidden_size': 64, 'num_layers': 2, 'dropout': 0.2}
+
+
+if __name__ == '__main__':
+    test_array_scaler_matches_sklearn()
+    test_constant_series_does_not_divide_by_zero()
+    test_artifact_round_trip_reproduces_predictions()
+    test_artifact_carries_the_architecture()
+    print("✅ Artifact tests passed")
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Tests for the walk-forward backtesting engine
+"""
+
+import subprocess
+import sys
+import numpy as np
+import torch
+from aqi_lstm_model import AQILSTMPredictor, ArrayScaler
+from backtest import holdout_split, mean_mae, score, select_cutoffs, walk_forward
+from synthetic_data import generate_aqi
+
+
+class OracleWithOffset:
+    """Forecasts the true future of a known series plus a constant, so every error is exactly `offset`"""
+    lookback = 30
+    multivariate = False
+
+    def __init__(self, series, offset):
+        self.series = series
+        self.offset = offset
+        self.batches = 0
+
+    def predict_batch(self, windows, steps=7, decode=None):
+        self.batches += 1
+        windows = np.asarray(windows)
+        starts = [self._locate(window) for window in windows]
+        return np.stack([self.series[start:start + steps] + self.offset for start in starts])
+
+    def _locate(self, window):
+        matches = np.lib.stride_tricks.sliding_window_view(self.series, self.lookback)
+        return int(np.flatnonzero((matches == window).all(axis=1))[0]) + self.lookback
+
+
+def test_errors_per_horizon_and_category():
+    series = generate_aqi(points=400, seed=1)[0]
+    report = walk_forward(OracleWithOffset(series, offset=5.0), series, horizons=(7, 28, 90), batch_size=64)
+    assert report['cutoffs'] == 400 - 30 - 90 + 1
+    for horizon in ('7', '28', '90'):
+        entry = report['horizons'][horizon]
+        assert entry['mae'] == entry['rmse'] == entry['bias'] == 5.0
+        assert entry['count'] == report['cutoffs'] * int(horizon)
+        assert sum(c['count'] for c in entry['by_category'].values()) == entry['count']
+    assert mean_mae(report) == 5.0
+
+
+def test_all_cutoffs_share_batched_rollouts():
+    series = generate_aqi(points=1000, seed=2)[0]
+    oracle = OracleWithOffset(series, offset=0.0)
+    report = walk_forward(oracle, series, max_cutoffs=500, batch_size=256)
+    assert report['cutoffs'] == 500
+    assert oracle.batches == 2
+
+
+def test_score_groups_by_observed_category():
+    observed = np.array([[40.0, 120.0, 350.0]])
+    report = score(observed + np.array([[1.0, -2.0, 4.0]]), observed, horizons=(3,))
+    categories = report['3']['by_category']
+    assert categories['Good']['mae'] == 1.0
+    assert categories['Unhealthy for Sensitive Groups']['bias'] == -2.0
+    assert categories['Hazardous']['rmse'] == 4.0
+
+
+def test_cutoffs_and_holdout_leave_room_for_the_horizon():
+    cutoffs = select_cutoffs(200, lookback=30, steps=90, stride=5)
+    assert cutoffs[0] == 30 and cutoffs[-1] + 90 <= 200
+
+    data = np.arange(1000.0)
+    train, evaluation = holdout_split(data, lookback=30)
+    assert len(train) == 800
+    # The first forecast starts where training ends; everything it is scored on is unseen
+    np.testing.assert_array_equal(evaluation[30:], data[800:])
+
+    short = np.arange(200.0)
+    train, evaluation = holdout_split(short, lookback=30)
+    assert train is short and evaluation is None
+
+
+def test_per_sensor_series_are_split_one_by_one():
+    first, short, second = np.arange(1000.0), np.arange(200.0), np.arange(500.0)
+    train, evaluation = holdout_split([first, short, second], lookback=30)
+    # Split series come first, paired with their held-out parts; the short one only trains
+    assert [len(part) for part in train] == [800, 381, 200]
+    assert [len(part) for part in evaluation] == [230, 149]
+    np.testing.assert_array_equal(evaluation[1][30:], second[381:])
+    assert holdout_split([short], lookback=30)[1] is None
+
+
+def test_memory_mapped_history_is_backtested_in_place(tmp_path):
+    torch.manual_seed(0)
+    predictor = AQILSTMPredictor(lookback=30)
+    predictor.create_model()
+    predictor.scaler = ArrayScaler().fit(np.array([[0.0], [500.0]]))
+    series = generate_aqi(points=400, seed=4)[0].astype(np.float32)
+    mapped = np.memmap(tmp_path / 'aqi.npy', dtype=np.float32, mode='w+', shape=series.shape)
+    mapped[:] = series
+    assert walk_forward(predictor, mapped)['horizons'] == walk_forward(predictor, series)['horizons']
+
+
+def test_backtest_does_not_import_the_serving_stack():
+    # Spawned pool workers import this module; they only need the model code
+    check = "import sys, backtest; assert 'predict_service' not in sys.modules"
+    subprocess.run([sys.executable, '-c', check], check=True)
+
+
+def test_process_pool_matches_serial_rollout():
+    torch.manual_seed(0)
+    predictor = AQILSTMPredictor(lookback=30)
+    predictor.create_model()
+    predictor.scaler = ArrayScaler().fit(np.array([[0.0], [500.0]]))
+    series = generate_aqi(points=600, seed=3)[0]
+    serial = walk_forward(predictor, series, max_cutoffs=200)
+    parallel = walk_forward(predictor, series, max_cutoffs=200, workers=2)
+    for horizon in serial['horizons']:
+        assert abs(serial['horizons'][horizon]['mae'] - parallel['horizons'][horizon]['mae']) < 1e-3
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Smoke tests for the benchmark suite: every benchmark runs on a tiny workload and reports numbers
+"""
+
+import json
+import os
+import tempfile
+import numpy as np
+from aqi_lstm_model import AQILSTMPredictor
+from benchmark import (bench_api, bench_load, bench_predict_sequence, bench_training, build_artifact,
+                       flatten, make_service)
+
+
+def test_benchmarks_report_latency_and_throughput():
+    with tempfile.TemporaryDirectory() as tmp:
+        artifact = build_artifact(os.path.join(tmp, 'model.pt'))
+        assert bench_load(artifact)['artifact_load_ms'] > 0
+
+        predictor = AQILSTMPredictor(decode='stateful')
+        predictor.load_artifact(artifact)
+        latency = bench_predict_sequence(predictor, np.full(30, 150.0), repeats=2)
+        assert set(latency) == {'window', 'stateful'}
+        assert set(latency['stateful']) == {'7', '28', '90'}
+        assert latency['stateful']['90']['p50_ms'] > latency['stateful']['7']['p50_ms']
+
+        # One sensor, so concurrent requests share a cache key: the uncached run must still compute each one
+        service = make_service(artifact, sensors=1, seed=0, root=tmp)
+        try:
+            api = bench_api(service, requests=4, concurrency_levels=(1, 2))
+        finally:
+            service.batcher.stop()
+        assert api['uncached']['2']['ok'] == 4
+        assert service.batcher.stats()['requests'] >= 8
+        assert api['cached']['1']['requests_per_s'] > 0
+
+    training = bench_training(points=200, epochs=1, batch_size=32, seed=0)
+    assert training['windows_per_s'] > 0
+
+    flat = flatten({'a': {'b': 1.5, 'c': 'text'}, 'd': 2})
+    assert flat == {'a.b': 1.5, 'd': 2}
+    json.dumps(api)
+
+
+if __name__ == '__main__':
+    test_benchmarks_report_latency_and_throughput()
+    print("✅ Benchmark tests passed")
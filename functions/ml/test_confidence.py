@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Tests for backtest-calibrated confidence bands
+"""
+
+import os
+import tempfile
+import numpy as np
+import torch
+from aqi_lstm_model import AQILSTMPredictor, ArrayScaler
+
+
+def calibrated_predictor(decode='window'):
+    torch.manual_seed(0)
+    predictor = AQILSTMPredictor(lookback=30, decode=decode)
+    predictor.create_model()
+    predictor.scaler = ArrayScaler().fit(np.array([[0.0], [500.0]]))
+    series = 150 + 40 * np.sin(np.arange(300) / 5) + np.random.default_rng(0).normal(0, 10, 300)
+    predictor.calibrate_confidence(series, max_cutoffs=64)
+    return predictor
+
+
+def test_calibrated_bands_cover_flat_forecasts():
+    predictor = calibrated_predictor()
+    assert predictor.residual_quantiles['cutoffs'] == 64
+    flat = np.full(7, 150.0)
+
+    # The uncalibrated fallback gives a flat forecast zero width; residual quantiles do not
+    lower, upper = predictor.confidence_bands(flat, view='daily')
+    assert np.all(upper - lower > 0)
+
+    narrow_low, narrow_high = predictor.confidence_bands(flat, confidence_level=0.5, view='daily')
+    assert np.all(narrow_low >= lower) and np.all(narrow_high <= upper)
+
+    confidences = predictor.get_prediction_confidence(flat, view='daily')
+    assert [c['lower_bound'] for c in confidences] == lower.tolist()
+
+
+def test_calibration_uses_the_serving_decode(tmp_path):
+    from test_sensor_forecasts import make_service
+    service = make_service(str(tmp_path))
+    service.batcher.stop()
+    assert service.predictor.decode == AQILSTMPredictor.SERVING_DECODE
+    # Training builds its predictor with the default decode; its bands must still describe served forecasts
+    trained = calibrated_predictor()
+    served = calibrated_predictor(decode=service.predictor.decode)
+    assert trained.decode != served.decode
+    assert trained.residual_quantiles == served.residual_quantiles
+
+
+def test_uncalibrated_fallback():
+    predictor = AQILSTMPredictor()
+    confidences = predictor.get_prediction_confidence([100.0, 120.0, 140.0])
+    margin = np.std([100.0, 120.0, 140.0]) * 1.96
+    assert abs(confidences[0]['upper_bound'] - (100.0 + margin)) < 1e-9
+
+
+def test_calibration_survives_artifact_round_trip():
+    predictor = calibrated_predictor()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'model.pt')
+        predictor.save_artifact(path)
+        loaded = AQILSTMPredictor()
+        loaded.load_artifact(path)
+    assert loaded.residual_quantiles == predictor.residual_quantiles
+    for view in ('daily', 'weekly', 'monthly'):
+        np.testing.assert_allclose(
+            loaded.confidence_bands(np.full(3, 200.0), view=view),
+            predictor.confidence_bands(np.full(3, 200.0), view=view)
+        )
+
+
+if __name__ == '__main__':
+    test_calibrated_bands_cover_flat_forecasts()
+    test_uncalibrated_fallback()
+    test_calibration_survives_artifact_round_trip()
+    print("✅ Confidence tests passed")
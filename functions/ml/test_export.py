@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Tests for TorchScript / ONNX export and the exported inference backends
+"""
+
+import os
+import tempfile
+import numpy as np
+import pytest
+import torch
+from aqi_lstm_model import AQILSTMPredictor, ArrayScaler
+from export_model import export_model
+from inference_backends import exported_path
+
+
+def write_artifact(directory):
+    torch.manual_seed(0)
+    predictor = AQILSTMPredictor(lookback=30)
+    predictor.create_model()
+    predictor.scaler = ArrayScaler().fit(np.array([[0.0], [500.0]]))
+    path = os.path.join(directory, 'model.pt')
+    predictor.save_artifact(path)
+    return path
+
+
+def check_backend(kind):
+    with tempfile.TemporaryDirectory() as tmp:
+        artifact = write_artifact(tmp)
+        assert export_model(formats=(kind,), artifact_path=artifact)
+
+        predictor = AQILSTMPredictor(decode='stateful')
+        predictor.load_artifact(artifact)
+        windows = np.random.default_rng(1).uniform(50, 300, size=(4, 30))
+        eager = predictor.predict_batch(windows, steps=28)
+        predictor.use_backend(kind, exported_path(artifact, kind))
+        np.testing.assert_allclose(predictor.predict_batch(windows, steps=28), eager, atol=0.01)
+
+        # An export from a different model is refused
+        predictor.model_version = 'retrained'
+        try:
+            predictor.use_backend(kind, exported_path(artifact, kind))
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("Expected ValueError for a stale export")
+
+
+def test_torchscript_backend_matches_eager():
+    check_backend('torchscript')
+
+
+def test_onnx_backend_matches_eager():
+    pytest.importorskip('onnx')
+    pytest.importorskip('onnxruntime')
+    check_backend('onnx')
+
+
+if __name__ == '__main__':
+    test_torchscript_backend_matches_eager()
+    test_onnx_backend_matches_eager()
+    print("✅ Export tests passed")
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Tests for the single-rollout forecast engine
+"""
+
+import numpy as np
+from forecast_engine import ForecastEngine, aggregate_views, rollout_steps
+
+
+class CountingPredictor:
+    """Deterministic stand-in that records every rollout it is asked for"""
+
+    def __init__(self):
+        self.calls = []
+
+    def predict_sequence(self, recent_data, steps=7):
+        self.calls.append(steps)
+        return float(recent_data[-1]) + np.arange(1, steps + 1, dtype=float)
+
+
+def test_single_rollout_covers_all_views():
+    predictor = CountingPredictor()
+    engine = ForecastEngine(predictor)
+    forecasts = engine.forecast(np.full(30, 100.0))
+
+    assert predictor.calls == [90]
+    assert len(forecasts['daily']) == 7
+    assert len(forecasts['weekly']) == 4
+    assert len(forecasts['monthly']) == 3
+
+
+def test_views_are_averages_of_daily_trajectory():
+    daily = np.arange(1, 91, dtype=float)
+    views = aggregate_views(daily, {'daily': 7, 'weekly': 4, 'monthly': 3})
+
+    np.testing.assert_allclose(views['daily'], daily[:7])
+    np.testing.assert_allclose(views['weekly'], [daily[i*7:(i+1)*7].mean() for i in range(4)])
+    np.testing.assert_allclose(views['monthly'], [daily[i*30:(i+1)*30].mean() for i in range(3)])
+
+
+def test_rollout_length_follows_horizons():
+    assert rollout_steps({'daily': 7}) == 7
+    assert rollout_steps({'daily': 7, 'weekly': 4}) == 28
+    assert rollout_steps({'weekly': 20, 'monthly': 3}) == 140
+
+
+def test_unknown_view_is_rejected():
+    engine = ForecastEngine(CountingPredictor())
+    try:
+        engine.forecast(np.full(30, 100.0), horizons={'yearly': 1})
+    except ValueError:
+        return
+    raise AssertionError("Expected ValueError for unknown view")
+
+
+if __name__ == '__main__':
+    test_single_rollout_covers_all_views()
+    test_views_are_averages_of_daily_trajectory()
+    test_rollout_length_follows_horizons()
+    test_unknown_view_is_rejected()
+    print("✅ Forecast engine tests passed")
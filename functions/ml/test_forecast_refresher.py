@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Tests for the debounced background forecast refresher
+"""
+
+import tempfile
+import time
+from forecast_refresher import ForecastRefresher
+from test_sensor_forecasts import LOCATIONS, make_service
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("Timed out waiting for the refresher")
+        time.sleep(0.01)
+
+
+def test_refresh_serves_lookups_and_writes_back(tmp_path):
+    service = make_service(str(tmp_path))
+    db = service.readings.db
+    refresher = ForecastRefresher(service, write_path='/predictions/latest', db_module=db)
+    try:
+        assert refresher.lookup() is None
+        assert refresher.refresh()
+
+        overall = refresher.lookup()
+        assert overall['success'] and set(overall['predictions']) == {'daily', 'weekly', 'monthly'}
+        sid = next(iter(LOCATIONS))
+        assert refresher.lookup(sid)['predictions'] == refresher.lookup_batch()['sensors'][sid]['predictions']
+        assert set(refresher.lookup_batch([sid])['sensors']) == {sid}
+        assert refresher.lookup('unknown') is None and refresher.lookup_batch(['unknown']) is None
+
+        written = db.reference('/predictions/latest').get()
+        assert written['data_version'] == service.readings.last_key
+        assert {sensor['id'] for sensor in written['sensors']} == set(LOCATIONS)
+
+        stats = refresher.stats()
+        assert stats['refreshes'] == 1 and stats['last_refresh'] and stats['last_duration_ms'] > 0
+
+        # Results computed with another model are never served
+        service.predictor.model_version = 'retrained'
+        assert refresher.lookup() is None
+    finally:
+        service.batcher.stop()
+
+
+def test_bursts_of_readings_are_debounced(tmp_path):
+    service = make_service(str(tmp_path))
+    refresher = ForecastRefresher(service, debounce=0.2, min_interval=0)
+    service.readings.add_listener(refresher.notify)
+    try:
+        refresher.start()
+        wait_for(lambda: refresher.refreshes == 1)
+
+        readings = service.readings.db.reference('/readings')
+        for i in range(5):
+            lat, lon, base = LOCATIONS['28.614,77.209']
+            readings.push({'aqi': base + i, 'lat': lat, 'lon': lon})
+            service.readings.sync()
+            time.sleep(0.02)
+        wait_for(lambda: refresher.refreshes == 2)
+        time.sleep(0.3)
+        assert refresher.refreshes == 2
+        assert refresher.stats()['data_version'] == service.readings.last_key
+    finally:
+        refresher.stop()
+        service.batcher.stop()
+
+
+def test_refreshes_are_rate_limited(tmp_path):
+    service = make_service(str(tmp_path))
+    refresher = ForecastRefresher(service, debounce=0, min_interval=0.5)
+    try:
+        refresher.start()
+        wait_for(lambda: refresher.refreshes == 1)
+        started = time.monotonic()
+        refresher.notify()
+        wait_for(lambda: refresher.refreshes == 2)
+        assert time.monotonic() - started >= 0.3
+    finally:
+        refresher.stop()
+        service.batcher.stop()
+
+
+if __name__ == '__main__':
+    test_refresh_serves_lookups_and_writes_back(tempfile.mkdtemp())
+    test_bursts_of_readings_are_debounced(tempfile.mkdtemp())
+    test_refreshes_are_rate_limited(tempfile.mkdtemp())
+    print("✅ Forecast refresher tests passed")
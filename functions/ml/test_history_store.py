@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Tests for the day-partitioned on-disk readings history
+"""
+
+import tempfile
+import numpy as np
+import torch
+from aqi_lstm_model import AQILSTMPredictor, WindowDataset, forecast_windows
+from history_store import HistoryStore
+from local_firebase import InMemoryDB
+from train_model import load_history
+
+DAY = 86400
+
+
+def push_readings(db, count, start=1_760_000_000, step=3600):
+    readings = db.reference('/readings')
+    for i in range(count):
+        readings.push({
+            'aqi': 100 + i, 'pm25': 50 + i, 'timestamp': (start + i * step) * 1000,
+            'lat': 28.61 if i % 2 else 28.70, 'lon': 77.2
+        })
+
+
+def test_incremental_sync_is_partitioned_by_day():
+    db = InMemoryDB()
+    push_readings(db, 30)
+    with tempfile.TemporaryDirectory() as root:
+        store = HistoryStore(root, db_module=db, page_size=8)
+        assert store.sync() == 30
+        assert store.rows() == 30
+        assert len({entry['day'] for entry in store.segments()}) == 2
+
+        # Only readings after the last synced key are pulled, and the state survives a reopen
+        push_readings(db, 5, start=1_760_000_000 + 30 * 3600)
+        requests = len(db.requests)
+        reopened = HistoryStore(root, db_module=db, page_size=8)
+        assert reopened.sync() == 5
+        assert len(db.requests) - requests == 1
+        assert reopened.sync() == 0
+
+        series = reopened.series()
+        assert isinstance(series.base, np.memmap) or isinstance(series, np.memmap)
+        assert series.tolist() == list(range(100, 130)) + list(range(100, 105))
+        assert reopened.series(sensor='28.61,77.2').tolist()[:3] == [101, 103, 105]
+        assert reopened.series(channels=('aqi', 'pm25')).shape == (35, 2)
+        # Rows missing a requested channel are skipped
+        assert len(reopened.series(channels=('aqi', 'gas1_ppm'))) == 0
+
+        before = reopened.series().tolist()
+        assert reopened.compact() > 0
+        assert len(reopened.segments()) == len({entry['day'] for entry in reopened.segments()})
+        assert reopened.series().tolist() == before
+
+
+def test_training_reads_memory_mapped_history():
+    db = InMemoryDB()
+    push_readings(db, 200)
+    with tempfile.TemporaryDirectory() as root:
+        store = HistoryStore(root, db_module=db)
+        store.sync()
+        series = store.series()
+        torch.manual_seed(0)
+        predictor = AQILSTMPredictor(lookback=30)
+        predictor.train(series, epochs=1, batch_size=32)
+        assert predictor.scaler.data_min_[0] == 100 and predictor.scaler.data_max_[0] == 299
+        assert predictor.calibrate_confidence(series, max_cutoffs=16)['cutoffs'] == 16
+
+
+def test_training_windows_never_mix_sensors():
+    db = InMemoryDB()
+    readings = db.reference('/readings')
+    for i in range(300):
+        # Interleaved in time, at levels far enough apart to tell which device a value came from
+        for sensor, level in enumerate((100, 400)):
+            readings.push({'aqi': level + i % 10, 'timestamp': (1_760_000_000 + i * 3600) * 1000,
+                           'lat': 28.6 + sensor / 10, 'lon': 77.2})
+    with tempfile.TemporaryDirectory() as root:
+        HistoryStore(root, db_module=db).sync()
+        series = load_history(root=root)
+        assert len(series) == 2 and [len(part) for part in series] == [300, 300]
+
+        x, y = WindowDataset(series, lookback=30)[np.arange(2 * 270)]
+        high = torch.cat([x[..., 0], y], dim=1) >= 400
+        assert torch.all(high.all(dim=1) | (~high).all(dim=1))
+
+        windows, observed, cutoffs = forecast_windows(series, lookback=30, steps=90)
+        assert len(cutoffs) == 2 * (300 - 30 - 90 + 1)
+        high = np.concatenate([windows, observed], axis=1) >= 400
+        assert np.all(high.all(axis=1) | ~high.any(axis=1))
+
+        torch.manual_seed(0)
+        predictor = AQILSTMPredictor(lookback=30)
+        predictor.train(series, epochs=1, batch_size=32, validation_fraction=0.1)
+        assert predictor.scaler.data_min_[0] == 100 and predictor.scaler.data_max_[0] == 409
+
+
+if __name__ == '__main__':
+    test_incremental_sync_is_partitioned_by_day()
+    test_training_reads_memory_mapped_history()
+    test_training_windows_never_mix_sensors()
+    print("✅ History store tests passed")
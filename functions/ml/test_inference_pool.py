@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Tests for the bounded inference pool and the async cache path
+"""
+
+import asyncio
+import threading
+from inference_pool import InferencePool, PoolSaturated
+from prediction_cache import PredictionCache
+
+
+def test_rejects_work_beyond_capacity():
+    pool = InferencePool(workers=1, queue_size=1, torch_threads=1)
+    release = threading.Event()
+    try:
+        running = pool.submit(release.wait)
+        queued = pool.submit(lambda: 'queued')
+        try:
+            pool.submit(lambda: 'rejected')
+        except PoolSaturated:
+            pass
+        else:
+            raise AssertionError("Expected PoolSaturated")
+        assert pool.stats()['rejected'] == 1
+
+        release.set()
+        running.result()
+        assert queued.result() == 'queued'
+        # Slots are returned once work finishes
+        assert pool.submit(lambda: 'accepted').result() == 'accepted'
+    finally:
+        release.set()
+        pool.shutdown()
+
+
+def test_held_slots_count_against_capacity():
+    pool = InferencePool(workers=1, queue_size=0, torch_threads=1)
+    try:
+        with pool.slot():
+            assert pool.stats()['in_flight'] == 1
+            try:
+                pool.submit(lambda: 'rejected')
+            except PoolSaturated:
+                pass
+            else:
+                raise AssertionError("Expected PoolSaturated")
+            # Work run under the held slot doesn't need a second one
+            assert asyncio.run(pool.execute(lambda: 'formatted')) == 'formatted'
+        assert pool.stats()['in_flight'] == 0
+        assert pool.submit(lambda: 'accepted').result() == 'accepted'
+    finally:
+        pool.shutdown()
+
+
+def test_async_misses_share_one_pool_run():
+    pool = InferencePool(workers=1, queue_size=0, torch_threads=1)
+    cache = PredictionCache(ttl=60)
+    calls = []
+
+    def predict():
+        calls.append(1)
+        return {'success': True}
+
+    async def compute():
+        await asyncio.sleep(0.05)
+        return await pool.run(predict)
+
+    async def burst():
+        return await asyncio.gather(*[cache.get_or_compute_async('v1', compute) for _ in range(10)])
+
+    try:
+        results = asyncio.run(burst())
+    finally:
+        pool.shutdown()
+    assert len(calls) == 1
+    assert all(result == {'success': True} for result in results)
+
+
+if __name__ == '__main__':
+    test_rejects_work_beyond_capacity()
+    test_held_slots_count_against_capacity()
+    test_async_misses_share_one_pool_run()
+    print("✅ Inference pool tests passed")
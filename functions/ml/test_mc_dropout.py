@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Tests for Monte-Carlo dropout forecasts run as one batched rollout
+"""
+
+import tempfile
+import numpy as np
+import torch
+from aqi_lstm_model import AQILSTMPredictor, ArrayScaler
+from forecast_engine import ForecastEngine
+from test_sensor_forecasts import LOCATIONS, make_service
+
+
+def make_predictor():
+    torch.manual_seed(0)
+    predictor = AQILSTMPredictor(lookback=30, decode='stateful')
+    predictor.create_model()
+    predictor.model.eval()
+    predictor.scaler = ArrayScaler().fit(np.array([[0.0], [500.0]]))
+    return predictor
+
+
+def test_samples_are_stochastic_and_seedable():
+    predictor = make_predictor()
+    windows = np.random.default_rng(0).uniform(50, 300, size=(3, 30))
+
+    samples = predictor.predict_samples(windows, steps=28, samples=16, seed=1)
+    assert samples.shape == (3, 16, 28)
+    assert samples[:, :, -1].std(axis=1).min() > 0
+    np.testing.assert_array_equal(samples, predictor.predict_samples(windows, steps=28, samples=16, seed=1))
+
+    # Sampling never leaves the shared model with dropout switched on
+    assert not predictor.model.training
+    deterministic = predictor.predict_batch(windows, steps=28)
+    np.testing.assert_array_equal(deterministic, predictor.predict_batch(windows, steps=28))
+
+
+def test_distribution_bands_bracket_the_mean():
+    engine = ForecastEngine(make_predictor())
+    windows = list(np.random.default_rng(2).uniform(50, 300, size=(2, 30)))
+    distributions = engine.forecast_distribution(windows, samples=32, seed=0)
+    assert len(distributions) == 2
+    for distribution in distributions:
+        for view, count in (('daily', 7), ('weekly', 4), ('monthly', 3)):
+            d = distribution[view]
+            assert d['mean'].shape == d['lower'].shape == d['upper'].shape == (count,)
+            assert np.all(d['lower'] <= d['mean']) and np.all(d['mean'] <= d['upper'])
+
+
+def test_service_reports_sampled_bands(tmp_path):
+    service = make_service(str(tmp_path))
+    try:
+        result = service.predict_all(sensor=next(iter(LOCATIONS)), samples=16)
+        assert result['success'], result
+        assert result['uncertainty'] == {'method': 'mc_dropout', 'samples': 16}
+        for item in result['predictions']['weekly']:
+            assert item['confidence']['lower_bound'] <= item['confidence']['upper_bound']
+
+        batch = service.predict_batch(samples=8)
+        assert batch['success'] and set(batch['sensors']) == set(LOCATIONS)
+        assert service.predict_all()['uncertainty'] == {'method': 'forecast_spread'}
+    finally:
+        service.batcher.stop()
+
+
+if __name__ == '__main__':
+    test_samples_are_stochastic_and_seedable()
+    test_distribution_bands_bracket_the_mean()
+    test_service_reports_sampled_bands(tempfile.mkdtemp())
+    print("✅ MC dropout tests passed")
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Tests for the micro-batching scheduler
+"""
+
+import asyncio
+import os
+import threading
+import time
+import httpx
+import numpy as np
+import torch
+from sklearn.preprocessing import MinMaxScaler
+from aqi_lstm_model import AQILSTMPredictor
+from inference_pool import InferencePool
+from local_firebase import InMemoryDB
+from micro_batcher import MicroBatcher
+from predict_service import AQIPredictionService
+from prediction_cache import PredictionCache
+
+
+def make_predictor():
+    torch.manual_seed(0)
+    predictor = AQILSTMPredictor(lookback=30, decode='stateful')
+    predictor.create_model()
+    predictor.scaler = MinMaxScaler().fit(np.array([[0.0], [500.0]]))
+    return predictor
+
+
+def test_batched_results_match_individual_rollouts():
+    predictor = make_predictor()
+    batcher = MicroBatcher(predictor, max_batch=16, max_wait=0.05)
+    rng = np.random.default_rng(0)
+    windows = rng.uniform(50, 300, size=(12, 30))
+    steps = [7, 28, 90] * 4
+
+    results = [None] * len(windows)
+    barrier = threading.Barrier(len(windows))
+
+    def request(i):
+        barrier.wait()
+        results[i] = batcher.predict_sequence(windows[i], steps=steps[i])
+
+    threads = [threading.Thread(target=request, args=(i,)) for i in range(len(windows))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    batcher.stop()
+
+    for i, window in enumerate(windows):
+        expected = predictor.predict_sequence(window, steps=steps[i])
+        assert results[i].shape == (steps[i],)
+        np.testing.assert_allclose(results[i], expected, rtol=1e-4, atol=1e-3)
+    stats = batcher.stats()
+    assert stats['requests'] == len(windows)
+    assert stats['batches'] < len(windows)
+
+
+def test_errors_are_delivered_to_callers():
+    predictor = AQILSTMPredictor(lookback=30)
+    batcher = MicroBatcher(predictor, max_wait=0.001)
+    try:
+        batcher.predict_sequence(np.full(30, 100.0), steps=7)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Expected ValueError from an unloaded model")
+    finally:
+        batcher.stop()
+
+
+def make_api_service(tmp_path, api, monkeypatch, sensors=8):
+    """An API serving `sensors` locations from a fresh prediction cache, plus their ids"""
+    db = InMemoryDB()
+    readings = db.reference('/readings')
+    for i in range(30):
+        for sensor in range(sensors):
+            readings.push({'aqi': 100 + i + sensor, 'lat': 28.5 + sensor / 100, 'lon': 77.2})
+    service = AQIPredictionService(db_module=db, batch_wait=0.05, registry_root=os.path.join(tmp_path, 'registry'),
+                                   model_dir=os.path.join(tmp_path, 'models'))
+    service.predictor = service.batcher.predictor = make_predictor()
+    main = api(service)
+    monkeypatch.setattr(main, 'prediction_cache', PredictionCache(ttl=60))
+    service.data_version()
+    ids = list(service.readings.sensors())
+    assert len(ids) == sensors
+    return main, service, ids
+
+
+def predict_each(main, sensors):
+    async def burst():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url='http://test') as client:
+            return await asyncio.gather(*[client.get('/predict', params={'sensor': sensor}) for sensor in sensors])
+
+    return asyncio.run(burst())
+
+
+def test_concurrent_api_requests_share_batches(tmp_path, api, monkeypatch):
+    main, service, sensors = make_api_service(tmp_path, api, monkeypatch)
+    responses = predict_each(main, sensors)
+    assert all(response.json()['success'] for response in responses)
+    # Requests wait for their rollout on the event loop, not on an inference pool thread
+    assert service.batcher.stats()['mean_batch_size'] > main.inference_pool.workers
+
+
+def test_api_rejects_forecasts_beyond_pool_capacity(tmp_path, api, monkeypatch):
+    main, service, sensors = make_api_service(tmp_path, api, monkeypatch, sensors=12)
+    pool = InferencePool(workers=1, queue_size=1, torch_threads=1)
+    monkeypatch.setattr(main, 'inference_pool', pool)
+    predict_batch = service.predictor.predict_batch
+
+    def slow_predict_batch(windows, steps=7):
+        time.sleep(0.1)
+        return predict_batch(windows, steps=steps)
+
+    service.predictor.predict_batch = slow_predict_batch
+    try:
+        responses = predict_each(main, sensors)
+    finally:
+        pool.shutdown()
+    statuses = [response.status_code for response in responses]
+    # Only the pool's capacity is admitted to the micro-batcher; the rest are turned away, not queued
+    assert statuses.count(200) == pool.capacity
+    assert statuses.count(503) == len(sensors) - pool.capacity
+    assert all('retry-after' in response.headers for response in responses if response.status_code == 503)
+    assert service.batcher.stats()['requests'] == pool.capacity
+
+
+if __name__ == '__main__':
+    test_batched_results_match_individual_rollouts()
+    test_errors_are_delivered_to_callers()
+    print("✅ Micro-batcher tests passed")
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Tests for the versioned model registry and hot-swap reloads
+"""
+
+import asyncio
+import threading
+import httpx
+import numpy as np
+import pytest
+import torch
+from aqi_lstm_model import AQILSTMPredictor, ArrayScaler
+from model_registry import ModelRegistry, RegistryWatcher
+from observability import MODEL_INFO
+from test_sensor_forecasts import make_service
+
+
+def build_artifact(path, seed, lookback=30):
+    torch.manual_seed(seed)
+    predictor = AQILSTMPredictor(lookback=lookback)
+    predictor.create_model()
+    predictor.scaler = ArrayScaler().fit(np.array([[0.0], [500.0]]))
+    predictor.save_artifact(str(path))
+    return str(path)
+
+
+def test_publish_and_activate(tmp_path):
+    registry = ModelRegistry(str(tmp_path / 'registry'))
+    assert registry.current() is None
+    first = registry.publish(build_artifact(tmp_path / 'a.pt', 0), metadata={'final_loss': 0.1})
+    second = registry.publish(build_artifact(tmp_path / 'b.pt', 1))
+    assert first['version'] != second['version']
+    assert registry.current()['version'] == second['version']
+    assert registry.entry(first['version'])['metadata'] == {'final_loss': 0.1}
+
+    registry.activate(first['version'])
+    assert registry.current()['version'] == first['version']
+    with pytest.raises(KeyError):
+        registry.activate('missing')
+
+    # The version is the artifact's content hash, which the predictor reports as its model_version
+    predictor = AQILSTMPredictor(lookback=30)
+    predictor.load_artifact(registry.path(first['version']))
+    assert predictor.model_version == first['version']
+
+
+def test_reload_swaps_model_and_versions_responses(tmp_path):
+    registry = ModelRegistry(str(tmp_path / 'registry'))
+    first = registry.publish(build_artifact(tmp_path / 'a.pt', 0))
+    service = make_service(str(tmp_path / 'service'))
+    service.registry = registry
+    try:
+        assert service.reload_model()
+        assert service.predictor is service.batcher.predictor
+        before = service.predict_all()
+        assert before['model_version'] == first['version']
+        assert not service.reload_model()
+
+        second = registry.publish(build_artifact(tmp_path / 'b.pt', 1))
+        assert service.reload_model()
+        after = service.predict_all()
+        assert after['model_version'] == second['version']
+        assert service.predict_batch()['model_version'] == second['version']
+        assert after['predictions']['daily'] != before['predictions']['daily']
+
+        assert service.reload_model(first['version'])
+        assert service.predictor.model_version == first['version']
+        info = [line for line in MODEL_INFO.render() if not line.startswith('#')]
+        assert len(info) == 1 and first['version'] in info[0]
+    finally:
+        service.batcher.stop()
+
+
+def test_requests_during_a_swap_keep_their_model(tmp_path):
+    registry = ModelRegistry(str(tmp_path / 'registry'))
+    registry.publish(build_artifact(tmp_path / 'a.pt', 0))
+    service = make_service(str(tmp_path / 'service'))
+    service.registry = registry
+    service.reload_model()
+    errors = []
+
+    def hammer():
+        try:
+            for _ in range(20):
+                assert service.predict_all()['success']
+        except Exception as e:
+            errors.append(e)
+
+    try:
+        threads = [threading.Thread(target=hammer) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for seed in (1, 2, 3):
+            registry.publish(build_artifact(tmp_path / f'{seed}.pt', seed))
+            assert service.reload_model()
+        for thread in threads:
+            thread.join()
+    finally:
+        service.batcher.stop()
+    assert not errors
+
+
+def test_models_with_a_longer_lookback_than_served_are_refused(tmp_path):
+    registry = ModelRegistry(str(tmp_path / 'registry'))
+    entry = registry.publish(build_artifact(tmp_path / 'long.pt', 0, lookback=48))
+    service = make_service(str(tmp_path / 'service'))
+    service.registry = registry
+    previous = service.predictor
+    try:
+        with pytest.raises(ValueError, match='Lookback 48'):
+            service.reload_model(entry['version'])
+        assert service.predictor is previous
+    finally:
+        service.batcher.stop()
+
+
+def test_watcher_reloads_on_manifest_change(tmp_path):
+    registry = ModelRegistry(str(tmp_path / 'registry'))
+    calls = []
+    watcher = RegistryWatcher(registry, lambda: calls.append(registry.current()['version']))
+    assert not watcher.check()
+    entry = registry.publish(build_artifact(tmp_path / 'a.pt', 0))
+    assert watcher.check()
+    assert not watcher.check()
+    assert calls == [entry['version']]
+
+
+def test_watcher_retries_a_failed_reload(tmp_path):
+    registry = ModelRegistry(str(tmp_path / 'registry'))
+    calls = []
+
+    def reload():
+        calls.append(registry.current()['version'])
+        if len(calls) == 1:
+            raise OSError("artifact not readable yet")
+
+    watcher = RegistryWatcher(registry, reload)
+    entry = registry.publish(build_artifact(tmp_path / 'a.pt', 0))
+    with pytest.raises(OSError):
+        watcher.check()
+    assert watcher.check()
+    assert not watcher.check()
+    assert calls == [entry['version'], entry['version']]
+
+
+def test_admin_reload_endpoint(tmp_path, api, monkeypatch):
+    registry = ModelRegistry(str(tmp_path / 'registry'))
+    entry = registry.publish(build_artifact(tmp_path / 'a.pt', 0))
+    service = make_service(str(tmp_path / 'service'))
+    service.registry = registry
+    previous = service.predictor.model_version
+    main = api(service)
+    monkeypatch.setattr(main, 'ADMIN_KEY', 'secret')
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url='http://test') as client:
+            denied = await client.post('/admin/reload', headers={'X-Admin-Key': 'wrong'})
+            reloaded = await client.post('/admin/reload', headers={'X-Admin-Key': 'secret'})
+            missing = await client.post('/admin/reload', params={'version': 'nope'}, headers={'X-Admin-Key': 'secret'})
+            predicted = await client.get('/predict')
+            return denied, reloaded, missing, predicted
+
+    denied, reloaded, missing, predicted = asyncio.run(scenario())
+    assert denied.status_code == 403
+    assert reloaded.json() == {'reloaded': True, 'previous_version': previous, 'model_version': entry['version']}
+    assert missing.status_code == 404
+    assert predicted.json()['model_version'] == entry['version']
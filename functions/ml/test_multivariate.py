@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Tests for multivariate (AQI + pollutant channels) models
+"""
+
+import os
+import tempfile
+import numpy as np
+import torch
+from aqi_lstm_model import AQILSTMPredictor
+from local_firebase import InMemoryDB
+from predict_service import AQIPredictionService
+from readings_store import READING_CHANNELS, ReadingsStore, reading_features
+
+CHANNELS = ('aqi', 'pm25', 'pm10')
+
+
+def series(points=200):
+    rng = np.random.default_rng(0)
+    aqi = 150 + 40 * np.sin(np.arange(points) / 6) + rng.normal(0, 5, points)
+    return np.column_stack([aqi, aqi * 0.55, aqi * 0.9])
+
+
+def trained_predictor():
+    torch.manual_seed(0)
+    predictor = AQILSTMPredictor(lookback=30, decode='stateful', channels=CHANNELS)
+    predictor.train(series(), epochs=2, batch_size=32)
+    return predictor
+
+
+def test_features_are_extracted_per_channel():
+    readings = [{'aqi': 100, 'pm25': 40, 'pm10': 80}, {'aqi': 120, 'pm10': 90}]
+    features = reading_features(readings, CHANNELS)
+    assert features.shape == (2, 3)
+    assert np.isnan(features[1, 1]) and features[1, 2] == 90
+
+    db = InMemoryDB()
+    for reading in readings:
+        db.reference('/readings').push(reading)
+    store = ReadingsStore(db_module=db)
+    store.sync()
+    assert store.snapshot().tolist() == [100, 120]
+    assert store.snapshot(channels=('aqi', 'pm10')).tolist() == [[100, 80], [120, 90]]
+
+
+def test_multivariate_rollout_and_artifact():
+    predictor = trained_predictor()
+    windows = series()[-30:][None].repeat(2, axis=0)
+    predictions = predictor.predict_batch(windows, steps=10)
+    assert predictions.shape == (2, 10, 3)
+    assert predictor.predict_sequence(windows[0], steps=10).shape == (10, 3)
+    assert predictor.predict_samples(windows, steps=10, samples=4, seed=0).shape == (2, 4, 10, 3)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'model.pt')
+        predictor.save_artifact(path)
+        loaded = AQILSTMPredictor(decode='stateful')
+        loaded.load_artifact(path)
+    assert loaded.channels == CHANNELS
+    np.testing.assert_allclose(loaded.scaler.data_max_, series().max(axis=0))
+    np.testing.assert_allclose(loaded.predict_batch(windows, steps=10), predictions, atol=1e-4)
+
+
+def test_service_forecasts_pollutants_with_aqi():
+    db = InMemoryDB()
+    readings = db.reference('/readings')
+    for aqi, pm25, pm10 in series(40):
+        readings.push({'aqi': aqi, 'pm25': pm25, 'pm10': pm10, 'lat': 28.61, 'lon': 77.2})
+    service = AQIPredictionService(db_module=db)
+    service.predictor = trained_predictor()
+    service.batcher.predictor = service.predictor
+    try:
+        result = service.predict_all()
+        assert result['success'], result
+        pollutants = result['predictions']['pollutants']
+        assert set(pollutants) == {'pm25', 'pm10'}
+        assert [len(pollutants['pm25'][view]) for view in ('daily', 'weekly', 'monthly')] == [7, 4, 3]
+
+        sampled = service.predict_all(samples=4)
+        assert set(sampled['predictions']['pollutants']) == {'pm25', 'pm10'}
+        batch = service.predict_batch()
+        assert 'pollutants' in next(iter(batch['sensors'].values()))['predictions']
+    finally:
+        service.batcher.stop()
+
+
+if __name__ == '__main__':
+    test_features_are_extracted_per_channel()
+    test_multivariate_rollout_and_artifact()
+    test_service_forecasts_pollutants_with_aqi()
+    print("✅ Multivariate tests passed")
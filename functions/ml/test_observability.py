@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Tests for the Prometheus metrics and JSON log formatting
+"""
+
+import asyncio
+import json
+import logging
+import httpx
+import pytest
+from observability import (
+    Counter, Gauge, Histogram, JsonFormatter, Registry, SIMULATION_FALLBACKS, STAGE_SECONDS
+)
+from test_sensor_forecasts import LOCATIONS, make_service
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    latency = Histogram('demo_seconds', 'Demo latency', ('stage',), buckets=(0.1, 1.0), registry=registry)
+    for value in (0.05, 0.5, 0.5, 3.0):
+        latency.observe(value, stage='rollout')
+
+    lines = registry.render().splitlines()
+    assert '# TYPE demo_seconds histogram' in lines
+    assert 'demo_seconds_bucket{stage="rollout",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{stage="rollout",le="1.0"} 3' in lines
+    assert 'demo_seconds_bucket{stage="rollout",le="+Inf"} 4' in lines
+    assert 'demo_seconds_sum{stage="rollout"} 4.05' in lines
+    assert 'demo_seconds_count{stage="rollout"} 4' in lines
+
+
+def test_non_finite_values_use_the_text_format_spellings():
+    registry = Registry()
+    gauge = Gauge('demo_value', 'Demo', ('kind',), registry=registry)
+    for kind, value in (('up', float('inf')), ('down', float('-inf')), ('unknown', float('nan')), ('half', 0.5)):
+        gauge.set(value, kind=kind)
+    lines = registry.render().splitlines()
+    assert 'demo_value{kind="up"} +Inf' in lines
+    assert 'demo_value{kind="down"} -Inf' in lines
+    assert 'demo_value{kind="unknown"} NaN' in lines
+    assert 'demo_value{kind="half"} 0.5' in lines
+
+
+def test_metrics_reject_unknown_labels():
+    counter = Counter('demo_total', 'Demo', ('kind',), registry=Registry())
+    with pytest.raises(ValueError):
+        counter.inc(stage='rollout')
+
+
+def test_forecast_stages_are_timed(tmp_path):
+    service = make_service(str(tmp_path))
+    before = {stage: STAGE_SECONDS.count(stage=stage)
+              for stage in ('fetch', 'scaling', 'rollout', 'batch_wait', 'confidence', 'formatting')}
+    try:
+        assert service.predict_all(sensor=next(iter(LOCATIONS)))['success']
+    finally:
+        service.batcher.stop()
+    for stage, count in before.items():
+        assert STAGE_SECONDS.count(stage=stage) > count, stage
+
+
+def test_simulation_fallback_is_counted(tmp_path):
+    class BrokenDB:
+        def reference(self, path):
+            raise ConnectionError("offline")
+
+    service = make_service(str(tmp_path))
+    service.readings._db = BrokenDB()
+    service.readings.last_key = None
+    before = SIMULATION_FALLBACKS.value()
+    try:
+        assert service.predict_all()['success']
+    finally:
+        service.batcher.stop()
+    assert SIMULATION_FALLBACKS.value() == before + 1
+
+
+def test_json_formatter_includes_extra_fields():
+    record = logging.getLogger('aqi_test').makeRecord(
+        'aqi_test', logging.WARNING, __file__, 1, "Readings sync failed", (), None,
+        extra={'sensor': '28.614,77.209', 'error': 'offline'}
+    )
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry['level'] == 'WARNING'
+    assert entry['message'] == "Readings sync failed"
+    assert entry['sensor'] == '28.614,77.209'
+    assert entry['error'] == 'offline'
+
+
+def test_metrics_endpoint_exposes_request_latency(tmp_path, api):
+    main = api(make_service(str(tmp_path)))
+
+    async def scrape():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url='http://test') as client:
+            assert (await client.get('/predict')).status_code == 200
+            return await client.get('/metrics')
+
+    response = asyncio.run(scrape())
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/plain')
+    assert 'aqi_http_request_seconds_count{path="/predict",status="200"}' in response.text
+    assert 'aqi_predict_stage_seconds_bucket{stage="rollout"' in response.text
+    assert 'aqi_component_stat{component="cache",stat="hits"}' in response.text
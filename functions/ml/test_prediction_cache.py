@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Tests for the /predict response cache
+"""
+
+import threading
+import time
+from prediction_cache import PredictionCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_hit_after_miss_and_expiry_after_ttl():
+    clock = FakeClock()
+    cache = PredictionCache(ttl=10, clock=clock)
+    calls = []
+    compute = lambda: calls.append(1) or {'success': True, 'n': len(calls)}
+
+    first = cache.get_or_compute('v1', compute)
+    second = cache.get_or_compute('v1', compute)
+    assert first is second
+    assert len(calls) == 1
+
+    clock.now = 11
+    third = cache.get_or_compute('v1', compute)
+    assert third['n'] == 2
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 2
+
+
+def test_new_data_version_misses():
+    cache = PredictionCache(ttl=60)
+    cache.get_or_compute(('key-1', 'model-a'), lambda: 'old')
+    assert cache.get_or_compute(('key-2', 'model-a'), lambda: 'new') == 'new'
+    assert cache.get_or_compute(('key-1', 'model-b'), lambda: 'swapped') == 'swapped'
+
+
+def test_failures_are_not_cached():
+    cache = PredictionCache(ttl=60)
+    cacheable = lambda result: result.get('success')
+    cache.get_or_compute('v1', lambda: {'success': False}, cacheable=cacheable)
+    assert cache.get_or_compute('v1', lambda: {'success': True}, cacheable=cacheable) == {'success': True}
+
+
+def test_concurrent_misses_compute_once():
+    cache = PredictionCache(ttl=60)
+    calls = []
+    started = threading.Event()
+
+    def slow_compute():
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        return {'success': True}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute('v1', slow_compute)))
+               for _ in range(8)]
+    threads[0].start()
+    started.wait()
+    for thread in threads[1:]:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert len(results) == 8
+    assert all(result is results[0] for result in results)
+    assert cache.stats()['misses'] == 1
+
+
+def test_exception_reaches_every_waiter():
+    cache = PredictionCache(ttl=60)
+    try:
+        cache.get_or_compute('v1', lambda: 1 / 0)
+    except ZeroDivisionError:
+        pass
+    assert cache.get_or_compute('v1', lambda: 'recovered') == 'recovered'
+
+
+if __name__ == '__main__':
+    test_hit_after_miss_and_expiry_after_ttl()
+    test_new_data_version_misses()
+    test_failures_are_not_cached()
+    test_concurrent_misses_compute_once()
+    test_exception_reaches_every_waiter()
+    print("✅ Prediction cache tests passed")
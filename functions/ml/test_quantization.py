@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Tests for reduced-precision (int8 / bf16) inference modes
+"""
+
+import os
+import tempfile
+import numpy as np
+import torch
+from aqi_lstm_model import AQILSTMPredictor, ArrayScaler
+from quantization_report import held_out_windows, quantization_report
+
+
+def predictions_at(precision, artifact, windows):
+    predictor = AQILSTMPredictor(decode='stateful')
+    predictor.load_artifact(artifact, precision=precision)
+    assert predictor.precision == precision
+    return predictor.predict_batch(windows, steps=28)
+
+
+def test_reduced_precision_stays_close_to_fp32():
+    torch.manual_seed(0)
+    predictor = AQILSTMPredictor(lookback=30)
+    predictor.create_model()
+    predictor.scaler = ArrayScaler().fit(np.array([[0.0], [500.0]]))
+    windows = np.random.default_rng(0).uniform(50, 300, size=(8, 30))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        artifact = os.path.join(tmp, 'model.pt')
+        predictor.save_artifact(artifact)
+        fp32 = predictions_at('fp32', artifact, windows)
+        int8 = predictions_at('int8', artifact, windows)
+        bf16 = predictions_at('bf16', artifact, windows)
+
+    assert int8.dtype == bf16.dtype == fp32.dtype
+    # A few AQI points on a 0-500 scale
+    np.testing.assert_allclose(int8, fp32, atol=5.0)
+    np.testing.assert_allclose(bf16, fp32, atol=5.0)
+
+
+def test_report_scores_only_the_held_out_tail():
+    data = np.arange(2000.0)
+    windows, actuals = held_out_windows(data, lookback=30, horizon=90, count=16)
+    # Training ends at the last 20%; forecasts start there and score only values after it
+    assert len(windows) == 16
+    assert windows.min() == 1600 - 30 and actuals.min() == 1600
+    assert actuals.max() == 1999
+
+    torch.manual_seed(0)
+    predictor = AQILSTMPredictor(lookback=30)
+    predictor.create_model()
+    predictor.scaler = ArrayScaler().fit(np.array([[0.0], [500.0]]))
+    series = 150 + 40 * np.sin(np.arange(1000) / 5)
+    with tempfile.TemporaryDirectory() as tmp:
+        artifact = os.path.join(tmp, 'model.pt')
+        predictor.save_artifact(artifact)
+        report = quantization_report(artifact, os.path.join(tmp, 'report.json'), precisions=('fp32', 'int8'),
+                                     data=series, count=8)
+    assert report['windows'] == 8
+    assert report['precisions']['fp32']['mean_abs_diff_vs_fp32'] == 0
+
+
+def test_precision_is_validated():
+    predictor = AQILSTMPredictor()
+    predictor.create_model()
+    try:
+        predictor.set_precision('fp8')
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Expected ValueError for unknown precision")
+
+
+if __name__ == '__main__':
+    test_reduced_precision_stays_close_to_fp32()
+    test_report_scores_only_the_held_out_tail()
+    test_precision_is_validated()
+    print("✅ Quantization tests passed")
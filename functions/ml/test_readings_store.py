@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Tests for the incremental readings store, using the in-memory Firebase stand-in
+"""
+
+import numpy as np
+from local_firebase import InMemoryDB
+from readings_store import ReadingsStore, UnknownSensor
+
+
+def push_readings(db, values):
+    readings = db.reference('/readings')
+    for value in values:
+        readings.push({'aqi': value, 'pm25': value / 2})
+
+
+def test_cold_start_fetches_only_last_n():
+    db = InMemoryDB()
+    push_readings(db, range(100))
+    store = ReadingsStore(capacity=30, db_module=db)
+
+    assert store.sync() == 30
+    np.testing.assert_array_equal(store.snapshot(), np.arange(70, 100))
+
+
+def test_incremental_sync_appends_new_readings_only():
+    db = InMemoryDB()
+    push_readings(db, range(10))
+    store = ReadingsStore(capacity=5, db_module=db)
+    store.sync()
+
+    push_readings(db, [10, 11, 12])
+    assert store.sync() == 3
+    np.testing.assert_array_equal(store.snapshot(), [8, 9, 10, 11, 12])
+
+    # Nothing new: the cursor query returns only the key we already have
+    assert store.sync() == 0
+    np.testing.assert_array_equal(store.snapshot(), [8, 9, 10, 11, 12])
+
+
+def test_ring_buffer_wraps_and_keeps_order():
+    db = InMemoryDB()
+    store = ReadingsStore(capacity=4, db_module=db)
+    for batch in ([1, 2, 3], [4, 5], [6, 7, 8, 9, 10, 11]):
+        push_readings(db, batch)
+        store.sync()
+    np.testing.assert_array_equal(store.snapshot(), [8, 9, 10, 11])
+
+
+def test_readings_without_aqi_are_skipped():
+    db = InMemoryDB()
+    readings = db.reference('/readings')
+    readings.push({'aqi': 50})
+    readings.push({'pm25': 12})
+    readings.push({'aqi': 60})
+    store = ReadingsStore(capacity=10, db_module=db)
+    store.sync()
+    np.testing.assert_array_equal(store.snapshot(), [50, 60])
+
+
+def test_readings_are_indexed_per_sensor():
+    db = InMemoryDB()
+    readings = db.reference('/readings')
+    for i in range(6):
+        readings.push({'aqi': 100 + i, 'lat': 28.61391, 'lon': 77.20902})
+        readings.push({'aqi': 200 + i, 'lat': 28.70405, 'lon': 77.10249})
+        readings.push({'aqi': 300 + i, 'lat': 0, 'lon': 0})
+    store = ReadingsStore(capacity=4, db_module=db, cold_start_limit=100)
+    store.sync()
+
+    sensors = store.sensors()
+    assert set(sensors) == {'28.614,77.209', '28.704,77.102'}
+    assert sensors['28.614,77.209']['location'] == {'lat': 28.61391, 'lon': 77.20902}
+    np.testing.assert_array_equal(store.snapshot('28.614,77.209'), [102, 103, 104, 105])
+    np.testing.assert_array_equal(store.snapshot('28.704,77.102'), [202, 203, 204, 205])
+    # Readings without a GPS fix still count towards the overall series
+    np.testing.assert_array_equal(store.snapshot(), [304, 105, 205, 305])
+
+    try:
+        store.snapshot('nowhere')
+    except UnknownSensor:
+        pass
+    else:
+        raise AssertionError("Expected UnknownSensor")
+
+
+def test_service_reads_buffer_without_network():
+    from predict_service import AQIPredictionService
+
+    db = InMemoryDB()
+    push_readings(db, range(100, 140))
+    service = AQIPredictionService(db_module=db)
+
+    first = service.fetch_recent_data(hours=30)
+    requests_after_cold_start = len(db.requests)
+    second = service.fetch_recent_data(hours=30)
+
+    assert len(db.requests) == requests_after_cold_start
+    np.testing.assert_array_equal(first, np.arange(110, 140))
+    np.testing.assert_array_equal(second, first)
+
+
+if __name__ == '__main__':
+    test_cold_start_fetches_only_last_n()
+    test_incremental_sync_appends_new_readings_only()
+    test_ring_buffer_wraps_and_keeps_order()
+    test_readings_without_aqi_are_skipped()
+    test_readings_are_indexed_per_sensor()
+    test_service_reads_buffer_without_network()
+    print("✅ Readings store tests passed")
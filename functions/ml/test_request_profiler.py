@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Tests for opt-in per-request profiling
+"""
+
+import asyncio
+import json
+import os
+import httpx
+import pytest
+from request_profiler import ProfilingRejected, RequestProfiler, unbatched
+from test_sensor_forecasts import make_service
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_profiles_are_rate_limited():
+    clock = FakeClock()
+    profiler = RequestProfiler('secret', min_interval=60, clock=clock)
+    profiler.acquire()
+    with pytest.raises(ProfilingRejected):
+        profiler.acquire()
+    profiler.release()
+    clock.now += 30
+    with pytest.raises(ProfilingRejected) as rejected:
+        profiler.acquire()
+    assert rejected.value.retry_after == 30
+    clock.now += 30
+    profiler.acquire()
+    assert profiler.stats()['rejected'] == 2
+
+
+def test_admin_key_is_checked():
+    profiler = RequestProfiler('secret')
+    assert profiler.authorized('secret')
+    assert not profiler.authorized('wrong')
+    assert not profiler.authorized(None)
+
+
+@pytest.mark.parametrize('mode, suffix', [('torch', '.trace.json'), ('python', '.prof')])
+def test_profiled_prediction_writes_a_trace(tmp_path, mode, suffix):
+    service = make_service(str(tmp_path))
+    profiler = RequestProfiler('secret', directory=str(tmp_path))
+    try:
+        direct = unbatched(service)
+        result, summary = profiler.run(mode, direct.predict_all, direct.fetch_recent_data())
+    finally:
+        service.batcher.stop()
+    assert result['success']
+    assert summary['trace'].endswith(suffix)
+    assert profiler.path(summary['trace']) == os.path.join(str(tmp_path), summary['trace'])
+    assert summary['top'] and summary['top'][0]['self_ms'] >= 0
+    if mode == 'torch':
+        # The rollout ran on this thread, so the trace has the LSTM ops in it
+        assert any('lstm' in row['name'] for row in summary['top'])
+        with open(profiler.path(summary['trace'])) as f:
+            assert json.load(f)['traceEvents']
+
+
+def test_trace_names_outside_the_directory_are_refused(tmp_path):
+    profiler = RequestProfiler('secret', directory=str(tmp_path))
+    assert profiler.path('../main.py') is None
+    assert profiler.path('predict-missing.prof') is None
+
+
+def test_predict_profiling_endpoint(tmp_path, api, monkeypatch):
+    main = api(make_service(str(tmp_path)))
+    monkeypatch.setattr(main, 'profiler', RequestProfiler('secret', directory=str(tmp_path), min_interval=60))
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url='http://test') as client:
+            denied = await client.get('/predict', headers={'X-Profile': 'python', 'X-Admin-Key': 'wrong'})
+            profiled = await client.get('/predict', headers={'X-Profile': 'python', 'X-Admin-Key': 'secret'})
+            limited = await client.get('/predict', headers={'X-Profile': 'python', 'X-Admin-Key': 'secret'})
+            download = await client.get(profiled.json()['profile']['download'], headers={'X-Admin-Key': 'secret'})
+            plain = await client.get('/predict')
+            return denied, profiled, limited, download, plain
+
+    denied, profiled, limited, download, plain = asyncio.run(scenario())
+    assert denied.status_code == 403
+    assert profiled.status_code == 200
+    assert profiled.json()['success'] and profiled.json()['profile']['mode'] == 'python'
+    assert limited.status_code == 429 and 'retry-after' in limited.headers
+    assert download.status_code == 200 and download.content
+    assert plain.status_code == 200 and 'profile' not in plain.json()
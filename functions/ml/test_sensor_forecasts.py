@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Tests for per-sensor and batched forecasts in the prediction service
+"""
+
+import os
+import tempfile
+import numpy as np
+import torch
+from sklearn.preprocessing import MinMaxScaler
+from local_firebase import InMemoryDB
+from predict_service import AQIPredictionService
+
+LOCATIONS = {
+    '28.614,77.209': (28.6139, 77.2090, 80),
+    '28.704,77.102': (28.7041, 77.1024, 180),
+    '28.535,77.391': (28.5355, 77.3910, 280),
+}
+
+
+def make_service(root):
+    """A service on a random-weight model that never loads artifacts from the working directory"""
+    db = InMemoryDB()
+    readings = db.reference('/readings')
+    for i in range(40):
+        for lat, lon, base in LOCATIONS.values():
+            readings.push({'aqi': base + i % 5, 'lat': lat, 'lon': lon})
+
+    service = AQIPredictionService(db_module=db, registry_root=os.path.join(root, 'registry'),
+                                   model_dir=os.path.join(root, 'models'))
+    torch.manual_seed(0)
+    service.predictor.create_model()
+    service.predictor.scaler = MinMaxScaler().fit(np.array([[0.0], [500.0]]))
+    return service
+
+
+def test_batch_matches_single_sensor_forecasts(tmp_path):
+    service = make_service(str(tmp_path))
+    try:
+        batch = service.predict_batch()
+        assert batch['success']
+        assert set(batch['sensors']) == set(LOCATIONS)
+        assert batch['missing'] == []
+
+        for sid in LOCATIONS:
+            single = service.predict_all(sensor=sid)
+            batched = batch['sensors'][sid]['predictions']
+            for view in ('daily', 'weekly', 'monthly'):
+                np.testing.assert_allclose(
+                    [item['aqi'] for item in batched[view]],
+                    [item['aqi'] for item in single['predictions'][view]],
+                    atol=0.11
+                )
+        # Every sensor went through one stacked rollout
+        assert service.batcher.stats()['mean_batch_size'] > 1
+    finally:
+        service.batcher.stop()
+
+
+def test_unknown_sensors_are_reported(tmp_path):
+    service = make_service(str(tmp_path))
+    try:
+        batch = service.predict_batch(['28.614,77.209', 'nowhere'])
+        assert list(batch['sensors']) == ['28.614,77.209']
+        assert batch['missing'] == ['nowhere']
+        assert not service.has_sensor('nowhere')
+    finally:
+        service.batcher.stop()
+
+
+if __name__ == '__main__':
+    test_batch_matches_single_sensor_forecasts(tempfile.mkdtemp())
+    test_unknown_sensors_are_reported(tempfile.mkdtemp())
+    print("✅ Sensor forecast tests passed")
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Tests for readings shared between worker processes and memory-mapped model loading
+"""
+
+import multiprocessing
+import os
+import subprocess
+import sys
+import threading
+import numpy as np
+import pytest
+import torch
+from aqi_lstm_model import AQILSTMPredictor, ArrayScaler
+from local_firebase import InMemoryDB
+from readings_store import ReadingsStore
+from shared_readings import SharedBlock, SharedReadingsStore
+from synthetic_data import generate_readings
+
+
+def write_payload(name, payload):
+    block = SharedBlock.attach(name)
+    block.write(payload)
+    block.close()
+
+
+def test_block_read_sees_each_write_once():
+    block = SharedBlock.create(size=1024)
+    try:
+        assert block.read() == (None, None)
+        block.write(b'first')
+        generation, payload = block.read()
+        assert payload == b'first'
+        assert block.read(generation) == (generation, None)
+
+        # A write from another process is visible here
+        process = multiprocessing.get_context('fork').Process(target=write_payload, args=(block.name, b'second'))
+        process.start()
+        process.join()
+        newer, payload = block.read(generation)
+        assert payload == b'second' and newer > generation
+    finally:
+        block.close()
+        block.unlink()
+
+
+def test_oversized_payload_is_rejected():
+    block = SharedBlock.create(size=8)
+    try:
+        try:
+            block.write(b'x' * 9)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("expected ValueError")
+    finally:
+        block.close()
+        block.unlink()
+
+
+def test_worker_store_mirrors_the_fetcher():
+    db = InMemoryDB({'readings': generate_readings(sensors=3, points=20, seed=0)})
+    fetcher = ReadingsStore(capacity=30, db_module=db, cold_start_limit=1000)
+    block = SharedBlock.create()
+    worker = SharedReadingsStore(SharedBlock.attach(block.name), capacity=30)
+    notified = []
+    worker.add_listener(notified.append)
+    try:
+        assert worker.sync() == 0 and not worker.primed
+        fetcher.sync()
+        block.write(fetcher.export_state())
+        assert worker.sync() == 60
+        assert worker.sync() == 0
+        assert worker.last_key == fetcher.last_key
+        assert worker.sensors() == fetcher.sensors()
+        for sensor in [None, *fetcher.sensors()]:
+            np.testing.assert_array_equal(
+                worker.snapshot(sensor, channels=('aqi', 'pm25')), fetcher.snapshot(sensor, channels=('aqi', 'pm25'))
+            )
+
+        db.reference(f'/readings/-S{60:018d}').set({'aqi': 111.0, 'lat': 28.6, 'lon': 77.2})
+        fetcher.sync()
+        block.write(fetcher.export_state())
+        assert worker.sync() == 1
+        assert notified == [60, 1]
+        assert worker.snapshot()[-1] == 111.0
+    finally:
+        worker.block.close()
+        block.close()
+        block.unlink()
+
+
+FETCHER_CHECK = """
+import os, signal, sys, threading
+from shared_readings import SharedBlock, run_fetcher
+block = SharedBlock.create()
+threading.Timer(0.5, os.kill, (os.getpid(), signal.SIGTERM)).start()
+run_fetcher(block.name)
+block.unlink()
+assert not {'main', 'fastapi', 'torch'} & set(sys.modules), sorted({'main', 'fastapi', 'torch'} & set(sys.modules))
+"""
+
+
+def test_fetcher_does_not_import_the_api(tmp_path):
+    # Run where there is no service account key, so the fetcher starts in simulation mode
+    env = {**os.environ, 'PYTHONPATH': os.path.dirname(os.path.abspath(__file__))}
+    subprocess.run([sys.executable, '-c', FETCHER_CHECK], check=True, cwd=str(tmp_path), env=env, timeout=30)
+
+
+@pytest.mark.parametrize('writer', [True, False])
+def test_only_the_designated_worker_writes_forecasts(tmp_path, monkeypatch, writer):
+    import main
+    block = SharedBlock.create()
+    connected = []
+    monkeypatch.chdir(tmp_path)
+    for name, value in (('SHARED_READINGS', block.name), ('FORECAST_WRITE_PATH', '/predictions/latest'),
+                        ('FORECAST_WRITER', writer), ('FORECAST_REFRESH', True), ('MODEL_WATCH_INTERVAL', 0),
+                        ('init_firebase', lambda: connected.append(True) or True), ('service', None),
+                        ('refresher', None), ('watcher', None), ('startup_error', None),
+                        ('service_loaded', threading.Event())):
+        monkeypatch.setattr(main, name, value)
+    try:
+        main.load_service()
+        assert main.startup_error is None
+        assert bool(connected) == writer
+        assert main.refresher.write_path == ('/predictions/latest' if writer else None)
+    finally:
+        if main.refresher is not None:
+            main.refresher.stop()
+        if main.service is not None:
+            main.service.readings.stop()
+            main.service.batcher.stop()
+        block.close()
+        block.unlink()
+
+
+def test_memory_mapped_artifact_matches_a_regular_load(tmp_path):
+    torch.manual_seed(0)
+    predictor = AQILSTMPredictor(lookback=30)
+    predictor.create_model()
+    predictor.scaler = ArrayScaler().fit(np.array([[0.0], [500.0]]))
+    path = str(tmp_path / 'model.pt')
+    predictor.save_artifact(path)
+
+    loaded, mapped = AQILSTMPredictor(lookback=30), AQILSTMPredictor(lookback=30)
+    loaded.load_artifact(path)
+    mapped.load_artifact(path, mmap=True)
+    window = np.linspace(100, 160, 30)
+    np.testing.assert_allclose(mapped.predict_sequence(window, steps=14), loaded.predict_sequence(window, steps=14))
+    assert mapped.model_version == loaded.model_version
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Tests for zero-copy window construction and mini-batched training
+"""
+
+import os
+import tempfile
+import numpy as np
+import pytest
+import torch
+from aqi_lstm_model import AQILSTMPredictor, WindowDataset
+
+
+def test_prepare_data_matches_loop_and_is_a_view():
+    data = np.arange(100, dtype=np.float64)
+    predictor = AQILSTMPredictor(lookback=30)
+    X, y = predictor.prepare_data(data, lookback=30)
+
+    expected_X = np.array([data[i:i+30] for i in range(70)])
+    expected_y = np.array([data[i+30] for i in range(70)])
+    np.testing.assert_array_equal(X, expected_X)
+    np.testing.assert_array_equal(y, expected_y)
+    assert np.shares_memory(X, data)
+    assert np.shares_memory(y, data)
+
+
+def test_loader_yields_shuffled_mini_batches():
+    data = np.arange(110, dtype=np.float32)
+    predictor = AQILSTMPredictor(lookback=30)
+    loader = predictor.make_loader(data, batch_size=32, shuffle=True)
+
+    sizes, targets = [], []
+    for X, y in loader:
+        assert X.shape[1:] == (30, 1)
+        assert y.shape[1:] == (1,)
+        # Every target is the value right after its window
+        torch.testing.assert_close(y[:, 0], X[:, -1, 0] + 1)
+        sizes.append(len(X))
+        targets.extend(y[:, 0].tolist())
+
+    assert sizes == [32, 32, 16]
+    assert sorted(targets) == list(range(30, 110))
+    assert targets != sorted(targets)
+
+
+def test_dataset_does_not_materialize_windows():
+    series = np.zeros(1_000_000, dtype=np.float32)
+    dataset = WindowDataset(series, lookback=30)
+    assert len(dataset) == 1_000_000 - 30
+    assert np.shares_memory(dataset.windows[0], dataset.parts[0])
+
+
+def test_training_reduces_loss():
+    torch.manual_seed(0)
+    hours = np.arange(400)
+    data = 150 + 40 * np.sin(2 * np.pi * hours / 24)
+    predictor = AQILSTMPredictor(lookback=30)
+    first = predictor.train(data, epochs=1, batch_size=32)
+    later = predictor.train(data, epochs=5, batch_size=32)
+    assert later < first
+
+
+def test_resumed_training_matches_an_uninterrupted_run():
+    hours = np.arange(300)
+    data = 150 + 40 * np.sin(2 * np.pi * hours / 24)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'checkpoint.pt')
+        torch.manual_seed(0)
+        straight = AQILSTMPredictor(lookback=24, hidden_size=8, num_layers=1)
+        straight.train(data, epochs=4, validation_fraction=0.2)
+
+        torch.manual_seed(0)
+        interrupted = AQILSTMPredictor(lookback=24, hidden_size=8, num_layers=1)
+        interrupted.train(data, epochs=2, validation_fraction=0.2, checkpoint_path=path)
+        # A fresh process: new predictor, different RNG state
+        torch.manual_seed(123)
+        resumed = AQILSTMPredictor(lookback=24, hidden_size=8, num_layers=1)
+        resumed.train(data, epochs=4, validation_fraction=0.2, checkpoint_path=path, resume=True)
+
+        with pytest.raises(ValueError):
+            AQILSTMPredictor(lookback=24, hidden_size=16, num_layers=1).train(data, epochs=4, checkpoint_path=path, resume=True)
+        with pytest.raises(ValueError, match='different data'):
+            AQILSTMPredictor(lookback=24, hidden_size=8, num_layers=1).train(
+                data + 1, epochs=4, validation_fraction=0.2, checkpoint_path=path, resume=True)
+
+    assert resumed.training_summary['resumed_from_epoch'] == 2
+    assert resumed.training_summary['epochs_run'] == 4
+    for name, value in straight.model.state_dict().items():
+        torch.testing.assert_close(resumed.model.state_dict()[name], value)
+
+
+def test_early_stopping_keeps_the_best_epoch():
+    torch.manual_seed(0)
+    hours = np.arange(300)
+    data = 150 + 40 * np.sin(2 * np.pi * hours / 24)
+    predictor = AQILSTMPredictor(lookback=24, hidden_size=8, num_layers=1)
+    # A learning rate this high stops improving after the first few epochs
+    predictor.train(data, epochs=30, learning_rate=0.5, validation_fraction=0.2, patience=3)
+    summary = predictor.training_summary
+
+    assert summary['stopped_early']
+    assert summary['epochs_run'] == summary['best_epoch'] + 3
+    # The final weights are the best epoch's, not the last one's
+    validation = predictor.make_loader(data[240 - 24:], 1024, False, transform=predictor.scaler.transform)
+    assert predictor._validation_loss(validation, torch.nn.MSELoss()) == pytest.approx(summary['best_validation_loss'])
+
+
+if __name__ == '__main__':
+    test_prepare_data_matches_loop_and_is_a_view()
+    test_loader_yields_shuffled_mini_batches()
+    test_dataset_does_not_materialize_windows()
+    test_training_reduces_loss()
+    test_resumed_training_matches_an_uninterrupted_run()
+    test_early_stopping_keeps_the_best_epoch()
+    print("✅ Training tests passed")
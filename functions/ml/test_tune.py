@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Tests for the hyperparameter search
+"""
+
+import json
+import os
+import tempfile
+import pytest
+from aqi_lstm_model import AQILSTMPredictor
+from synthetic_data import generate_aqi
+from tune import SEARCH_SPACE, MedianStopper, grid, pareto_front, recommend, search
+
+
+def test_grid_drops_dropout_for_single_layer_models():
+    configs = grid({'lookback': (12, 30), 'hidden_size': (16,), 'num_layers': (1, 2), 'dropout': (0.1, 0.3)})
+    assert len(configs) == 2 * (1 + 2)
+    assert all(config['dropout'] == 0.0 for config in configs if config['num_layers'] == 1)
+
+
+def test_median_stopper_waits_for_enough_trials():
+    stopper = MedianStopper(min_trials=2)
+    assert stopper.report(5, 30.0)
+    assert stopper.report(5, 10.0)
+    assert not stopper.report(5, 25.0)  # worse than the median of 30 and 10
+    assert stopper.report(5, 15.0)
+    assert stopper.report(10, 99.0)  # a new epoch starts a new comparison
+
+
+def test_pareto_front_and_recommendation():
+    trials = [
+        {'name': 'small', 'latency_ms': 1.0, 'mae': 30.0},
+        {'name': 'medium', 'latency_ms': 2.0, 'mae': 20.0},
+        {'name': 'dominated', 'latency_ms': 3.0, 'mae': 25.0},
+        {'name': 'large', 'latency_ms': 4.0, 'mae': 18.0}
+    ]
+    front = pareto_front(trials)
+    assert [trial['name'] for trial in front] == ['small', 'medium', 'large']
+    assert recommend(front, target_mae=22.0)['name'] == 'medium'
+    assert recommend(front, target_mae=10.0)['name'] == 'large'
+    assert recommend(front)['name'] == 'large'
+
+
+def test_lookbacks_longer_than_the_served_window_are_rejected():
+    data = generate_aqi(points=600, seed=0)[0]
+    with pytest.raises(ValueError, match='Lookback 48'):
+        search(data, {**SEARCH_SPACE, 'lookback': (30, 48)})
+
+
+def test_training_config_rejects_unservable_lookbacks(tmp_path):
+    from train_model import load_architecture
+    path = tmp_path / 'tuning.json'
+    path.write_text(json.dumps({'recommended': {'config': {'lookback': 48, 'hidden_size': 16, 'num_layers': 1, 'dropout': 0.0}}}))
+    with pytest.raises(ValueError, match='Lookback 48'):
+        load_architecture(str(path))
+
+
+def test_parallel_search_saves_the_finished_trials():
+    data = generate_aqi(points=600, seed=0)[0]
+    space = {'lookback': (8, 12), 'hidden_size': (4, 8), 'num_layers': (1,), 'dropout': (0.0,)}
+    with tempfile.TemporaryDirectory() as tmp:
+        report = search(data, space, epochs=4, rung=2, workers=2, directory=tmp, min_trials=1)
+        finished = [trial for trial in report['trials'] if not trial['stopped_early']]
+        assert len(report['trials']) == 4 and report['stopped_early'] == 4 - len(finished)
+        assert finished and report['pareto_front'] and report['recommended'] in report['pareto_front']
+        for trial in finished:
+            assert trial['epochs'] == 4 and trial['latency_ms'] > 0
+            predictor = AQILSTMPredictor()
+            predictor.load_artifact(trial['artifact'])
+            assert predictor.architecture == trial['config']
+        assert len(os.listdir(tmp)) == len(finished)
@@ -7,9 +7,25 @@ import numpy as np
 import firebase_admin
 from firebase_admin import credentials, db
 import os
-from aqi_lstm_model import AQILSTMPredictor
+from aqi_lstm_model import AQILSTMPredictor, series_parts
+from readings_store import READING_CHANNELS, check_servable_lookback
+from history_store import HistoryStore
+from model_registry import ModelRegistry
+from backtest import holdout_split, mean_mae, walk_forward
+from synthetic_data import generate_aqi, synthetic_pollutants
 from datetime import datetime
 import json
+import signal
+import sys
+
+# A retrained model becomes current only if its held-out backtest MAE is at most this much worse than the current model's
+PROMOTION_TOLERANCE = 0.02
+
+# Saved after every epoch so an interrupted or preempted run continues with --resume
+CHECKPOINT_PATH = 'models/checkpoints/training.pt'
+
+# Fixed seed for the synthetic fallback data, so a resumed run continues on the same series
+SYNTHETIC_SEED = 0
 
 def initialize_firebase():
     """Initialize Firebase connection"""
@@ -30,6 +46,26 @@ def initialize_firebase():
             return False
     return True
 
+def load_history(channels=('aqi',), root='data/history', min_points=500):
+    """Readings from the local history store (python history_store.py sync), one memory-mapped series per
+    sensor so no window mixes devices; None if there are too few"""
+    store = HistoryStore(root)
+    if store.rows() < min_points:
+        return None
+    series = store.sensor_series(channels)
+    if count_points(series) < min_points:
+        return None
+    print(f"✅ Loaded {count_points(series)} readings from {len(series)} sensors in the local history store ({root})")
+    return series
+
+def count_points(data):
+    """Readings in a series or a list of per-sensor series"""
+    return sum(len(part) for part in series_parts(data))
+
+def holdout_points(evaluation, lookback):
+    """Held-out readings, not counting the `lookback` points of context in front of each evaluation part"""
+    return sum(len(part) - lookback for part in series_parts(evaluation))
+
 def fetch_historical_data():
     """Fetch historical AQI data from Firebase"""
     try:
@@ -40,42 +76,65 @@ def fetch_historical_data():
             print(f"✅ Fetched data from Firebase")
             # For now, we'll generate synthetic historical data based on current AQI
             current_aqi = float(data['aqi'])
-            return generate_synthetic_data(current_aqi, points=500)
+            return generate_synthetic_data(current_aqi, points=500, seed=SYNTHETIC_SEED)
         else:
             print("⚠️ No AQI data in Firebase, using default synthetic data")
-            return generate_synthetic_data(150, points=500)
+            return generate_synthetic_data(150, points=500, seed=SYNTHETIC_SEED)
     except Exception as e:
         print(f"⚠️ Firebase fetch failed: {e}. Using synthetic data.")
-        return generate_synthetic_data(150, points=500)
+        return generate_synthetic_data(150, points=500, seed=SYNTHETIC_SEED)
+
+def load_training_data(channels=('aqi',)):
+    """The series train_model fits on: the local history per sensor, else seeded synthetic data"""
+    training_data = load_history(channels)
+    if training_data is None:
+        training_data = fetch_historical_data()
+        if len(channels) > 1:
+            # Multivariate mode: AQI plus one column per pollutant channel
+            training_data = np.column_stack([training_data, synthetic_pollutants(training_data, channels[1:], seed=SYNTHETIC_SEED)])
+    return training_data
 
-def generate_synthetic_data(base_aqi=150, points=500):
+def generate_synthetic_data(base_aqi=150, points=500, seed=None):
     """Generate synthetic AQI data for training"""
     print(f"📊 Generating {points} synthetic data points (base AQI: {base_aqi})")
-    
-    # Generate realistic AQI patterns
-    data = []
-    current = base_aqi
-    
-    for i in range(points):
-        # Add daily patterns
-        daily_variation = 20 * np.sin(2 * np.pi * i / 24)
-        
-        # Add weekly patterns
-        weekly_variation = 15 * np.sin(2 * np.pi * i / (24 * 7))
-        
-        # Add random noise
-        noise = np.random.normal(0, 10)
-        
-        # Calculate new value
-        current = current + daily_variation/10 + weekly_variation/10 + noise
-        
-        # Keep within realistic bounds
-        current = max(20, min(400, current))
-        data.append(current)
-    
-    return np.array(data)
+    return generate_aqi(sensors=1, points=points, base_aqi=base_aqi, seed=seed)[0]
 
-def train_model():
+def baseline_backtest(registry, training_data, evaluation, lookback, channels):
+    """The current registry model's backtest on the same held-out forecasts, or None without a comparable model
+
+    `evaluation` starts with `lookback` points of context; a model with a different lookback
+    gets its own amount of context in front of the same held-out readings.
+    """
+    current = registry.current()
+    if current is None:
+        return None
+    baseline = AQILSTMPredictor()
+    baseline.load_artifact(registry.path(current['version']))
+    if baseline.channels != tuple(channels):
+        return None
+
+    def with_context(train, held_out):
+        if baseline.lookback > lookback:
+            return np.concatenate([train[lookback - baseline.lookback:], held_out])
+        return held_out[lookback - baseline.lookback:]
+
+    # Per-sensor training parts line up with their held-out parts (see holdout_split)
+    if isinstance(evaluation, list):
+        return walk_forward(baseline, [with_context(train, held_out) for train, held_out in zip(training_data, evaluation)])
+    return walk_forward(baseline, with_context(training_data, evaluation))
+
+def load_architecture(path):
+    """Model settings from a tuning report (python tune.py) or a plain JSON object of them"""
+    with open(path) as f:
+        config = json.load(f)
+    if 'recommended' in config:
+        if config['recommended'] is None:
+            raise ValueError(f"{path} has no recommended configuration")
+        config = config['recommended']['config']
+    check_servable_lookback(config.get('lookback', 30))
+    return config
+
+def train_model(channels=('aqi',), force_promote=False, architecture=None, resume=False):
     """Main training function"""
     print("\n" + "="*60)
     print("  AQI LSTM Model Training (PyTorch)")
@@ -86,38 +145,102 @@ def train_model():
     
     # Fetch or generate training data
     print("\n📥 Fetching training data...")
-    training_data = fetch_historical_data()
-    print(f"✅ Training data ready: {len(training_data)} data points")
+    training_data = load_training_data(channels)
+    print(f"✅ Training data ready: {count_points(training_data)} data points")
     
     # Create predictor
     print("\n🧠 Creating LSTM model...")
-    predictor = AQILSTMPredictor(lookback=30)
+    predictor = AQILSTMPredictor(channels=channels, **(architecture or {}))
+    print(f"✅ Architecture: {predictor.architecture}")
+    lookback = predictor.lookback
+    
+    # Hold out the most recent readings to backtest the trained model on
+    training_data, evaluation = holdout_split(training_data, lookback=lookback)
+    if evaluation is None:
+        print("⚠️ Too little data to hold out a backtest period; training on all of it")
+    else:
+        print(f"✅ Holding out the last {holdout_points(evaluation, lookback)} points for backtesting")
     
     # Train model
     print("\n🚀 Starting training...")
     print("This may take a few minutes...\n")
     
+    # The most recent 10% of the training part is a validation split for early stopping
     final_loss = predictor.train(
         training_data,
         epochs=50,
         batch_size=32,
-        learning_rate=0.001
+        learning_rate=0.001,
+        validation_fraction=0.1,
+        patience=10,
+        checkpoint_path=CHECKPOINT_PATH,
+        resume=resume
     )
+    summary = predictor.training_summary
+    print(f"✅ Best epoch {summary['best_epoch']} of {summary['epochs_run']} "
+          f"(validation loss {summary['best_validation_loss']:.4f}{', stopped early' if summary['stopped_early'] else ''})")
+    
+    # Estimate confidence bands from backtested residuals; they ship inside the artifact.
+    # Residuals on the series the model was fit on are too small, so use the held-out tail when there is one
+    print("\n📏 Calibrating confidence bands...")
+    calibration_source = 'holdout' if evaluation is not None else 'training'
+    calibration = predictor.calibrate_confidence(evaluation if evaluation is not None else training_data)
+    print(f"✅ Residual quantiles from {calibration['cutoffs']} backtest cutoffs on {calibration_source} data")
+    if evaluation is None:
+        print("⚠️ Calibrated on training data: confidence bands will be too narrow")
     
-    # Save model
+    # Walk-forward backtest on the held-out period, against the current model on the same data
+    registry = ModelRegistry()
+    backtest, baseline = None, None
+    if evaluation is not None:
+        print("\n🧪 Backtesting on held-out data...")
+        backtest = walk_forward(predictor, evaluation)
+        for horizon, entry in backtest['horizons'].items():
+            print(f"  {horizon:>3} steps  MAE {entry['mae']:7.2f}  RMSE {entry['rmse']:7.2f}")
+        baseline = baseline_backtest(registry, training_data, evaluation, lookback, channels)
+    promote = (force_promote or baseline is None
+               or mean_mae(backtest) <= mean_mae(baseline) * (1 + PROMOTION_TOLERANCE))
+    
+    # Save model (metadata travels inside the inference artifact)
     print("\n💾 Saving model...")
+    predictor.metadata = {
+        'training_date': datetime.now().isoformat(),
+        'data_points': count_points(training_data),
+        'final_loss': float(final_loss),
+        'best_epoch': summary['best_epoch']
+    }
     predictor.save_model()
+    # The run is finished; the next one starts from scratch
+    if os.path.exists(CHECKPOINT_PATH):
+        os.remove(CHECKPOINT_PATH)
     
     # Save training metrics
     metrics = {
         'training_date': datetime.now().isoformat(),
-        'data_points': len(training_data),
+        'data_points': count_points(training_data),
         'final_loss': float(final_loss),
-        'lookback': 30,
+        **predictor.architecture,
         'epochs': 50,
-        'framework': 'PyTorch'
+        'epochs_run': summary['epochs_run'],
+        'best_epoch': summary['best_epoch'],
+        'final_validation_loss': summary['validation_loss'],
+        'best_validation_loss': summary['best_validation_loss'],
+        'stopped_early': summary['stopped_early'],
+        'resumed_from_epoch': summary['resumed_from_epoch'],
+        'confidence_cutoffs': calibration['cutoffs'],
+        'confidence_source': calibration_source,
+        'channels': list(channels),
+        'framework': 'PyTorch',
+        'holdout_points': holdout_points(evaluation, lookback) if evaluation is not None else 0,
+        'backtest': backtest,
+        'baseline_backtest_mae': round(mean_mae(baseline), 4) if baseline else None,
+        'promoted': promote
     }
     
+    # Publish to the registry; a running API picks it up without a restart if it was promoted
+    entry = registry.publish('models/aqi_lstm_model.pt', metadata=metrics, activate=promote)
+    metrics['model_version'] = entry['version']
+    
     os.makedirs('models', exist_ok=True)
     with open('models/training_metrics.json', 'w') as f:
         json.dump(metrics, f, indent=2)
@@ -128,17 +251,36 @@ def train_model():
     print(f"\n📊 Final Loss: {final_loss:.4f}")
     print(f"📁 Model saved to: models/aqi_lstm_model.pth")
     print(f"📁 Scaler saved to: models/aqi_scaler.pkl")
+    print(f"📁 Inference artifact saved to: models/aqi_lstm_model.pt")
     print(f"📁 Metrics saved to: models/training_metrics.json")
+    if promote:
+        print(f"📦 Published to models/registry as version {entry['version']} (now current)")
+    else:
+        print(f"⚠️ Published to models/registry as version {entry['version']} but NOT promoted: "
+              f"backtest MAE {mean_mae(backtest):.2f} vs {mean_mae(baseline):.2f} for the current model "
+              f"(activate anyway with: python model_registry.py activate {entry['version']})")
     print("\n🎯 Next steps:")
     print("  1. Test predictions: python predict_service.py")
     print("  2. Start API server: python main.py")
     print("\n")
 
+def stop_on_sigterm(signum, frame):
+    # Preemptible machines get SIGTERM before shutdown; the last epoch's checkpoint is already on disk
+    raise KeyboardInterrupt
+
 if __name__ == '__main__':
+    signal.signal(signal.SIGTERM, stop_on_sigterm)
     try:
-        train_model()
+        train_model(
+            channels=READING_CHANNELS if '--multivariate' in sys.argv else ('aqi',),
+            force_promote='--force-promote' in sys.argv,
+            architecture=load_architecture(sys.argv[sys.argv.index('--config') + 1]) if '--config' in sys.argv else None,
+            resume='--resume' in sys.argv
+        )
     except KeyboardInterrupt:
         print("\n\n⚠️ Training interrupted by user")
+        if os.path.exists(CHECKPOINT_PATH):
+            print(f"   Progress is saved in {CHECKPOINT_PATH}; continue with: python train_model.py --resume")
     except Exception as e:
         print(f"\n\n❌ Training failed: {e}")
         import traceback
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Hyperparameter search over lookback, hidden size, layer count and dropout
+
+Trials train in parallel, one configuration per worker process. Every `rung` epochs each trial is
+walk-forward backtested on a held-out tail of the series, and a trial whose MAE is worse than the
+median of the other trials at the same epoch is stopped (median stopping rule). Trials that finish
+are timed in the parent on one thread, one at a time, and the report lists the latency-vs-MAE
+Pareto front plus the fastest configuration that meets `--target-mae`.
+
+Usage:
+    python tune.py [--history data/history | --synthetic 3000] [--workers 4] [--epochs 30]
+                   [--target-mae 20] [--output tuning.json]
+    python train_model.py --config tuning.json    # train the recommended configuration
+"""
+
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import torch
+from aqi_lstm_model import AQILSTMPredictor, series_parts
+from backtest import holdout_split, mean_mae, walk_forward
+from readings_store import check_servable_lookback
+
+# Lookbacks can't exceed the readings the API keeps per sensor (READINGS_CAPACITY); search() rejects longer ones
+SEARCH_SPACE = {
+    'lookback': (12, 24, 30),
+    'hidden_size': (16, 32, 64),
+    'num_layers': (1, 2),
+    'dropout': (0.2,)
+}
+
+
+def grid(space=SEARCH_SPACE):
+    """Every configuration in the space; dropout only acts between LSTM layers, so single-layer configs get 0"""
+    configs = []
+    for values in itertools.product(*space.values()):
+        config = dict(zip(space.keys(), values))
+        if config['num_layers'] == 1:
+            config['dropout'] = 0.0
+        if config not in configs:
+            configs.append(config)
+    return configs
+
+
+class MedianStopper:
+    """Median stopping rule, shared by all trials (pass a Manager dict and lock across processes)
+
+    A trial reports its backtest MAE at an epoch and should stop if that is worse than the median
+    of the MAEs other trials reported at the same epoch, once at least `min_trials` have.
+    """
+
+    def __init__(self, scores=None, lock=None, min_trials=3):
+        self.scores = {} if scores is None else scores
+        self.lock = lock or threading.Lock()
+        self.min_trials = min_trials
+
+    def report(self, epoch, mae):
+        """Record a result; returns whether the trial should keep training"""
+        with self.lock:
+            seen = self.scores.get(epoch, [])
+            self.scores[epoch] = seen + [mae]
+        return len(seen) < self.min_trials or mae <= float(np.median(seen))
+
+
+def run_trial(config, train, evaluation, stopper, epochs=30, rung=5, channels=('aqi',), directory='models/tuning',
+              seed=0, batch_size=32, max_cutoffs=500):
+    """Train one configuration, backtesting every `rung` epochs; saves an artifact if it is not stopped
+
+    `evaluation` is the held-out tail preceded by exactly `lookback` points of context, so
+    trials with different lookbacks are scored on the same forecasts.
+    """
+    torch.manual_seed(seed)
+    predictor = AQILSTMPredictor(channels=channels, **config)
+    history = []
+    reports = []
+
+    def checkpoint(epoch, loss):
+        if epoch % rung and epoch != epochs:
+            return True
+        reports.append(walk_forward(predictor, evaluation, max_cutoffs=max_cutoffs))
+        history.append({'epoch': epoch, 'loss': round(float(loss), 6), 'mae': round(mean_mae(reports[-1]), 4)})
+        return epoch == epochs or stopper.report(epoch, history[-1]['mae'])
+
+    started = time.perf_counter()
+    # Trials run side by side; their per-epoch progress lines would only interleave
+    with contextlib.redirect_stdout(io.StringIO()):
+        predictor.train(train, epochs=epochs, batch_size=batch_size, callback=checkpoint)
+    result = {
+        'config': config,
+        'parameters': sum(parameter.numel() for parameter in predictor.model.parameters()),
+        'epochs': history[-1]['epoch'],
+        'stopped_early': history[-1]['epoch'] < epochs,
+        'mae': history[-1]['mae'],
+        'history': history,
+        'seconds': round(time.perf_counter() - started, 2)
+    }
+    if not result['stopped_early']:
+        name = '-'.join(f'{key}{value}' for key, value in config.items())
+        result['artifact'] = os.path.join(directory, f'{name}.pt')
+        result['backtest'] = reports[-1]['horizons']
+        with contextlib.redirect_stdout(io.StringIO()):
+            predictor.save_artifact(result['artifact'], metadata={'tuning': config})
+    return result
+
+
+_worker_state = None
+
+
+def _init_worker(state, threads):
+    global _worker_state
+    torch.set_num_threads(threads)
+    _worker_state = state
+
+
+def _worker_trial(config):
+    state = dict(_worker_state)
+    trim = state.pop('context') - config['lookback']
+    evaluation = state.pop('evaluation')
+    evaluation = [part[trim:] for part in evaluation] if isinstance(evaluation, list) else evaluation[trim:]
+    return run_trial(config, evaluation=evaluation, **state)
+
+
+def measure_latency(artifact, steps=90, repeats=20):
+    """Median single-window, single-thread latency of a stateful rollout in milliseconds, as the API serves it"""
+    predictor = AQILSTMPredictor(decode=AQILSTMPredictor.SERVING_DECODE)
+    with contextlib.redirect_stdout(io.StringIO()):
+        predictor.load_artifact(artifact)
+    scaler = predictor.scaler
+    middle = (np.asarray(scaler.data_min_) + np.asarray(scaler.data_max_)) / 2
+    window = np.broadcast_to(middle, (predictor.lookback, len(predictor.channels)))
+    windows = (window if predictor.multivariate else window[:, 0])[None]
+    threads = torch.get_num_threads()
+    torch.set_num_threads(1)
+    try:
+        predictor.predict_batch(windows, steps=steps)
+        samples = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            predictor.predict_batch(windows, steps=steps)
+            samples.append(time.perf_counter() - started)
+    finally:
+        torch.set_num_threads(threads)
+    return round(float(np.median(samples)) * 1000, 3)
+
+
+def pareto_front(trials):
+    """Trials no other trial beats on both latency and MAE, fastest first"""
+    front, best = [], float('inf')
+    for trial in sorted(trials, key=lambda trial: (trial['latency_ms'], trial['mae'])):
+        if trial['mae'] < best:
+            front.append(trial)
+            best = trial['mae']
+    return front
+
+
+def recommend(front, target_mae=None):
+    """The fastest front trial within `target_mae`, else the most accurate one"""
+    if target_mae is not None:
+        for trial in front:
+            if trial['mae'] <= target_mae:
+                return trial
+    return front[-1]
+
+
+def search(data, space=SEARCH_SPACE, epochs=30, rung=5, workers=1, channels=('aqi',), directory='models/tuning',
+           target_mae=None, min_trials=3, seed=0, max_cutoffs=500):
+    """Run every configuration in `space` on `data` (a series or a list of per-sensor series) and return the report dict"""
+    context = max(space['lookback'])
+    check_servable_lookback(context)
+    train, evaluation = holdout_split(data, lookback=context)
+    if evaluation is None:
+        raise ValueError(f"Too little data to hold out a backtest period: {sum(len(part) for part in series_parts(data))} points")
+    os.makedirs(directory, exist_ok=True)
+    configs = grid(space)
+    state = {'train': train, 'evaluation': evaluation, 'context': context, 'epochs': epochs, 'rung': rung,
+             'channels': tuple(channels), 'directory': directory, 'seed': seed, 'max_cutoffs': max_cutoffs}
+
+    started = time.perf_counter()
+    trials = []
+    if workers > 1:
+        # Spawned, not forked: the parent has already used torch's thread pool
+        spawn = multiprocessing.get_context('spawn')
+        with spawn.Manager() as manager:
+            state['stopper'] = MedianStopper(manager.dict(), manager.Lock(), min_trials)
+            threads = max(1, (os.cpu_count() or 1) // workers)
+            with ProcessPoolExecutor(workers, mp_context=spawn, initializer=_init_worker,
+                                     initargs=(state, threads)) as pool:
+                futures = [pool.submit(_worker_trial, config) for config in configs]
+                for future in as_completed(futures):
+                    trials.append(_progress(future.result(), len(trials) + 1, len(configs)))
+    else:
+        _init_worker({**state, 'stopper': MedianStopper(min_trials=min_trials)}, torch.get_num_threads())
+        for config in configs:
+            trials.append(_progress(_worker_trial(config), len(trials) + 1, len(configs)))
+    elapsed = time.perf_counter() - started
+
+    finished = [trial for trial in trials if not trial['stopped_early']]
+    for trial in finished:
+        trial['latency_ms'] = measure_latency(trial['artifact'])
+        trial['artifact_bytes'] = os.path.getsize(trial['artifact'])
+    front = pareto_front(finished)
+    return {
+        'space': {key: list(values) for key, values in space.items()},
+        'data_points': sum(len(part) for part in series_parts(train)),
+        'holdout_points': sum(len(part) - context for part in series_parts(evaluation)),
+        'epochs': epochs,
+        'rung': rung,
+        'workers': workers,
+        'seconds': round(elapsed, 2),
+        'trials': trials,
+        'stopped_early': len(trials) - len(finished),
+        'pareto_front': [_summary(trial) for trial in front],
+        'target_mae': target_mae,
+        'recommended': _summary(recommend(front, target_mae)) if front else None
+    }
+
+
+def _progress(trial, done, total):
+    status = f"stopped at epoch {trial['epochs']}" if trial['stopped_early'] else 'finished'
+    print(f"  [{done}/{total}] {trial['config']}  MAE {trial['mae']:.2f}  {status}")
+    return trial
+
+
+def _summary(trial):
+    return {key: trial[key] for key in ('config', 'mae', 'latency_ms', 'parameters', 'artifact_bytes', 'artifact')}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--history', help='tune on the on-disk history store at this root')
+    parser.add_argument('--synthetic', type=int, default=3000, help='points of synthetic AQI when no history is given')
+    parser.add_argument('--multivariate', action='store_true', help='use every reading channel, not just AQI')
+    parser.add_argument('--space', help='JSON object of parameter -> list of values, replacing the default space')
+    parser.add_argument('--epochs', type=int, default=30)
+    parser.add_argument('--rung', type=int, default=5, help='epochs between backtests')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--target-mae', type=float, help='accuracy bar (mean MAE over 7/28/90 steps)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--directory', default='models/tuning', help='where finished trials save their artifacts')
+    parser.add_argument('--output', default='tuning.json')
+    args = parser.parse_args(argv)
+
+    from readings_store import READING_CHANNELS
+    channels = READING_CHANNELS if args.multivariate else ('aqi',)
+    space = {**SEARCH_SPACE, **json.loads(args.space)} if args.space else SEARCH_SPACE
+    if args.history:
+        from history_store import HistoryStore
+        data = HistoryStore(args.history).sensor_series(channels=channels)
+    else:
+        from synthetic_data import generate_aqi, synthetic_pollutants
+        aqi = generate_aqi(points=args.synthetic, seed=args.seed)[0]
+        data = np.column_stack([aqi, synthetic_pollutants(aqi, channels[1:], seed=args.seed)]) if args.multivariate else aqi
+
+    print(f"\n🔎 Searching {len(grid(space))} configurations with {args.workers} workers...")
+    report = search(data, space, epochs=args.epochs, rung=args.rung, workers=args.workers, channels=channels,
+                    directory=args.directory, target_mae=args.target_mae, seed=args.seed)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\n📊 {len(report['trials'])} trials in {report['seconds']:.1f}s, {report['stopped_early']} stopped early")
+    print("Pareto front (latency vs MAE):")
+    for trial in report['pareto_front']:
+        print(f"  {trial['latency_ms']:8.2f} ms  MAE {trial['mae']:7.2f}  {trial['parameters']:>7} params  {trial['config']}")
+    if report['recommended']:
+        print(f"\n✅ Recommended: {report['recommended']['config']}")
+        print(f"   Train it with: python train_model.py --config {args.output}")
+    print(f"\n📁 Results saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()